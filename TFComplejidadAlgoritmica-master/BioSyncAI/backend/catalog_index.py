@@ -0,0 +1,255 @@
+import copy
+
+import numpy as np
+
+# Intentos extra cuando el track excluido aparece en varias filas del catálogo
+MAX_DUPLICATE_RETRIES = 8
+
+# Fracción de filas agregadas (bloque aparte) a partir de la cual se funden con los ids ordenados
+MERGE_FRACTION = 0.1
+
+
+def encode_track_ids(track_ids):
+    """
+    Ids como arreglo comparable para np.searchsorted: los enteros tal cual y
+    el resto como bytes UTF-8 de ancho fijo. Se recorre la secuencia sin
+    armar listas intermedias (puede ser una StringColumn memory-mapped).
+    """
+    if isinstance(track_ids, np.ndarray) and track_ids.dtype.kind in "iu":
+        return track_ids
+    width = max((len(str(t).encode("utf-8")) for t in track_ids), default=1)
+    return np.fromiter((str(t).encode("utf-8") for t in track_ids), dtype=f"S{max(width, 1)}", count=len(track_ids))
+
+
+def sort_track_ids(track_ids, first_row=0):
+    """
+    Retorna (keys, rows): los ids ordenados y la fila de cada uno. El orden es
+    estable, así ante ids duplicados la primera coincidencia es la fila menor.
+    """
+    keys = encode_track_ids(track_ids)
+    order = np.argsort(keys, kind="stable")
+    return keys[order], order.astype(np.int64) + first_row
+
+
+class TrackIdLookup:
+    """
+    Mapa track_id -> fila sin un dict por proceso: búsqueda binaria sobre los
+    ids ordenados, que pueden ser memory-maps guardados junto al catálogo
+    (ver catalog_store). Las filas agregadas después van a un bloque ordenado
+    aparte, que se funde con el principal al superar MERGE_FRACTION.
+    """
+
+    def __init__(self, keys, rows, extra=None):
+        self.keys = keys
+        self.rows = rows
+        self.extra = extra
+
+    def row(self, track_id):
+        """Primera fila con ese track_id, o None."""
+        parts = [(self.keys, self.rows)] + ([self.extra] if self.extra is not None else [])
+        for keys, rows in parts:
+            key = _search_key(keys, track_id)
+            if key is None:
+                continue
+            i = int(np.searchsorted(keys, key))
+            if i < len(keys) and keys[i] == key:
+                return int(rows[i])
+        return None
+
+    def extend(self, track_ids, first_row):
+        """Nueva búsqueda con los ids de las filas `first_row`...; esta no cambia."""
+        if self.keys.dtype.kind in "iu":
+            track_ids = np.asarray(track_ids, dtype=self.keys.dtype)
+        keys, rows = sort_track_ids(track_ids, first_row)
+        if self.extra is not None:
+            # Las filas previas van primero: se conservan ante duplicados
+            keys, rows = _merge_sorted(self.extra, (keys, rows))
+        if len(keys) > MERGE_FRACTION * max(len(self.keys), 1):
+            return TrackIdLookup(*_merge_sorted((self.keys, self.rows), (keys, rows)))
+        return TrackIdLookup(self.keys, self.rows, (keys, rows))
+
+
+def _search_key(keys, track_id):
+    # Clave comparable con `keys`, o None si ese tipo de id no puede estar
+    if keys.dtype.kind == "S":
+        if not isinstance(track_id, str):
+            return None
+        key = track_id.encode("utf-8")
+        return key if len(key) <= keys.dtype.itemsize else None
+    if isinstance(track_id, (int, np.integer)) and not isinstance(track_id, bool):
+        return track_id
+    return None
+
+
+def _merge_sorted(first, second):
+    keys = np.concatenate([first[0], second[0]])
+    order = np.argsort(keys, kind="stable")
+    return keys[order], np.concatenate([first[1], second[1]])[order]
+
+
+class GrowableArray:
+    """
+    Arreglo 1-D con capacidad de reserva: agregar al final es O(1) amortizado.
+    El arreglo inicial se usa sin copiar (puede ser una vista o un memmap de
+    solo lectura) y solo se copia a un buffer propio en el primer `extend`.
+    Agregar solo escribe después de `size`, así las vistas tomadas antes no cambian.
+    """
+
+    def __init__(self, values):
+        self._data = values
+        self._owned = False
+        self.size = len(values)
+
+    @property
+    def view(self):
+        return self._data[:self.size]
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if not self._owned or needed > len(self._data):
+            data = np.empty(max(needed, 2 * self.size), dtype=self._data.dtype)
+            data[:self.size] = self._data[:self.size]
+            self._data, self._owned = data, True
+        self._data[self.size:needed] = values
+        self.size = needed
+
+
+class CatalogIndex:
+    """
+    Índice de candidatos construido una sola vez tras el clustering.
+    Guarda, por cluster, un arreglo contiguo de posiciones de fila y una
+    búsqueda track_id -> fila (TrackIdLookup), de modo que elegir un candidato
+    al azar excluyendo la canción actual no crea DataFrames intermedios.
+    `sorted_ids` son los (keys, rows) ya ordenados guardados con el catálogo;
+    si no se dan, se ordenan los `track_ids`.
+    """
+
+    def __init__(self, clusters, track_ids, sorted_ids=None):
+        clusters = np.asarray(clusters)
+        # Identifica la serie de índices obtenidos con `extend` desde este (ver SessionHistory)
+        self.lineage = object()
+        # Cualquier secuencia indexable: ndarray, lista o StringColumn
+        self.track_ids = track_ids
+        self.size = len(clusters)
+
+        # Filas ordenadas por cluster: cada cluster queda como un bloque contiguo
+        rows = np.argsort(clusters, kind="stable")
+        cluster_ids, starts, counts = np.unique(clusters[rows], return_index=True, return_counts=True)
+        self._blocks = {
+            int(cid): GrowableArray(rows[start:start + count])
+            for cid, start, count in zip(cluster_ids, starts, counts)
+        }
+        self._row_cluster = GrowableArray(clusters)
+
+        # Posición de cada fila dentro de su bloque de cluster
+        position = np.empty(self.size, dtype=np.int64)
+        for block in self._blocks.values():
+            position[block.view] = np.arange(block.size)
+        self._position = GrowableArray(position)
+        self._refresh_views()
+
+        # Ante track_id duplicados se conserva la primera fila
+        if sorted_ids is None or len(sorted_ids[0]) != self.size:
+            sorted_ids = sort_track_ids(track_ids)
+        self.ids = TrackIdLookup(*sorted_ids)
+
+    def _refresh_views(self):
+        self.members = {cid: block.view for cid, block in self._blocks.items()}
+        self.row_cluster = self._row_cluster.view
+        self.position = self._position.view
+
+    def extend(self, clusters, track_ids):
+        """
+        Retorna un índice nuevo con las filas nuevas del final del catálogo, ya
+        asignadas a sus clusters, sin reconstruir los bloques existentes.
+        `track_ids` es la columna completa del catálogo ampliado. Este índice
+        no cambia (sus vistas solo cubren sus filas), así los lectores que lo
+        tengan siguen viendo un estado consistente; los buffers de reserva se
+        comparten, por lo que solo se debe extender el índice más reciente.
+        """
+        clusters = np.asarray(clusters)
+        index = copy.copy(self)
+        index._blocks = dict(self._blocks)
+        start = self.size
+        new_rows = np.arange(start, start + len(clusters))
+        position = np.empty(len(clusters), dtype=np.int64)
+        for cid in np.unique(clusters):
+            rows = new_rows[clusters == cid]
+            block = index._blocks.setdefault(int(cid), GrowableArray(np.empty(0, dtype=np.int64)))
+            position[rows - start] = np.arange(block.size, block.size + len(rows))
+            block.extend(rows)
+        index._row_cluster.extend(clusters)
+        index._position.extend(position)
+        index.size += len(clusters)
+        index.track_ids = track_ids
+        index.ids = self.ids.extend([track_ids[row] for row in new_rows.tolist()], start)
+        index._refresh_views()
+        return index
+
+    def __len__(self):
+        return self.size
+
+    def pick(self, cluster, exclude_track_id, rng):
+        """
+        Retorna la fila de un candidato aleatorio del cluster (o de todo el
+        catálogo si el cluster está vacío), distinto de `exclude_track_id`.
+        """
+        if self.size == 0:
+            return None
+
+        members = self.members.get(cluster) if cluster is not None else None
+        if members is None or len(members) == 0:
+            members = None
+            count = self.size
+        else:
+            count = len(members)
+
+        # Posición del track excluido dentro de los candidatos, si pertenece a ellos
+        excluded = None
+        excluded_row = self.ids.row(exclude_track_id) if exclude_track_id else None
+        if excluded_row is not None and count > 1:
+            if members is None:
+                excluded = excluded_row
+            elif self.row_cluster[excluded_row] == cluster:
+                excluded = int(self.position[excluded_row])
+
+        for _ in range(MAX_DUPLICATE_RETRIES):
+            if excluded is None:
+                pos = rng.randrange(count)
+            else:
+                # Muestreo uniforme sobre count-1 posiciones saltando la excluida
+                pos = rng.randrange(count - 1)
+                if pos >= excluded:
+                    pos += 1
+            row = int(members[pos]) if members is not None else pos
+            if not exclude_track_id or count == 1 or self.track_ids[row] != exclude_track_id:
+                return row
+
+        # Caso raro: el cluster está lleno de duplicados del track excluido
+        candidates = members if members is not None else range(self.size)
+        for candidate in candidates:
+            if self.track_ids[candidate] != exclude_track_id:
+                return int(candidate)
+        return row
+
+    def sample(self, cluster, k, exclude, rng):
+        """
+        Hasta k filas distintas del cluster cuyos track_id no estén en
+        `exclude` (cualquier contenedor con `in`). Cuesta O(k + len(exclude)):
+        se muestrean posiciones del bloque sin recorrerlo.
+        """
+        members = self.members.get(cluster) if cluster is not None else None
+        if members is None or len(members) == 0:
+            return []
+        count = len(members)
+        rows, seen = [], set()
+        for pos in rng.sample(range(count), min(count, k + len(exclude))):
+            row = int(members[pos])
+            track_id = self.track_ids[row]
+            if track_id in exclude or track_id in seen:
+                continue
+            seen.add(track_id)
+            rows.append(row)
+            if len(rows) == k:
+                break
+        return rows
@@ -0,0 +1,581 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .catalog_index import sort_track_ids
+from .fileutils import atomic_write, file_lock
+from .model_store import dataset_fingerprint
+
+# Incrementar cuando cambie el formato en disco
+STORE_VERSION = 2
+META_FILE = "catalog.json"
+
+REQUIRED_COLUMNS = ['tempo', 'energy', 'track_id', 'track_name', 'artists']
+
+# Columnas que se leen directamente como float32 al parsear el CSV
+FLOAT32_COLUMNS = ['tempo', 'energy']
+
+# Tamaño de los tramos al copiar texto al .npy final en CatalogWriter
+COPY_CHUNK_BYTES = 64 * 1024 * 1024
+
+# track_id ordenados (y su fila) guardados junto a las columnas para buscar con np.searchsorted
+SORTED_IDS_FILES = {"keys": "track_id.keys.npy", "rows": "track_id.rows.npy"}
+
+
+def read_catalog_csv(path):
+    """
+    Lee el CSV del catálogo. Retorna un DataFrame vacío si faltan columnas requeridas.
+    """
+    raw_columns = pd.read_csv(path, nrows=0).columns
+    dtype = {raw: "float32" for raw in raw_columns if raw.strip() in FLOAT32_COLUMNS}
+    music_db = pd.read_csv(path, dtype=dtype)
+    music_db.columns = music_db.columns.str.strip()
+
+    # Asegurar que existan las columnas requeridas
+    missing = [c for c in REQUIRED_COLUMNS if c not in music_db.columns]
+    if missing:
+        print(f"Warning: Missing columns {missing} in dataset. Using empty DB.")
+        return pd.DataFrame()
+    return music_db
+
+
+class StringColumn:
+    """
+    Columna de texto guardada como un único bloque UTF-8 más un arreglo de
+    offsets. Ambos arreglos se pueden memory-mapear, así que los workers
+    comparten las páginas en lugar de tener cada uno sus objetos str.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [("" if pd.isna(v) else str(v)).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, blob)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        data = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end].decode("utf-8")
+
+    def to_numpy(self):
+        return np.array(list(self), dtype=object)
+
+    def extend(self, values):
+        """Nueva columna con `values` agregados al final (la original no cambia)."""
+        tail = StringColumn.from_values(values)
+        offsets = np.concatenate([self.offsets, tail.offsets[1:] + self.offsets[-1]])
+        return StringColumn(offsets, np.concatenate([self.blob, tail.blob]))
+
+
+class CategoricalColumn:
+    """
+    Columna de texto con valores repetidos (artistas, género, ids duplicados):
+    cada valor distinto se guarda una sola vez y las filas guardan un código int32.
+    """
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_values(cls, values):
+        codes, uniques = pd.factorize(pd.Series(values).fillna(""), sort=False)
+        return cls(codes.astype(np.int32), StringColumn.from_values(uniques))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.categories[self.codes[i]]
+
+    def __iter__(self):
+        categories = list(self.categories)
+        for code in self.codes.tolist():
+            yield categories[code]
+
+    def to_numpy(self):
+        return pd.Categorical.from_codes(np.asarray(self.codes), self.categories.to_numpy())
+
+    def extend(self, values):
+        """Nueva columna con `values` agregados; los valores nuevos amplían el diccionario."""
+        lookup = {value: code for code, value in enumerate(self.categories)}
+        new_categories = []
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(pd.Series(values).fillna("").astype(str)):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+                new_categories.append(value)
+            codes[i] = code
+        categories = self.categories.extend(new_categories) if new_categories else self.categories
+        return CategoricalColumn(np.concatenate([self.codes, codes]), categories)
+
+
+def _encode_text(values):
+    """Codificación de diccionario si hay repetidos; bloque UTF-8 plano si todos son únicos."""
+    if pd.Series(values).nunique(dropna=False) < len(values):
+        return CategoricalColumn.from_values(values)
+    return StringColumn.from_values(values)
+
+
+def _encode_numeric(series):
+    if pd.api.types.is_float_dtype(series):
+        return series.to_numpy(dtype=np.float32)
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer").to_numpy()
+    return series.to_numpy()
+
+
+def _native(col, i):
+    value = col[i]
+    if isinstance(value, np.floating) and value.dtype == np.float32:
+        # repr más corto del float32 (0.86 en lugar de 0.8600000143051147)
+        return float(str(value))
+    return value.item()
+
+
+def _merge_categorical(cols):
+    # Diccionario común: cada parte solo traduce sus categorías, no sus filas
+    lookup, values, codes = {}, [], []
+    for col in cols:
+        if not isinstance(col, CategoricalColumn):
+            col = CategoricalColumn.from_values(list(col))
+        mapping = np.empty(len(col.categories), dtype=np.int32)
+        for i, value in enumerate(col.categories):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(values)
+                values.append(value)
+            mapping[i] = code
+        codes.append(mapping[np.asarray(col.codes)])
+    return CategoricalColumn(np.concatenate(codes), StringColumn.from_values(values))
+
+
+class ColumnarCatalog:
+    """
+    Catálogo musical en formato columnar tipado: float32 para las
+    características de audio, enteros reducidos, texto con codificación de
+    diccionario (CategoricalColumn) o bloque UTF-8 (StringColumn). Cuando se
+    abre desde disco todas las columnas son memory-maps de solo lectura.
+    """
+
+    def __init__(self, columns, sorted_ids=None):
+        # Diccionario ordenado nombre -> ndarray | StringColumn
+        self.columns = columns
+        # (keys, rows) de track_id ordenados, si el catálogo se abrió desde disco
+        self.sorted_ids = sorted_ids
+
+    @classmethod
+    def from_dataframe(cls, df):
+        columns = {}
+        for name in df.columns:
+            series = df[name]
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                columns[name] = _encode_numeric(series)
+            else:
+                columns[name] = _encode_text(series.to_numpy())
+        return cls(columns)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __len__(self):
+        if not self.columns:
+            return 0
+        return len(next(iter(self.columns.values())))
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def column(self, name):
+        return self.columns[name]
+
+    def numeric(self, names):
+        """Matriz (n, len(names)) con las columnas numéricas pedidas."""
+        return np.column_stack([np.asarray(self.columns[name], dtype=float) for name in names])
+
+    def row(self, i, names=None):
+        """
+        Materializa una sola fila como dict de tipos nativos de Python; con
+        `names` solo se leen esas columnas.
+        """
+        names = self.columns if names is None else names
+        return {
+            name: col[i] if isinstance(col, (StringColumn, CategoricalColumn)) else _native(col, i)
+            for name, col in ((name, self.columns[name]) for name in names)
+        }
+
+    def append_dataframe(self, df):
+        """
+        Retorna un nuevo catálogo con las filas de `df` agregadas al final,
+        conservando el esquema y los tipos actuales. Las columnas ausentes en
+        `df` se rellenan (NaN / 0 / "") y las desconocidas se ignoran. El
+        catálogo original (posiblemente memory-mapped) no se modifica.
+        """
+        columns = {}
+        for name, col in self.columns.items():
+            if isinstance(col, (StringColumn, CategoricalColumn)):
+                values = df[name].to_numpy() if name in df else np.full(len(df), "", dtype=object)
+                columns[name] = col.extend(values)
+            else:
+                default = np.nan if np.issubdtype(col.dtype, np.floating) else 0
+                values = df[name].to_numpy() if name in df else np.full(len(df), default)
+                columns[name] = np.concatenate([col, np.asarray(values).astype(col.dtype)])
+        return ColumnarCatalog(columns)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Une catálogos con las mismas columnas (p. ej. bloques generados por
+        partes). Las columnas de texto se unen con un diccionario común si
+        alguna parte es categórica.
+        """
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls({})
+        columns = {}
+        for name, first in parts[0].columns.items():
+            cols = [part.columns[name] for part in parts]
+            if any(isinstance(col, CategoricalColumn) for col in cols):
+                columns[name] = _merge_categorical(cols)
+            elif isinstance(first, StringColumn):
+                offsets = [first.offsets]
+                total = first.offsets[-1]
+                for col in cols[1:]:
+                    offsets.append(col.offsets[1:] + total)
+                    total += col.offsets[-1]
+                columns[name] = StringColumn(np.concatenate(offsets), np.concatenate([col.blob for col in cols]))
+            else:
+                columns[name] = np.concatenate(cols)
+        return cls(columns)
+
+    def to_dataframe(self):
+        return pd.DataFrame({
+            name: col.to_numpy() if isinstance(col, (StringColumn, CategoricalColumn)) else np.asarray(col)
+            for name, col in self.columns.items()
+        })
+
+    def save(self, directory, fingerprint):
+        """
+        Escribe cada columna como .npy y al final el archivo de metadatos; un
+        catálogo solo es válido cuando sus metadatos existen.
+        """
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+        layout = []
+        for i, (name, col) in enumerate(self.columns.items()):
+            if isinstance(col, StringColumn):
+                files = {"offsets": f"col{i}.offsets.npy", "blob": f"col{i}.blob.npy"}
+                arrays = {"offsets": col.offsets, "blob": col.blob}
+                layout.append({"name": name, "kind": "string", "files": files})
+            elif isinstance(col, CategoricalColumn):
+                files = {"codes": f"col{i}.codes.npy", "offsets": f"col{i}.offsets.npy", "blob": f"col{i}.blob.npy"}
+                arrays = {"codes": col.codes, "offsets": col.categories.offsets, "blob": col.categories.blob}
+                layout.append({"name": name, "kind": "categorical", "files": files})
+            else:
+                files = {"values": f"col{i}.npy"}
+                arrays = {"values": col}
+                layout.append({"name": name, "kind": "numeric", "files": files})
+            for key, filename in files.items():
+                atomic_write(os.path.join(directory, filename), lambda p, a=arrays[key]: _save_npy(p, a))
+
+        meta = {"version": STORE_VERSION, "rows": len(self), "dataset": fingerprint, "columns": layout}
+        if "track_id" in self.columns:
+            meta["sorted_ids"] = _save_sorted_ids(directory, self.columns["track_id"])
+
+        def write_meta(p):
+            with open(p, "w") as f:
+                json.dump(meta, f, indent=2)
+
+        atomic_write(meta_path, write_meta)
+
+    @staticmethod
+    def stored_fingerprint(directory):
+        """Huella del dataset con la que se generó el catálogo guardado (o None)."""
+        try:
+            with open(os.path.join(directory, META_FILE)) as f:
+                return json.load(f).get("dataset")
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def open(cls, directory, fingerprint=None):
+        """
+        Abre un catálogo guardado con memory-mapping de solo lectura. Retorna
+        None si no existe o si no corresponde a la huella del dataset dada.
+        """
+        try:
+            with open(os.path.join(directory, META_FILE)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != STORE_VERSION:
+            return None
+        if fingerprint is not None and (meta.get("dataset") or {}).get("sha256") != fingerprint.get("sha256"):
+            return None
+
+        sorted_ids = None
+        if meta.get("sorted_ids"):
+            files = meta["sorted_ids"]
+            sorted_ids = (_load_npy(os.path.join(directory, files["keys"])), _load_npy(os.path.join(directory, files["rows"])))
+        return cls(_open_columns(directory, meta["columns"]), sorted_ids)
+
+
+def _open_columns(directory, layout):
+    columns = {}
+    for entry in layout:
+        arrays = {key: _load_npy(os.path.join(directory, filename)) for key, filename in entry["files"].items()}
+        if entry["kind"] == "string":
+            columns[entry["name"]] = StringColumn(arrays["offsets"], arrays["blob"])
+        elif entry["kind"] == "categorical":
+            columns[entry["name"]] = CategoricalColumn(arrays["codes"], StringColumn(arrays["offsets"], arrays["blob"]))
+        else:
+            columns[entry["name"]] = arrays["values"]
+    return columns
+
+
+def _save_sorted_ids(directory, track_ids):
+    """Escribe los track_id ordenados y su fila; retorna la entrada de metadatos."""
+    keys, rows = sort_track_ids(track_ids)
+    for key, array in (("keys", keys), ("rows", rows)):
+        atomic_write(os.path.join(directory, SORTED_IDS_FILES[key]), lambda p, a=array: _save_npy(p, a))
+    return dict(SORTED_IDS_FILES)
+
+
+class CatalogWriter:
+    """
+    Escribe un catálogo de `rows` filas bloque a bloque, sin tenerlo nunca
+    completo en memoria: las columnas de tamaño fijo (numéricas, offsets y
+    códigos) son .npy memory-mapped dimensionados desde el inicio, y el texto
+    se va anexando a un archivo temporal. El esquema (numérica, texto plano o
+    categórica) se decide con el primer bloque. Mismo formato que `save`.
+    """
+
+    def __init__(self, directory, rows):
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        self.directory = directory
+        self.rows = rows
+        self.written = 0
+        self.columns = None
+
+    def write(self, df):
+        if self.columns is None:
+            self.columns = [
+                _column_writer(self.directory, i, name, df[name], self.rows) for i, name in enumerate(df.columns)
+            ]
+        if self.written + len(df) > self.rows:
+            raise ValueError(f"Catalog writer sized for {self.rows} rows")
+        for writer in self.columns:
+            writer.write(df[writer.name].to_numpy(), self.written)
+        self.written += len(df)
+
+    def close(self, fingerprint):
+        """Cierra las columnas, escribe los metadatos y retorna el catálogo abierto."""
+        if self.written != self.rows:
+            raise ValueError(f"Catalog writer got {self.written} of {self.rows} rows")
+        layout = [writer.finish() for writer in self.columns or []]
+        meta = {"version": STORE_VERSION, "rows": self.rows, "dataset": fingerprint, "columns": layout}
+        columns = _open_columns(self.directory, layout)
+        if "track_id" in columns:
+            meta["sorted_ids"] = _save_sorted_ids(self.directory, columns["track_id"])
+
+        def write_meta(p):
+            with open(p, "w") as f:
+                json.dump(meta, f, indent=2)
+
+        atomic_write(os.path.join(self.directory, META_FILE), write_meta)
+        return ColumnarCatalog.open(self.directory, fingerprint)
+
+    def abort(self):
+        for writer in self.columns or []:
+            writer.abort()
+
+
+def _column_writer(directory, i, name, first, rows):
+    if pd.api.types.is_numeric_dtype(first) or pd.api.types.is_bool_dtype(first):
+        # Los enteros no se reducen: un bloque posterior podría no caber en el tipo del primero
+        dtype = np.int64 if pd.api.types.is_integer_dtype(first) else _encode_numeric(first).dtype
+        return _NumericWriter(directory, i, name, dtype, rows)
+    if isinstance(_encode_text(first.to_numpy()), CategoricalColumn):
+        return _CategoricalWriter(directory, i, name, rows)
+    return _StringWriter(directory, i, name, rows)
+
+
+class _ColumnFileWriter:
+    """Archivos temporales de una columna; se renombran a su nombre final en `finish`."""
+
+    def __init__(self, directory, i, name):
+        self.directory = directory
+        self.prefix = f"col{i}"
+        self.name = name
+        self.tmp_paths = {}
+
+    def _tmp(self, filename):
+        path = os.path.join(self.directory, filename)
+        self.tmp_paths[filename] = f"{path}.tmp.{os.getpid()}"
+        return self.tmp_paths[filename]
+
+    def _memmap(self, filename, dtype, length):
+        path = self._tmp(filename)
+        if length == 0:
+            # Un memory-map no puede tener largo cero
+            _save_npy(path, np.zeros(0, dtype=dtype))
+            return np.zeros(0, dtype=dtype)
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(length,))
+
+    def _commit(self, kind, files):
+        for filename, tmp_path in self.tmp_paths.items():
+            os.replace(tmp_path, os.path.join(self.directory, filename))
+        self.tmp_paths = {}
+        return {"name": self.name, "kind": kind, "files": files}
+
+    def abort(self):
+        for tmp_path in self.tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class _NumericWriter(_ColumnFileWriter):
+    def __init__(self, directory, i, name, dtype, rows):
+        super().__init__(directory, i, name)
+        self.filename = f"{self.prefix}.npy"
+        self.values = self._memmap(self.filename, dtype, rows)
+
+    def write(self, values, start):
+        self.values[start:start + len(values)] = values
+
+    def finish(self):
+        if isinstance(self.values, np.memmap):
+            self.values.flush()
+        self.values = None
+        return self._commit("numeric", {"values": self.filename})
+
+
+class _StringWriter(_ColumnFileWriter):
+    def __init__(self, directory, i, name, rows):
+        super().__init__(directory, i, name)
+        self.files = {"offsets": f"{self.prefix}.offsets.npy", "blob": f"{self.prefix}.blob.npy"}
+        self.offsets = self._memmap(self.files["offsets"], np.int64, rows + 1)
+        self.blob_path = self._tmp(self.files["blob"])
+        self.raw_path = f"{self.blob_path}.raw"
+        self.raw = open(self.raw_path, "wb")
+        self.total = 0
+
+    def write(self, values, start):
+        col = StringColumn.from_values(values)
+        self.offsets[start + 1:start + 1 + len(col)] = col.offsets[1:] + self.total
+        self.raw.write(col.blob.tobytes())
+        self.total += int(col.offsets[-1])
+
+    def finish(self):
+        self.raw.close()
+        if isinstance(self.offsets, np.memmap):
+            self.offsets.flush()
+        self.offsets = None
+        # El bloque UTF-8 se copia al .npy final por tramos (memoria acotada)
+        if self.total == 0:
+            _save_npy(self.blob_path, np.zeros(0, dtype=np.uint8))
+        else:
+            blob = np.lib.format.open_memmap(self.blob_path, mode="w+", dtype=np.uint8, shape=(self.total,))
+            with open(self.raw_path, "rb") as raw:
+                position = 0
+                while position < self.total:
+                    position += raw.readinto(memoryview(blob[position:position + COPY_CHUNK_BYTES]))
+            blob.flush()
+            del blob
+        os.remove(self.raw_path)
+        return self._commit("string", self.files)
+
+    def abort(self):
+        self.raw.close()
+        if os.path.exists(self.raw_path):
+            os.remove(self.raw_path)
+        super().abort()
+
+
+class _CategoricalWriter(_ColumnFileWriter):
+    def __init__(self, directory, i, name, rows):
+        super().__init__(directory, i, name)
+        self.files = {
+            "codes": f"{self.prefix}.codes.npy",
+            "offsets": f"{self.prefix}.offsets.npy",
+            "blob": f"{self.prefix}.blob.npy",
+        }
+        self.codes = self._memmap(self.files["codes"], np.int32, rows)
+        # Diccionario común (solo los valores distintos quedan en memoria)
+        self.lookup, self.values = {}, []
+
+    def write(self, values, start):
+        codes, uniques = pd.factorize(pd.Series(values).fillna(""), sort=False)
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            value = str(value)
+            code = self.lookup.get(value)
+            if code is None:
+                code = self.lookup[value] = len(self.values)
+                self.values.append(value)
+            mapping[i] = code
+        self.codes[start:start + len(codes)] = mapping[codes]
+
+    def finish(self):
+        if isinstance(self.codes, np.memmap):
+            self.codes.flush()
+        self.codes = None
+        categories = StringColumn.from_values(self.values)
+        _save_npy(self._tmp(self.files["offsets"]), categories.offsets)
+        _save_npy(self._tmp(self.files["blob"]), categories.blob)
+        return self._commit("categorical", self.files)
+
+
+def _save_npy(path, array):
+    # np.save agrega ".npy" si falta; se escribe por file handle para respetar el nombre temporal
+    with open(path, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+
+
+def _load_npy(path):
+    return np.load(path, mmap_mode="r")
+
+
+def ingest_csv(csv_path, directory, fingerprint=None):
+    """
+    Paso único de ingesta: convierte el CSV del catálogo al formato columnar
+    binario y lo retorna abierto con memory-mapping. El llamador debe tener
+    el file_lock del directorio si hay otros procesos usándolo.
+    """
+    fingerprint = fingerprint or dataset_fingerprint(csv_path, ColumnarCatalog.stored_fingerprint(directory))
+    ColumnarCatalog.from_dataframe(read_catalog_csv(csv_path)).save(directory, fingerprint)
+    return ColumnarCatalog.open(directory, fingerprint)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte dataset.csv al catálogo columnar binario.")
+    parser.add_argument("csv_path")
+    parser.add_argument("catalog_dir")
+    args = parser.parse_args()
+    with file_lock(args.catalog_dir):
+        catalog = ingest_csv(args.csv_path, args.catalog_dir)
+    print(f"Catalog with {len(catalog)} tracks written to {args.catalog_dir}")
@@ -0,0 +1,148 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+# Modos de entrenamiento del clustering:
+#   full      -> K-Means completo sobre todo el catálogo (comportamiento original)
+#   minibatch -> MiniBatchKMeans con partial_fit sobre bloques del catálogo
+#   sampled   -> K-Means completo sobre una muestra aleatoria y asignación por bloques
+#   auto      -> full hasta AUTO_FULL_LIMIT canciones, sampled por encima
+CLUSTERING_MODES = ("auto", "full", "minibatch", "sampled")
+AUTO_FULL_LIMIT = 200_000
+
+CHUNK_SIZE = 65_536
+SAMPLE_SIZE = 100_000
+MINIBATCH_SIZE = 4096
+# Pasos de partial_fit mínimos; catálogos chicos se recorren varias veces
+MIN_MINIBATCH_STEPS = 50
+
+
+def resolve_mode(mode, n_rows):
+    if mode not in CLUSTERING_MODES:
+        raise ValueError(f"Unknown clustering mode {mode!r}; expected one of {CLUSTERING_MODES}")
+    if mode == "auto":
+        return "full" if n_rows <= AUTO_FULL_LIMIT else "sampled"
+    return mode
+
+
+def _chunk_bounds(n_rows, chunk_size):
+    return [(start, min(start + chunk_size, n_rows)) for start in range(0, n_rows, chunk_size)]
+
+
+def _chunk(columns, start, end):
+    # Solo se materializa el bloque pedido; las columnas pueden ser memory-maps
+    return np.column_stack([np.asarray(col[start:end], dtype=float) for col in columns])
+
+
+def _n_workers(n_jobs):
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def assign_clusters(columns, scaler, centers, chunk_size=CHUNK_SIZE, n_jobs=None):
+    """
+    Etiqueta de centroide más cercano para cada fila, calculada por bloques
+    en paralelo (las operaciones de numpy liberan el GIL).
+    """
+    n_rows = len(columns[0])
+    labels = np.empty(n_rows, dtype=np.int32)
+
+    def assign(bounds):
+        start, end = bounds
+        scaled = scaler.transform(_chunk(columns, start, end))
+        distances = ((scaled[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels[start:end] = distances.argmin(axis=1)
+
+    with ThreadPoolExecutor(max_workers=_n_workers(n_jobs)) as pool:
+        list(pool.map(assign, _chunk_bounds(n_rows, chunk_size)))
+    return labels
+
+
+def _streamed_scaler(columns, chunk_size):
+    scaler = StandardScaler()
+    for start, end in _chunk_bounds(len(columns[0]), chunk_size):
+        scaler.partial_fit(_chunk(columns, start, end))
+    return scaler
+
+
+def _fit_minibatch(columns, params, chunk_size, rng):
+    scaler = _streamed_scaler(columns, chunk_size)
+    kmeans = MiniBatchKMeans(
+        n_clusters=params["n_clusters"],
+        random_state=params.get("random_state"),
+        batch_size=MINIBATCH_SIZE,
+        n_init=params.get("n_init", 3),
+    )
+    n_rows = len(columns[0])
+    bounds = _chunk_bounds(n_rows, chunk_size)
+    epochs = max(1, -(-MIN_MINIBATCH_STEPS // -(-n_rows // MINIBATCH_SIZE)))
+    for _ in range(epochs):
+        # Bloques en orden aleatorio, y cada bloque en mini-lotes barajados
+        for i in rng.permutation(len(bounds)):
+            scaled = scaler.transform(_chunk(columns, *bounds[i]))[rng.permutation(bounds[i][1] - bounds[i][0])]
+            for start in range(0, len(scaled), MINIBATCH_SIZE):
+                kmeans.partial_fit(scaled[start:start + MINIBATCH_SIZE])
+    return scaler, kmeans
+
+
+def _fit_sampled(columns, params, sample_size, rng):
+    n_rows = len(columns[0])
+    if n_rows > sample_size:
+        rows = np.sort(rng.choice(n_rows, size=sample_size, replace=False))
+        sample = np.column_stack([np.asarray(col[rows], dtype=float) for col in columns])
+    else:
+        sample = _chunk(columns, 0, n_rows)
+    scaler = StandardScaler().fit(sample)
+    kmeans = KMeans(**params).fit(scaler.transform(sample))
+    return scaler, kmeans
+
+
+def _inertia(columns, scaler, centers, labels, chunk_size):
+    total = 0.0
+    for start, end in _chunk_bounds(len(labels), chunk_size):
+        scaled = scaler.transform(_chunk(columns, start, end))
+        total += float(((scaled - centers[labels[start:end]]) ** 2).sum())
+    return total
+
+
+def fit_clusters(columns, params, mode="full", chunk_size=CHUNK_SIZE, sample_size=SAMPLE_SIZE, n_jobs=None):
+    """
+    Ajusta el scaler y el modelo de clustering sobre `columns` (lista de
+    columnas 1-D: tempo y energía) y retorna (scaler, kmeans, clusters, cluster_map).
+    El modo "full" reproduce exactamente el entrenamiento original; los
+    modos "minibatch" y "sampled" recorren el catálogo por bloques, así la
+    memoria no crece con el tamaño del catálogo completo.
+    """
+    n_rows = len(columns[0])
+    mode = resolve_mode(mode, n_rows)
+
+    if mode == "full":
+        features = _chunk(columns, 0, n_rows)
+        scaler = StandardScaler()
+        kmeans = KMeans(**params)
+        clusters = kmeans.fit_predict(scaler.fit_transform(features))
+    else:
+        rng = np.random.default_rng(params.get("random_state"))
+        if mode == "minibatch":
+            scaler, kmeans = _fit_minibatch(columns, params, chunk_size, rng)
+        else:
+            scaler, kmeans = _fit_sampled(columns, params, sample_size, rng)
+        clusters = assign_clusters(columns, scaler, kmeans.cluster_centers_, chunk_size, n_jobs)
+        # Inercia sobre el catálogo completo: la usa la medición de drift
+        kmeans.inertia_ = _inertia(columns, scaler, kmeans.cluster_centers_, clusters, chunk_size)
+
+    # Mapear clusters a zonas basado en tempo promedio
+    cluster_ids = np.unique(clusters)
+    tempos = np.asarray(columns[0], dtype=float)
+    sums = np.bincount(clusters, weights=tempos, minlength=params["n_clusters"])
+    counts = np.bincount(clusters, minlength=params["n_clusters"])
+    mean_tempos = sums[cluster_ids] / counts[cluster_ids]
+    cluster_map = {
+        int(cluster_ids[i]): zone_idx
+        for zone_idx, i in enumerate(np.argsort(mean_tempos, kind="stable"))
+    }
+    return scaler, kmeans, clusters, cluster_map
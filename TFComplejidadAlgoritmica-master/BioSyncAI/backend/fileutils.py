@@ -0,0 +1,39 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+def atomic_write(path, write_fn):
+    """
+    Escribe en un archivo temporal y lo renombra sobre `path`, de modo que
+    otros procesos nunca ven un archivo a medio escribir.
+    """
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def file_lock(directory, name=".lock"):
+    """
+    Bloqueo exclusivo entre procesos (p. ej. workers de uvicorn) sobre un
+    archivo dentro de `directory`. Solo un proceso construye los artefactos
+    compartidos; los demás esperan y luego los cargan.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -1,56 +1,351 @@
 import pandas as pd
 import numpy as np
 import os
-from sklearn.cluster import KMeans
+import random
+import threading
+import time
 from sklearn.neural_network import MLPClassifier
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
+
+from .catalog_index import CatalogIndex
+from .clustering import fit_clusters, resolve_mode
+from .catalog_store import REQUIRED_COLUMNS, ColumnarCatalog, ingest_csv, read_catalog_csv
+from .fileutils import file_lock
+from .metrics import DISABLED
+from .model_store import ModelStore, dataset_fingerprint
+from .nearest_index import TempoEnergyIndex
+from .sentiment import analyze_sentiment
+from .zone_table import ZoneLookupTable
+
+# Parámetros de entrenamiento; forman parte de la huella de los modelos guardados
+TRAINING_PARAMS = {
+    "clustering": {"n_clusters": 4, "random_state": 42, "n_init": 10},
+    "zone_classifier": {"n_estimators": 10, "random_state": 42},
+    "fatigue_model": {"hidden_layer_sizes": (10, 5), "max_iter": 1000, "random_state": 42},
+}
+
+ZONES = ["Rest/Warmup", "Fat Burn", "Cardio", "Peak Performance"]
+
+# Edad asumida para la demo
+DEFAULT_AGE = 25
+
+# Modo "nearest": vecinos considerados y BPM que mueve cada punto de sentimiento
+NEAREST_K = 10
+SENTIMENT_TEMPO_STEP = 10
+
+# Cola de próximas canciones: muestras usadas para estimar la tendencia del RC
+# y cuántas muestras hacia adelante se proyecta
+TREND_WINDOW = 5
+TREND_HORIZON = 5
+QUEUE_LENGTH = 5
+
+# Ingesta incremental: se programa un reajuste completo del clustering cuando la
+# distancia cuadrática media de las canciones nuevas a su centroide supera
+# DRIFT_THRESHOLD veces la del entrenamiento. El drift solo cuenta con al menos
+# MIN_DRIFT_TRACKS canciones nuevas y MIN_DRIFT_FRACTION del catálogo, para que
+# unas pocas canciones atípicas no disparen un reajuste completo
+DRIFT_THRESHOLD = 1.5
+MIN_DRIFT_TRACKS = 100
+MIN_DRIFT_FRACTION = 0.01
+
+# Funciones de activación para la pasada directa del MLP de fatiga
+ACTIVATIONS = {
+    "identity": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "logistic": lambda x: 1.0 / (1.0 + np.exp(-x)),
+}
+
+class CatalogState:
+    """
+    Instantánea inmutable del catálogo, sus clusters y los índices derivados.
+    La ingesta y el reajuste construyen una nueva y la publican con una sola
+    asignación; los lectores toman `logic.state` una vez por petición, así
+    nunca ven un catálogo de un estado con índices o clusters de otro.
+    """
+
+    __slots__ = ("catalog", "clusters", "catalog_index", "zone_to_cluster", "nearest_index")
+
+    def __init__(self, catalog, clusters, catalog_index=None, zone_to_cluster=None, nearest_index=None):
+        self.catalog = catalog
+        self.clusters = clusters
+        self.catalog_index = catalog_index
+        self.zone_to_cluster = zone_to_cluster or {}
+        self.nearest_index = nearest_index
+
 
 class BioSyncLogic:
-    def __init__(self, music_db_path=None):
-        # Cargar el conjunto de datos
-        if music_db_path and os.path.exists(music_db_path):
-            self.music_db = pd.read_csv(music_db_path)
-            self.music_db.columns = self.music_db.columns.str.strip()
+    def __init__(self, music_db_path=None, model_dir=None, use_zone_table=True, catalog_dir=None,
+                 clustering_mode="auto", clustering_options=None, metrics=None):
+        # Si es False, determine_zone_ai consulta siempre el Random Forest en vivo
+        self.use_zone_table = use_zone_table
+        # Tiempos por etapa y de carga/entrenamiento (ver backend/metrics.py)
+        self.metrics = metrics or DISABLED
+
+        # Cargar el conjunto de datos (formato columnar; memory-mapped si hay catalog_dir)
+        start = time.perf_counter()
+        self.state = CatalogState(self._load_catalog(music_db_path, catalog_dir), np.empty(0, dtype=int))
+        self.metrics.catalog_load_seconds.set(time.perf_counter() - start)
+        self.metrics.catalog_tracks.set_function(lambda: len(self.catalog))
+
+        # Modo de entrenamiento del clustering (ver backend/clustering.py); el
+        # modo efectivo forma parte de los parámetros guardados con los modelos
+        self.clustering_options = dict(clustering_options or {}, mode=clustering_mode)
+        strategy = dict(self.clustering_options, mode=resolve_mode(clustering_mode, len(self.catalog)))
+        training_params = dict(TRAINING_PARAMS, clustering_strategy=strategy)
+
+        # Reutilizar modelos guardados si el dataset y los parámetros no cambiaron.
+        # El bloqueo hace que, con varios workers, solo uno entrene y el resto cargue.
+        self.model_store = ModelStore(model_dir) if model_dir else None
+        if self.model_store:
+            dataset_path = music_db_path if not self.catalog.empty else None
+            with file_lock(model_dir):
+                manifest = self.model_store.build_manifest(dataset_path, training_params, self.dataset_fingerprint)
+                artifacts = self.model_store.load(manifest)
+                if artifacts and len(artifacts.get("clusters", ())) == len(self.catalog):
+                    start = time.perf_counter()
+                    self._restore_models(artifacts)
+                    self.metrics.model_load_seconds.set(time.perf_counter() - start)
+                else:
+                    self._train_models()
+                    self.model_store.save(manifest, self._export_models())
         else:
-            self.music_db = pd.DataFrame()
-
-        # Asegurar que existan las columnas requeridas
-        required_columns = ['tempo', 'energy', 'track_id', 'track_name', 'artists']
-        if not self.music_db.empty:
-            missing = [c for c in required_columns if c not in self.music_db.columns]
-            if missing:
-                print(f"Warning: Missing columns {missing} in dataset. Using empty DB.")
-                self.music_db = pd.DataFrame()
-        
+            self._train_models()
+
+        self._rng = random.Random()
+        self._update_lock = threading.Lock()
+        self._refit_thread = None
+        self.state = self._build_state(self.catalog, self.clusters)
+        self._reset_drift()
+
+    def _load_catalog(self, music_db_path, catalog_dir):
+        """
+        Carga el catálogo. Con `catalog_dir` se usa el formato columnar binario
+        (ver `python -m backend.catalog_store`), abierto con memory-mapping de
+        solo lectura y compartido entre procesos; si no existe o no corresponde
+        al CSV, se convierte una sola vez. Sin catálogo binario se lee el CSV.
+        """
+        self.dataset_fingerprint = None
+        has_csv = bool(music_db_path) and os.path.exists(music_db_path)
+
+        if catalog_dir:
+            with file_lock(catalog_dir):
+                stored = ColumnarCatalog.stored_fingerprint(catalog_dir)
+                # Sin CSV (despliegue solo con el binario) se confía en el catálogo guardado
+                fingerprint = dataset_fingerprint(music_db_path, stored) if has_csv else stored
+                catalog = ColumnarCatalog.open(catalog_dir, fingerprint)
+                if catalog is None and has_csv:
+                    catalog = ingest_csv(music_db_path, catalog_dir, fingerprint)
+            if catalog is not None:
+                self.dataset_fingerprint = fingerprint
+                return catalog
+
+        if not has_csv:
+            return ColumnarCatalog({})
+        # Respaldo: parsear el CSV en memoria
+        return ColumnarCatalog.from_dataframe(read_catalog_csv(music_db_path))
+
+    # Vistas de solo lectura del estado publicado (ver CatalogState)
+
+    @property
+    def catalog(self):
+        return self.state.catalog
+
+    @property
+    def clusters(self):
+        return self.state.clusters
+
+    @property
+    def catalog_index(self):
+        return self.state.catalog_index
+
+    @property
+    def zone_to_cluster(self):
+        return self.state.zone_to_cluster
+
+    @property
+    def nearest_index(self):
+        return self.state.nearest_index
+
+    @property
+    def music_db(self):
+        """
+        Vista DataFrame del catálogo con la columna de cluster. Es una copia;
+        el servicio trabaja directamente sobre las columnas.
+        """
+        state = self.state
+        music_db = state.catalog.to_dataframe()
+        if len(music_db) and len(state.clusters) == len(music_db):
+            music_db['cluster'] = state.clusters
+        return music_db
+
+    def _build_state(self, catalog, clusters):
+        """
+        Construye el estado completo para `catalog` y `clusters`: el índice de
+        candidatos por cluster, el mapa zona -> cluster y el KD-tree de
+        tempo/energía para el modo "nearest". No lo publica.
+        """
+        if catalog.empty:
+            return CatalogState(catalog, clusters, CatalogIndex(np.empty(0, dtype=int), []))
+        return CatalogState(
+            catalog, clusters,
+            CatalogIndex(clusters, catalog.column('track_id'), catalog.sorted_ids),
+            {level: cluster_id for cluster_id, level in self.cluster_map.items()},
+            TempoEnergyIndex(self.scaler, catalog.numeric(['tempo', 'energy'])),
+        )
+
+    def _train_models(self):
         # --- IA 1: Aprendizaje No Supervisado (Clustering) ---
-        if not self.music_db.empty:
-            self._train_clustering_model()
+        if not self.catalog.empty:
+            self._timed_training("clustering", self._train_clustering_model)
             
         # --- IA 2: Aprendizaje Supervisado (Clasificación de Zona) ---
-        self._train_zone_classifier()
+        self._timed_training("zone_classifier", self._train_zone_classifier)
             
         # --- IA 3: Deep Learning (Predicción de Fatiga) ---
-        self._train_fatigue_model()
+        self._timed_training("fatigue_model", self._train_fatigue_model)
+
+    def _timed_training(self, model, train):
+        start = time.perf_counter()
+        train()
+        self.metrics.model_training_seconds.set(time.perf_counter() - start, model)
+
+    def _export_models(self):
+        return {
+            "scaler": getattr(self, "scaler", None),
+            "kmeans": getattr(self, "kmeans", None),
+            "cluster_map": getattr(self, "cluster_map", None),
+            "clusters": self.clusters,
+            "zone_classifier": self.zone_classifier,
+            "fatigue_model": self.fatigue_model,
+        }
+
+    def _restore_models(self, artifacts):
+        if not self.catalog.empty:
+            self.scaler = artifacts["scaler"]
+            self.kmeans = artifacts["kmeans"]
+            self.cluster_map = artifacts["cluster_map"]
+            self.state = CatalogState(self.catalog, artifacts["clusters"])
+        self.zone_classifier = artifacts["zone_classifier"]
+        self._compile_zone_table()
+        self.fatigue_model = artifacts["fatigue_model"]
 
     def _train_clustering_model(self):
         """
         Usa K-Means para agrupar canciones en 4 clusters basados en Tempo y Energía.
         """
-        features = self.music_db[['tempo', 'energy']]
-        self.scaler = StandardScaler()
-        features_scaled = self.scaler.fit_transform(features)
-        
-        self.kmeans = KMeans(n_clusters=4, random_state=42, n_init=10)
-        self.music_db['cluster'] = self.kmeans.fit_predict(features_scaled)
-        
-        # Mapear clusters a zonas basado en tempo promedio
-        cluster_tempos = self.music_db.groupby('cluster')['tempo'].mean().sort_values()
-        self.cluster_map = {
-            cluster_id: zone_idx 
-            for zone_idx, cluster_id in enumerate(cluster_tempos.index)
+        catalog = self.catalog
+        self.scaler, self.kmeans, clusters, self.cluster_map = self._fit_clusters([catalog.column('tempo'), catalog.column('energy')])
+        self.state = CatalogState(catalog, clusters)
+
+    def _fit_clusters(self, columns):
+        return fit_clusters(columns, TRAINING_PARAMS["clustering"], **self.clustering_options)
+
+    # --- Ingesta incremental del catálogo ---
+
+    def _reset_drift(self):
+        # Distancia cuadrática media al centroide en el entrenamiento (referencia del drift)
+        kmeans = getattr(self, "kmeans", None)
+        self._baseline_sq_distance = kmeans.inertia_ / max(len(self.clusters), 1) if kmeans is not None else 0.0
+        self._new_sq_distance_sum = 0.0
+        self._new_tracks = 0
+
+    def cluster_drift(self):
+        """
+        Cociente entre la distancia cuadrática media de las canciones agregadas
+        desde el último ajuste a su centroide y la del entrenamiento (0 si no hay nuevas).
+        """
+        if not self._new_tracks or not self._baseline_sq_distance:
+            return 0.0
+        return float(self._new_sq_distance_sum / self._new_tracks / self._baseline_sq_distance)
+
+    def _enough_drift_samples(self):
+        return self._new_tracks >= max(MIN_DRIFT_TRACKS, MIN_DRIFT_FRACTION * len(self.catalog))
+
+    def add_tracks(self, tracks):
+        """
+        Agrega canciones al catálogo sin re-entrenar el K-Means: se asignan al
+        centroide más cercano con el scaler ya ajustado y se agregan a los
+        índices existentes. Si el drift supera DRIFT_THRESHOLD (con suficientes
+        canciones nuevas) se programa un reajuste completo en segundo plano.
+        Retorna un dict con el resumen de la ingesta.
+        """
+        tracks = tracks if isinstance(tracks, pd.DataFrame) else pd.DataFrame(list(tracks))
+        missing = [c for c in REQUIRED_COLUMNS if c not in tracks.columns]
+        if missing:
+            raise ValueError(f"Missing columns {missing} in tracks")
+
+        with self._update_lock:
+            state = self.state
+            if state.catalog.empty:
+                # Sin modelo previo: el primer lote se entrena de forma completa
+                catalog = ColumnarCatalog.from_dataframe(tracks)
+                self.scaler, self.kmeans, clusters, self.cluster_map = self._fit_clusters(
+                    [catalog.column('tempo'), catalog.column('energy')]
+                )
+                self.state = self._build_state(catalog, clusters)
+                self._reset_drift()
+            else:
+                features = tracks[['tempo', 'energy']].to_numpy(dtype=float)
+                features_scaled = state.nearest_index.transform(features)
+                labels = self.kmeans.predict(features_scaled)
+                sq_distances = ((features_scaled - self.kmeans.cluster_centers_[labels]) ** 2).sum(axis=1)
+
+                # Se construye el estado nuevo completo y se publica de una vez
+                catalog = state.catalog.append_dataframe(tracks)
+                catalog_index = state.catalog_index.extend(labels, catalog.column('track_id'))
+                self.state = CatalogState(
+                    catalog, catalog_index.row_cluster, catalog_index,
+                    state.zone_to_cluster, state.nearest_index.add(features),
+                )
+                self._new_sq_distance_sum += float(sq_distances.sum())
+                self._new_tracks += len(tracks)
+
+            drift = self.cluster_drift()
+            refit_scheduled = drift > DRIFT_THRESHOLD and self._enough_drift_samples() and self._schedule_refit()
+
+        return {
+            "added": len(tracks),
+            "catalog_size": len(self.catalog),
+            "drift": drift,
+            "refit_scheduled": refit_scheduled,
         }
 
+    def _schedule_refit(self):
+        if self._refit_thread is not None and self._refit_thread.is_alive():
+            return False
+        # No es daemon: sklearn no debe quedar entrenando mientras el intérprete
+        # se cierra; el lifespan de la API espera el reajuste con wait_for_refit
+        self._refit_thread = threading.Thread(target=self._refit_clusters, name="biosync-refit")
+        self._refit_thread.start()
+        return True
+
+    def _refit_clusters(self):
+        """
+        Reajuste completo del clustering sobre una instantánea del catálogo.
+        Los modelos e índices nuevos se publican de una vez al terminar.
+        """
+        catalog = self.catalog
+        columns = [catalog.column('tempo'), catalog.column('energy')]
+        start = time.perf_counter()
+        scaler, kmeans, clusters, cluster_map = self._fit_clusters(columns)
+        self.metrics.model_training_seconds.set(time.perf_counter() - start, "clustering")
+
+        with self._update_lock:
+            current = self.catalog
+            # Canciones agregadas mientras se entrenaba
+            if len(current) > len(catalog):
+                extra = current.numeric(['tempo', 'energy'])[len(catalog):]
+                clusters = np.concatenate([clusters, kmeans.predict(scaler.transform(extra))])
+            self.scaler, self.kmeans, self.cluster_map = scaler, kmeans, cluster_map
+            self.state = self._build_state(current, clusters)
+            self._reset_drift()
+
+    def wait_for_refit(self, timeout=None):
+        """Espera a que termine el reajuste en segundo plano, si hay uno en curso."""
+        if self._refit_thread is not None:
+            self._refit_thread.join(timeout)
+
     def _train_zone_classifier(self):
         """
         Entrena un Clasificador Random Forest para determinar zonas de entrenamiento.
@@ -76,8 +371,22 @@ class BioSyncLogic:
             X_train.append([np.random.randint(160, 210), 25])
             y_train.append(3)
             
-        self.zone_classifier = RandomForestClassifier(n_estimators=10, random_state=42)
+        self.zone_classifier = RandomForestClassifier(**TRAINING_PARAMS["zone_classifier"])
         self.zone_classifier.fit(X_train, y_train)
+        self._compile_zone_table()
+
+    def _compile_zone_table(self):
+        """
+        Precompila la tabla BPM x edad -> zona. Se llama cada vez que cambia el clasificador.
+        """
+        self.zone_table = ZoneLookupTable(self.zone_classifier)
+
+    def check_zone_table(self):
+        """
+        Verifica que la tabla coincida con el Random Forest en vivo.
+        Retorna la lista de puntos (bpm, edad) inconsistentes.
+        """
+        return self.zone_table.mismatches(self.zone_classifier)
 
     def _train_fatigue_model(self):
         """
@@ -93,132 +402,274 @@ class BioSyncLogic:
         ])
         y_train = np.array([0, 0, 1, 1, 0])
         
-        self.fatigue_model = MLPClassifier(hidden_layer_sizes=(10, 5), max_iter=1000, random_state=42)
+        self.fatigue_model = MLPClassifier(**TRAINING_PARAMS["fatigue_model"])
         self.fatigue_model.fit(X_train, y_train)
 
     def predict_fatigue(self, hr_history):
         if len(hr_history) < 5: return False
-        recent_hr = np.array(hr_history[-5:]).reshape(1, -1)
-        return bool(self.fatigue_model.predict(recent_hr)[0])
+        recent_hr = np.array(hr_history[-5:], dtype=float).reshape(1, -1)
+        return bool(self.predict_fatigue_matrix(recent_hr)[0])
+
+    def predict_fatigue_batch(self, hr_histories):
+        """
+        Predice fatiga para varios historiales con una sola pasada del MLP.
+        Retorna una lista de bool en el mismo orden.
+        """
+        results = [False] * len(hr_histories)
+        ready = [i for i, history in enumerate(hr_histories) if len(history) >= 5]
+        if ready:
+            windows = np.array([hr_histories[i][-5:] for i in ready], dtype=float)
+            predictions = self.predict_fatigue_matrix(windows)
+            for i, prediction in zip(ready, predictions):
+                results[i] = bool(prediction)
+        return results
+
+    def predict_fatigue_matrix(self, windows):
+        """
+        Pasada directa del MLP sobre una matriz (n, 5) de ventanas de RC:
+        una multiplicación de matrices por capa en lugar de `predict` de sklearn.
+        """
+        with self.metrics.stage("fatigue"):
+            model = self.fatigue_model
+            if model.n_outputs_ != 1 or model.out_activation_ != "logistic":
+                return model.predict(windows)
+            activation = ACTIVATIONS[model.activation]
+            hidden = windows
+            for coef, intercept in zip(model.coefs_[:-1], model.intercepts_[:-1]):
+                hidden = activation(hidden @ coef + intercept)
+            logits = hidden @ model.coefs_[-1] + model.intercepts_[-1]
+            # logistic(z) > 0.5  <=>  z > 0
+            return model.classes_[(logits[:, 0] > 0).astype(int)]
 
-    def determine_zone_ai(self, heart_rate):
+    def determine_zone_ai(self, heart_rate, age=DEFAULT_AGE):
         """
         Usa Random Forest para clasificar la zona.
+        Por defecto consulta la tabla precompilada y solo llama al modelo
+        para muestras fuera de la tabla (o si use_zone_table es False).
         """
-        # Asumir edad 25 para demo
-        prediction = self.zone_classifier.predict([[heart_rate, 25]])[0]
-        zones = ["Rest/Warmup", "Fat Burn", "Cardio", "Peak Performance"]
-        return zones[prediction], prediction
+        with self.metrics.stage("zone"):
+            prediction = self.zone_table.lookup(heart_rate, age) if self.use_zone_table else None
+            if prediction is None:
+                prediction = int(self.zone_classifier.predict([[heart_rate, age]])[0])
+            return ZONES[prediction], prediction
+
+    def determine_zones_ai(self, heart_rates, age=DEFAULT_AGE):
+        """
+        Versión por lotes de determine_zone_ai: una sola llamada al modelo
+        para todas las muestras que la tabla no cubre.
+        Retorna la lista de índices de zona en el mismo orden.
+        """
+        with self.metrics.stage("zone_batch"):
+            if self.use_zone_table:
+                zones, valid = self.zone_table.lookup_many(heart_rates, age)
+            else:
+                zones = np.zeros(len(heart_rates), dtype=np.int64)
+                valid = np.zeros(len(heart_rates), dtype=bool)
+            missing = np.flatnonzero(~valid)
+            if len(missing):
+                samples = [[heart_rates[i], age] for i in missing]
+                zones[missing] = self.zone_classifier.predict(samples)
+            return zones.tolist()
 
     def get_target_music_features(self, zone):
-        # Mantener esto para referencia/fallback
+        # Rangos objetivo de tempo y energía por zona (usados por el modo "nearest")
         if zone == "Rest/Warmup": return (60, 100), (0.0, 0.5)
         elif zone == "Fat Burn": return (100, 130), (0.4, 0.7)
         elif zone == "Cardio": return (130, 160), (0.7, 0.9)
         elif zone == "Peak Performance": return (160, 200), (0.8, 1.0)
         return (0, 0), (0, 0)
 
-    def recommend_song(self, heart_rate, current_song_id=None, sentiment_adjustment=0):
+    def get_target_point(self, heart_rate, zone_idx, sentiment_adjustment=0):
+        """
+        Punto objetivo (tempo, energía): el tempo sigue al ritmo cardíaco,
+        desplazado según el sentimiento, y la energía es el centro del rango
+        de la zona ajustada.
+        """
+        target_zone_idx = max(0, min(3, zone_idx + int(sentiment_adjustment)))
+        _, (energy_low, energy_high) = self.get_target_music_features(ZONES[target_zone_idx])
+        tempo = heart_rate + SENTIMENT_TEMPO_STEP * int(sentiment_adjustment)
+        return tempo, (energy_low + energy_high) / 2
+
+    def recommend_song(self, heart_rate, current_song_id=None, sentiment_adjustment=0, mode="cluster", history=None, fields=None):
         """
         Recomienda una canción usando IA (Random Forest + K-Means).
+        Con mode="nearest" se elige entre las canciones más cercanas en
+        tempo/energía al punto objetivo derivado del ritmo cardíaco.
+        Con `history` (SessionHistory) no se repiten las canciones recientes de la sesión.
+        Con `fields` la canción solo incluye esas columnas (ver _song).
         """
         # 1. Determinar Zona con Random Forest
         zone_name, zone_idx = self.determine_zone_ai(heart_rate)
-        
+        if mode == "nearest":
+            song = self.recommend_nearest(heart_rate, zone_idx, current_song_id, sentiment_adjustment, history=history, fields=fields)
+            return song, zone_name
+        return self.recommend_for_zone(zone_idx, current_song_id, sentiment_adjustment, history, fields), zone_name
+
+    def recommend_batch(self, heart_rates, current_song_ids, sentiment_adjustments, modes=None, histories=None, fields=None):
+        """
+        Recomienda canciones para un lote de usuarios clasificando todas las
+        zonas de una vez. Retorna una lista de (canción, zona) en el mismo orden.
+        """
+        zone_idxs = self.determine_zones_ai(heart_rates)
+        modes = modes or ["cluster"] * len(heart_rates)
+        histories = histories or [None] * len(heart_rates)
+        results = []
+        for heart_rate, zone_idx, song_id, adjustment, mode, history in zip(
+            heart_rates, zone_idxs, current_song_ids, sentiment_adjustments, modes, histories
+        ):
+            if mode == "nearest":
+                song = self.recommend_nearest(heart_rate, zone_idx, song_id, adjustment, history=history, fields=fields)
+            else:
+                song = self.recommend_for_zone(zone_idx, song_id, adjustment, history, fields)
+            results.append((song, ZONES[zone_idx]))
+        return results
+
+    def recommend_for_zone(self, zone_idx, current_song_id=None, sentiment_adjustment=0, history=None, fields=None):
+        """
+        Recomienda una canción para un índice de zona ya calculado.
+        """
+        state = self.state
         # 2. Ajustar cluster objetivo basado en Sentimiento (NLP)
         target_zone_idx = max(0, min(3, zone_idx + int(sentiment_adjustment)))
         
         # 3. Mapear a Cluster K-Means
-        target_cluster = None
-        for cluster_id, level in self.cluster_map.items():
-            if level == target_zone_idx:
-                target_cluster = cluster_id
-                break
+        target_cluster = state.zone_to_cluster.get(target_zone_idx)
         
-        # 4. Filtrar por Cluster
-        candidates = self.music_db[self.music_db['cluster'] == target_cluster]
-        
-        if candidates.empty: candidates = self.music_db
-            
-        if current_song_id and len(candidates) > 1:
-            candidates = candidates[candidates['track_id'] != current_song_id]
-            
-        if not candidates.empty:
-            recommended_song = candidates.sample(1).iloc[0].to_dict()
-            if 'artists' in recommended_song and 'artist_name' not in recommended_song:
-                recommended_song['artist_name'] = recommended_song['artists']
-            return recommended_song, zone_name
-        
-        return None, zone_name
+        # 4. Elegir candidato del cluster usando el índice precalculado
+        catalog_index = state.catalog_index
+        with self.metrics.stage("pick"):
+            if history is None:
+                row = catalog_index.pick(target_cluster, current_song_id, self._rng)
+            else:
+                # Con historial: siguiente carta del mazo de la sesión, sin canciones recientes
+                with history.lock:
+                    history.record(current_song_id)
+                    row = history.pick(catalog_index, target_cluster, self._rng)
+                    if row is None:
+                        row = catalog_index.pick(target_cluster, current_song_id, self._rng)
+                    if row is not None:
+                        history.record(catalog_index.track_ids[row])
+        return self._song(row, fields, state)
 
-    def analyze_sentiment(self, message):
+    def recommend_nearest(self, heart_rate, zone_idx, current_song_id=None, sentiment_adjustment=0, k=NEAREST_K, history=None, fields=None):
         """
-        Analiza el sentimiento de un mensaje usando coincidencia avanzada de palabras clave,
-        manejo de negaciones e intensificadores.
-        Retorna: (puntaje_ajuste, etiqueta, respuesta_bot)
+        Elige al azar una de las k canciones más cercanas (KD-tree) al punto
+        objetivo de tempo/energía, excluyendo la canción actual y, si hay
+        `history`, las canciones recientes de la sesión.
         """
-        if not message:
-            return 0, "Neutral", "Esperando tu estado..."
+        state = self.state
+        nearest_index = state.nearest_index
+        if nearest_index is None:
+            return None
+        tempo, energy = self.get_target_point(heart_rate, zone_idx, sentiment_adjustment)
+        track_ids = state.catalog.column('track_id')
 
-        msg = message.lower()
-        
-        # --- Lógica Avanzada de NLP ---
-        # 1. Vocabulario con Pesos
-        keywords = {
-            # Alta Energía / Positivo (+1 a +2)
-            "energía": 2, "fuerte": 2, "tope": 2, "fuego": 2, "máquina": 2, "bestia": 2, "imparable": 2,
-            "feliz": 1, "bien": 1, "vamos": 1, "arriba": 1, "excelente": 1, "genial": 1, "activo": 1,
-            "motivado": 1, "poder": 1, "rápido": 1, "ganas": 1, "dale": 1, "sigue": 1, "adrenalina": 1,
-            "romperla": 2, "duro": 1, "ganar": 1, "fácil": 1, "listo": 1, "go": 1, "volar": 2, "incansable": 2,
-            "explotar": 2, "ritmo": 1, "bass": 1, "sube": 1, "max": 1, "locura": 1,
-            
-            # Baja Energía / Negativo (-1 a -2)
-            "cansado": -2, "agotado": -2, "muerto": -2, "asfixiado": -2, "rendirme": -2, "basta": -2, "duele": -2,
-            "mal": -1, "triste": -1, "bajar": -1, "descanso": -1, "fatiga": -1, "lento": -1, "dolor": -1,
-            "sueño": -1, "pesado": -1, "aburrido": -1, "parar": -1, "no puedo": -2, "aire": -1, "sed": -1,
-            "mareado": -2, "calambre": -2, "flojera": -1, "difícil": -1, "imposible": -1, "calma": -1,
-            "paz": -1, "suave": -1, "dormir": -1, "estrés": -1, "ansiedad": -1, "rodilla": -2, "espalda": -2, "lesión": -2
-        }
-        
-        negations = ["no", "ni", "nunca", "jamás", "sin", "poco"]
-        intensifiers = ["muy", "mucho", "demasiado", "super", "mega", "ultra", "re"]
+        with self.metrics.stage("nearest"):
+            if history is None:
+                # Un vecino extra por si la canción actual está entre los más cercanos
+                rows = nearest_index.query(tempo, energy, k + 1)
+                candidates = [row for row in rows.tolist() if not current_song_id or track_ids[row] != current_song_id][:k]
+                row = self._rng.choice(candidates or rows.tolist())
+            else:
+                with history.lock:
+                    history.record(current_song_id)
+                    # Vecinos extra para cubrir las canciones recientes
+                    rows = nearest_index.query(tempo, energy, k + len(history.recent))
+                    candidates = [row for row in rows.tolist() if track_ids[row] not in history][:k]
+                    row = self._rng.choice(candidates or rows.tolist())
+                    history.record(track_ids[row])
+        return self._song(row, fields, state)
 
-        words = msg.split()
-        score = 0
-        
-        for i, word in enumerate(words):
-            # Limpiar puntuación
-            clean_word = word.strip(".,!¡?¿")
-            
-            if clean_word in keywords:
-                val = keywords[clean_word]
-                
-                # Verificar Negación (mirar atrás 1-2 palabras)
-                is_negated = False
-                if i > 0 and words[i-1] in negations: is_negated = True
-                if i > 1 and words[i-2] in negations: is_negated = True
-                
-                # Verificar Intensificador (mirar atrás 1 palabra)
-                is_intensified = False
-                if i > 0 and words[i-1] in intensifiers: is_intensified = True
-                
-                # Aplicar Lógica
-                if is_negated:
-                    val = -val # Invertir significado ("no cansado" -> positivo)
-                
-                if is_intensified:
-                    val *= 1.5 # Aumentar impacto
-                    
-                score += val
-
-        # Lógica de Decisión
-        if score < -1:
-            return -1, "Negativo Crítico (Bajando Intensidad)", "⚠️ Detecto fatiga o dolor. Bajando al mínimo. ¡Para si es necesario!"
-        elif score < 0:
-            return -1, "Negativo (Bajando Intensidad)", "Tranquilo, respira profundo. Bajamos la intensidad para que te recuperes. 🍃"
-        elif score > 1:
-            return 1, "Positivo Alto (Modo Bestia)", "¡MODO BESTIA ACTIVADO! 🦍🔥 ¡Nadie te para hoy!"
-        elif score > 0:
-            return 1, "Positivo (Subiendo Intensidad)", "¡Esa es la actitud! Subiendo la potencia. 🚀"
+    def heart_rate_trend(self, hr_history, window=TREND_WINDOW, horizon=TREND_HORIZON):
+        """
+        Pendiente (BPM por muestra) de una recta ajustada a las últimas
+        `window` muestras y RC proyectado `horizon` muestras hacia adelante.
+        """
+        recent = np.asarray(hr_history[-window:], dtype=float)
+        if len(recent) < 2:
+            return 0.0, float(recent[-1]) if len(recent) else 0.0
+        slope = float(np.polyfit(np.arange(len(recent)), recent, 1)[0])
+        return slope, float(recent[-1] + slope * horizon)
+
+    def recommend_queue(self, hr_history, current_song_id=None, sentiment_adjustment=0, queue_length=QUEUE_LENGTH, history=None):
+        """
+        Precalcula colas de próximas canciones para la zona actual y las
+        zonas vecinas (una arriba y una abajo), para que el cliente las tenga
+        listas y cambie al instante cuando cambie la zona. `hr_history` son
+        las muestras recientes de RC (la última es la actual). Las colas no
+        se registran en el historial de la sesión: solo excluyen sus
+        canciones recientes.
+        """
+        heart_rate = hr_history[-1]
+        _, zone_idx = self.determine_zone_ai(heart_rate)
+        slope, projected = self.heart_rate_trend(hr_history)
+        # Redondeo para aprovechar la tabla de zonas
+        _, projected_zone_idx = self.determine_zone_ai(int(round(projected)))
+
+        exclude = set(history.recent) if history is not None else set()
+        if current_song_id:
+            exclude.add(current_song_id)
+
+        state = self.state
+        queues = {}
+        for name, offset in (("current", 0), ("up", 1), ("down", -1)):
+            queue_zone_idx = zone_idx + offset
+            if not 0 <= queue_zone_idx < len(ZONES):
+                continue
+            target_zone_idx = max(0, min(3, queue_zone_idx + int(sentiment_adjustment)))
+            rows = state.catalog_index.sample(state.zone_to_cluster.get(target_zone_idx), queue_length, exclude, self._rng)
+            queues[name] = {"zone": ZONES[queue_zone_idx], "songs": [self._song(row, state=state) for row in rows]}
+
+        if projected_zone_idx > zone_idx:
+            likely = "up"
+        elif projected_zone_idx < zone_idx:
+            likely = "down"
         else:
-            return 0, "Neutral", "Estoy monitoreando. Dime 'estoy cansado' o 'vamos' para ajustar."
+            likely = "current"
+        return {
+            "zone": ZONES[zone_idx],
+            "trend": {"slope": slope, "projected_heart_rate": projected, "likely_queue": likely},
+            "queues": queues,
+        }
+
+    def _song(self, row, fields=None, state=None):
+        """
+        Canción de la fila `row` como dict de tipos nativos, más `cluster` y
+        `artist_name`. Con `fields` solo se leen esas columnas del catálogo
+        (y los campos calculados pedidos), en el orden dado. `state` es el
+        estado con el que se eligió la fila (por defecto el publicado).
+        """
+        if row is None:
+            return None
+        state = state or self.state
+        catalog, clusters = state.catalog, state.clusters
+        with self.metrics.stage("song"):
+            if fields is None:
+                recommended_song = catalog.row(row)
+                recommended_song['cluster'] = int(clusters[row])
+                if 'artists' in recommended_song and 'artist_name' not in recommended_song:
+                    recommended_song['artist_name'] = recommended_song['artists']
+                return recommended_song
+
+            recommended_song = catalog.row(row, [name for name in fields if name in catalog])
+            if 'cluster' in fields:
+                recommended_song['cluster'] = int(clusters[row])
+            if 'artist_name' in fields and 'artist_name' not in recommended_song and 'artists' in catalog:
+                recommended_song['artist_name'] = catalog.column('artists')[row]
+            return {name: recommended_song[name] for name in fields if name in recommended_song}
+
+    def analyze_sentiments(self, messages):
+        """
+        Analiza un lote de mensajes; los mensajes repetidos se evalúan una sola vez.
+        """
+        unique = {message: self.analyze_sentiment(message) for message in set(messages)}
+        return [unique[message] for message in messages]
+
+    def analyze_sentiment(self, message):
+        """
+        Analiza el sentimiento de un mensaje usando coincidencia avanzada de palabras clave,
+        manejo de negaciones e intensificadores (ver backend/sentiment.py).
+        Retorna: (puntaje_ajuste, etiqueta, respuesta_bot)
+        """
+        with self.metrics.stage("sentiment"):
+            return analyze_sentiment(message)
@@ -1,68 +1,332 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPBearer
+from pydantic import BaseModel, ConfigDict, Field
+from starlette.concurrency import run_in_threadpool
 import os
+import secrets
 import sys
+import time
 
 # Agregar directorio padre al path para importar logic si es necesario
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.logic import BioSyncLogic
-from data.mock_data_generator import generate_mock_spotify_data
+from backend.fileutils import atomic_write, file_lock
+from backend.logic import QUEUE_LENGTH, BioSyncLogic
+from backend.metrics import Metrics
+from backend.play_history import PlayHistoryStore
+from backend.responses import FastJSONResponse, Recommendation, parse_fields, song_payload
+from backend.sessions import SessionStore
+from backend.streaming import SONG_DURATION_SECONDS, StreamSession
+from data.mock_data_generator import has_mock_catalog, write_mock_spotify_csv
 
-app = FastAPI(title="BioSync AI API", description="API for Adaptive Music Recommendation")
+# Rutas de datos (absolutas: no dependen del directorio de trabajo)
+data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+real_data_path = os.path.join(data_dir, "dataset.csv")
+mock_data_path = os.path.join(data_dir, "spotify_mock.csv")
+# Modelos entrenados persistidos entre arranques
+model_dir = os.path.join(data_dir, "models")
+# Catálogo columnar compartido (memory-mapped) entre workers
+catalog_dir = os.path.join(data_dir, "catalog")
+# Modo de entrenamiento del clustering: auto | full | minibatch | sampled
+clustering_mode = os.environ.get("BIOSYNC_CLUSTERING_MODE", "auto")
 
-# Inicializar Lógica
-# Verificar dataset real primero, luego mock
-real_data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "dataset.csv")
-mock_data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "spotify_mock.csv")
+# Métricas estilo Prometheus en /metrics; BIOSYNC_METRICS=0 las desactiva
+metrics = Metrics(enabled=os.environ.get("BIOSYNC_METRICS", "1") != "0")
 
-if os.path.exists(real_data_path):
-    with open("debug_log.txt", "w") as f:
-        f.write(f"DEBUG: Found real dataset at {real_data_path}\n")
-        f.write(f"DEBUG: File size: {os.path.getsize(real_data_path)}\n")
-    print(f"Loading real dataset from {real_data_path}")
-    logic_engine = BioSyncLogic(music_db_path=real_data_path)
-else:
-    with open("debug_log.txt", "w") as f:
-        f.write(f"DEBUG: Real dataset NOT found at {real_data_path}\n")
-        f.write(f"DEBUG: Current working dir: {os.getcwd()}\n")
-    print("Real dataset not found. Generating mock data...")
-    if not os.path.exists(mock_data_path):
-        df = generate_mock_spotify_data()
-        df.to_csv(mock_data_path, index=False)
-    logic_engine = BioSyncLogic(music_db_path=mock_data_path)
+# Token Bearer de los endpoints /admin; sin él configurado quedan deshabilitados
+admin_token = os.environ.get("BIOSYNC_ADMIN_TOKEN")
+# Máximo de canciones por petición de ingesta
+MAX_ADMIN_TRACKS = 10_000
+# Máximo de muestras por petición a /recommend/batch
+MAX_BATCH_SIZE = 1_000
+admin_bearer = HTTPBearer(auto_error=False)
 
-from typing import Optional
+def require_admin(credentials=Depends(admin_bearer)):
+    if not admin_token:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled (BIOSYNC_ADMIN_TOKEN not set)")
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Missing admin token", headers={"WWW-Authenticate": "Bearer"})
+    if not secrets.compare_digest(credentials.credentials.encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
 
-from typing import Optional, List
+def create_logic_engine():
+    """
+    Inicializa la lógica. Es seguro con varios workers de uvicorn: el dataset
+    mock, el catálogo columnar y los modelos se generan una sola vez bajo
+    bloqueo, y cada worker abre el catálogo en modo solo lectura con
+    memory-mapping, así la memoria no crece con el número de workers.
+    """
+    # Verificar dataset real primero, luego mock
+    if os.path.exists(real_data_path):
+        print(f"Loading real dataset from {real_data_path} ({os.path.getsize(real_data_path)} bytes)")
+        music_db_path = real_data_path
+    elif has_mock_catalog(catalog_dir):
+        # Catálogo generado con `mock_data_generator.py --format catalog`: se abre sin CSV
+        print(f"Real dataset not found at {real_data_path}. Using the generated catalog in {catalog_dir}")
+        music_db_path = None
+    else:
+        print(f"Real dataset not found at {real_data_path}. Using mock data...")
+        with file_lock(data_dir, ".mock.lock"):
+            if not os.path.exists(mock_data_path):
+                atomic_write(mock_data_path, write_mock_spotify_csv)
+        music_db_path = mock_data_path
+    return BioSyncLogic(
+        music_db_path=music_db_path, model_dir=model_dir, catalog_dir=catalog_dir,
+        clustering_mode=clustering_mode, metrics=metrics,
+    )
+
+@asynccontextmanager
+async def lifespan(app):
+    # La carga es bloqueante; se ejecuta fuera del event loop
+    app.state.logic_engine = await run_in_threadpool(create_logic_engine)
+    yield
+    # Esperar un reajuste del clustering en curso antes de liberar el motor
+    await run_in_threadpool(app.state.logic_engine.wait_for_refit)
+
+app = FastAPI(title="BioSync AI API", description="API for Adaptive Music Recommendation", lifespan=lifespan)
+
+def get_logic_engine():
+    return app.state.logic_engine
+
+if metrics.enabled:
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        # Plantilla de la ruta (no la URL) para acotar la cardinalidad de las etiquetas
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.request_duration.observe(time.perf_counter() - start, request.method, path)
+        metrics.requests.inc(request.method, path, str(response.status_code))
+        return response
+
+from typing import Optional, List, Literal
+
+# Historial de RC por sesión guardado en el servidor
+session_store = SessionStore()
+# Canciones recientes por sesión, para no repetirlas
+play_history = PlayHistoryStore()
 
 class BioFeedbackInput(BaseModel):
     heart_rate: int
     current_song_id: Optional[str] = None
     user_message: Optional[str] = None
     hr_history: Optional[List[int]] = []
+    # Con session_id el servidor acumula el historial (hr_history se ignora)
+    # y no repite las canciones recientes de la sesión
+    session_id: Optional[str] = None
+    # "cluster" (K-Means) o "nearest" (vecinos más cercanos en tempo/energía)
+    mode: Literal["cluster", "nearest"] = "cluster"
+
+class QueueInput(BaseModel):
+    heart_rate: int
+    current_song_id: Optional[str] = None
+    user_message: Optional[str] = None
+    hr_history: Optional[List[int]] = []
+    # Con session_id la tendencia usa el historial de RC del servidor
+    session_id: Optional[str] = None
+    queue_length: int = Field(default=QUEUE_LENGTH, ge=1, le=50)
+
+class TrackInput(BaseModel):
+    # Se aceptan columnas extra del catálogo (genre, valence, ...)
+    model_config = ConfigDict(extra="allow")
+
+    track_id: str
+    track_name: str
+    artists: str
+    tempo: float
+    energy: float
+
+def selected_fields(logic_engine, fields, ids_only):
+    """Columnas pedidas en la respuesta (None = todas); 400 si hay campos desconocidos."""
+    if ids_only:
+        return ("track_id",)
+    try:
+        return parse_fields(fields, logic_engine.catalog)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def history_for(item):
+    return play_history.get(item.session_id) if item.session_id else None
+
+def predict_fatigue_for(logic_engine, batch):
+    """
+    Fatiga para un lote: las entradas con sesión usan el ring buffer del
+    servidor y el resto su hr_history; una pasada del MLP por cada grupo.
+    """
+    session_items = [item for item in batch if item.session_id]
+    session_store.append_many([item.session_id for item in session_items], [item.heart_rate for item in session_items])
+    session_risks = session_store.predict_fatigue(logic_engine, [item.session_id for item in session_items])
+
+    stateless = [i for i, item in enumerate(batch) if not item.session_id]
+    stateless_risks = logic_engine.predict_fatigue_batch([batch[i].hr_history or [] for i in stateless])
+
+    risks = [session_risks.get(item.session_id, False) for item in batch]
+    for i, risk in zip(stateless, stateless_risks):
+        risks[i] = risk
+    return risks
 
 @app.get("/")
 def read_root():
     return {"message": "BioSync AI API is running"}
 
-@app.post("/recommend")
-def recommend_music(feedback: BioFeedbackInput):
+@app.get("/metrics")
+def read_metrics():
+    """
+    Métricas en formato de texto de Prometheus: histogramas por etapa del
+    pipeline, peticiones por ruta, tamaño del catálogo y tiempos de carga y
+    entrenamiento de los modelos.
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/recommend", response_model=Recommendation)
+def recommend_music(feedback: BioFeedbackInput, fields: Optional[str] = None, ids_only: bool = False):
+    """
+    Recomendación para una muestra de RC. `fields=track_id,tempo` limita las
+    columnas de la canción e `ids_only=true` devuelve solo `recommended_song_id`.
+    """
+    logic_engine = get_logic_engine()
+    song_fields = selected_fields(logic_engine, fields, ids_only)
+
     # Análisis de NLP (Centralizado)
     sentiment_adjustment, sentiment_label, bot_response = logic_engine.analyze_sentiment(feedback.user_message)
 
     # Recomendación con IA (RF + K-Means)
-    song, zone = logic_engine.recommend_song(feedback.heart_rate, feedback.current_song_id, sentiment_adjustment)
+    song, zone = logic_engine.recommend_song(
+        feedback.heart_rate, feedback.current_song_id, sentiment_adjustment, feedback.mode, history_for(feedback), song_fields
+    )
     
     # Predicción de Fatiga (MLP)
-    fatigue_risk = logic_engine.predict_fatigue(feedback.hr_history)
+    if feedback.session_id:
+        fatigue_risk = predict_fatigue_for(logic_engine, [feedback])[0]
+    else:
+        fatigue_risk = logic_engine.predict_fatigue(feedback.hr_history)
     
     if not song:
         raise HTTPException(status_code=404, detail="No suitable song found")
     
-    return {
+    return FastJSONResponse({
         "zone": zone,
-        "recommended_song": song,
+        **song_payload(song, ids_only),
         "fatigue_risk": fatigue_risk,
         "sentiment_analysis": sentiment_label
-    }
+    })
+
+@app.post("/recommend/batch", response_model=List[Recommendation])
+def recommend_music_batch(batch: List[BioFeedbackInput], fields: Optional[str] = None, ids_only: bool = False):
+    """
+    Versión por lotes de /recommend: una llamada a cada modelo para todo el lote.
+    Los resultados se devuelven en el mismo orden que la entrada.
+    """
+    if len(batch) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} samples per request")
+    logic_engine = get_logic_engine()
+    song_fields = selected_fields(logic_engine, fields, ids_only)
+    sentiments = logic_engine.analyze_sentiments([item.user_message for item in batch])
+    recommendations = logic_engine.recommend_batch(
+        [item.heart_rate for item in batch],
+        [item.current_song_id for item in batch],
+        [adjustment for adjustment, _, _ in sentiments],
+        [item.mode for item in batch],
+        [history_for(item) for item in batch],
+        song_fields,
+    )
+    fatigue_risks = predict_fatigue_for(logic_engine, batch)
+
+    return FastJSONResponse([
+        {
+            "zone": zone,
+            **song_payload(song, ids_only),
+            "fatigue_risk": fatigue_risk,
+            "sentiment_analysis": sentiment_label
+        }
+        for (song, zone), fatigue_risk, (_, sentiment_label, _) in zip(recommendations, fatigue_risks, sentiments)
+    ])
+
+@app.post("/recommend/queue")
+def recommend_queue(request: QueueInput):
+    """
+    Colas precalculadas de próximas canciones para la zona actual, una zona
+    arriba y una abajo, según la tendencia del RC. El cliente las precarga y
+    cambia de canción sin esperar una llamada a /recommend.
+    """
+    logic_engine = get_logic_engine()
+    if request.session_id:
+        hr_history = session_store.history(request.session_id)
+        history = play_history.get(request.session_id)
+    else:
+        hr_history = list(request.hr_history or [])
+        history = None
+    sentiment_adjustment, sentiment_label, _ = logic_engine.analyze_sentiment(request.user_message)
+    result = logic_engine.recommend_queue(
+        hr_history + [request.heart_rate], request.current_song_id, sentiment_adjustment, request.queue_length, history
+    )
+    result["sentiment_analysis"] = sentiment_label
+    return result
+
+@app.get("/sessions/fatigue")
+def sessions_fatigue():
+    """
+    Riesgo de fatiga de todas las sesiones activas en una sola pasada del MLP.
+    """
+    return session_store.predict_fatigue(get_logic_engine())
+
+@app.get("/sessions/{session_id}/history")
+def session_history(session_id: str):
+    """
+    Canciones recientes de la sesión (de la más antigua a la más reciente)
+    que se excluyen de las próximas recomendaciones.
+    """
+    history = play_history.peek(session_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    with history.lock:
+        return {"session_id": session_id, "recent_tracks": history.recent_tracks()}
+
+@app.delete("/sessions/{session_id}/history")
+def clear_session_history(session_id: str):
+    play_history.remove(session_id)
+    return {"session_id": session_id, "cleared": True}
+
+@app.post("/admin/tracks", dependencies=[Depends(require_admin)])
+def add_tracks(tracks: List[TrackInput]):
+    """
+    Ingesta incremental de canciones: se asignan a los clusters existentes y
+    se programa un reajuste completo en segundo plano si hay mucho drift.
+    Con varios workers solo se actualiza el proceso que atiende la petición;
+    dataset.csv sigue siendo la fuente de verdad al reiniciar.
+    Requiere `Authorization: Bearer <BIOSYNC_ADMIN_TOKEN>`.
+    """
+    if not tracks:
+        raise HTTPException(status_code=400, detail="No tracks provided")
+    if len(tracks) > MAX_ADMIN_TRACKS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_ADMIN_TRACKS} tracks per request")
+    return get_logic_engine().add_tracks([track.model_dump() for track in tracks])
+
+@app.websocket("/ws/session/{session_id}")
+async def stream_session(websocket: WebSocket, session_id: str, song_duration: float = SONG_DURATION_SECONDS):
+    """
+    Sesión continua: el wearable envía muestras de RC (un número por frame)
+    o JSON con `message`, y el servidor solo empuja eventos cuando cambian
+    la zona, la alerta de fatiga, el sentimiento o la canción.
+    """
+    await websocket.accept()
+    session = StreamSession(session_id, get_logic_engine(), session_store, song_duration, play_history)
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                events = session.handle(raw)
+            except (ValueError, TypeError, AttributeError):
+                events = [{"type": "error", "detail": "Invalid frame"}]
+            for event in events:
+                await websocket.send_json(jsonable_encoder(event))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.close()
@@ -0,0 +1,190 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Límites (segundos) de los buckets de los histogramas de latencia
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+# Contexto reutilizable (sin estado) que se entrega cuando las métricas están desactivadas
+NULL_TIMER = nullcontext()
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, value in series:
+            lines.extend(self._render_series(label_values, value))
+        return lines
+
+    def _render_series(self, label_values, value):
+        return [f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._functions = {}
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._series[label_values] = value
+
+    def set_function(self, fn, *label_values):
+        """El valor se calcula al exponer las métricas (p. ej. tamaño del catálogo)."""
+        with self._lock:
+            self._functions[label_values] = fn
+
+    def render(self):
+        with self._lock:
+            functions = list(self._functions.items())
+        for label_values, fn in functions:
+            self.set(fn(), *label_values)
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [conteo por bucket (+Inf al final), suma, conteo total]
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _render_series(self, label_values, series):
+        counts, total, count = series
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, label_values, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "stage", "start")
+
+    def __init__(self, histogram, stage):
+        self.histogram = histogram
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+
+class Metrics:
+    """
+    Registro de métricas en formato de texto de Prometheus, sin dependencias
+    externas. Con `enabled=False` los temporizadores por etapa son un
+    contexto nulo compartido, así el costo en el camino caliente es mínimo.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+        self.stage_duration = self.histogram(
+            "biosync_stage_duration_seconds", "Duración de cada etapa del pipeline de recomendación.", ["stage"]
+        )
+        self.requests = self.counter(
+            "biosync_http_requests_total", "Peticiones HTTP atendidas.", ["method", "path", "status"]
+        )
+        self.request_duration = self.histogram(
+            "biosync_http_request_duration_seconds", "Duración de las peticiones HTTP.", ["method", "path"]
+        )
+        self.catalog_tracks = self.gauge("biosync_catalog_tracks", "Canciones en el catálogo.")
+        self.catalog_load_seconds = self.gauge(
+            "biosync_catalog_load_seconds", "Duración de la última carga del catálogo."
+        )
+        self.model_load_seconds = self.gauge(
+            "biosync_model_load_seconds", "Duración de la última carga de modelos guardados."
+        )
+        self.model_training_seconds = self.gauge(
+            "biosync_model_training_seconds", "Duración del último entrenamiento de cada modelo.", ["model"]
+        )
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=()):
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def stage(self, name):
+        """Context manager que mide una etapa del pipeline (no hace nada si está desactivado)."""
+        if not self.enabled:
+            return NULL_TIMER
+        return _StageTimer(self.stage_duration, name)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registro por defecto de BioSyncLogic cuando no se le pasa uno (p. ej. el dashboard)
+DISABLED = Metrics(enabled=False)
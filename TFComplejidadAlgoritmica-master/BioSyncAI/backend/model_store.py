@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+
+import joblib
+import sklearn
+
+from .fileutils import atomic_write
+
+# Incrementar cuando cambie el contenido del bundle de modelos
+ARTIFACT_VERSION = 2
+
+MANIFEST_FILE = "manifest.json"
+BUNDLE_FILE = "models.joblib"
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(path, known=None):
+    """
+    Huella del dataset: tamaño, mtime y hash SHA-256 del contenido.
+    Si `known` tiene el mismo tamaño y mtime se reutiliza su hash para no
+    releer el archivo completo en cada arranque.
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if known and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+        fingerprint["sha256"] = known["sha256"]
+    else:
+        fingerprint["sha256"] = _file_sha256(path)
+    return fingerprint
+
+
+class ModelStore:
+    """
+    Guarda en disco los modelos entrenados (scaler, K-Means, cluster_map,
+    Random Forest y MLP) junto a la huella del dataset y los parámetros de
+    entrenamiento, para evitar reentrenar en cada arranque del proceso.
+    """
+
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+        self.manifest_path = os.path.join(model_dir, MANIFEST_FILE)
+        self.bundle_path = os.path.join(model_dir, BUNDLE_FILE)
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def build_manifest(self, dataset_path, training_params, fingerprint=None):
+        if fingerprint is None:
+            previous = self._read_manifest() or {}
+            fingerprint = dataset_fingerprint(dataset_path, previous.get("dataset"))
+        return {
+            "version": ARTIFACT_VERSION,
+            "sklearn_version": sklearn.__version__,
+            "dataset": fingerprint,
+            # Ida y vuelta por JSON para que las tuplas se comparen como listas
+            "training_params": json.loads(json.dumps(training_params)),
+        }
+
+    def _matches(self, stored, expected):
+        if not stored:
+            return False
+        keys = ("version", "sklearn_version", "training_params")
+        if any(stored.get(k) != expected[k] for k in keys):
+            return False
+        stored_ds, expected_ds = stored.get("dataset"), expected["dataset"]
+        if stored_ds is None or expected_ds is None:
+            return stored_ds is expected_ds
+        return stored_ds.get("sha256") == expected_ds["sha256"]
+
+    def load(self, manifest):
+        """Retorna los artefactos si la huella coincide, o None si hay que reentrenar."""
+        if not self._matches(self._read_manifest(), manifest):
+            return None
+        try:
+            # mmap_mode: los arreglos grandes (p. ej. etiquetas de cluster) se
+            # comparten entre procesos en lugar de copiarse en cada worker
+            return joblib.load(self.bundle_path, mmap_mode="r")
+        except Exception as e:
+            print(f"Warning: Could not load model bundle ({e}). Retraining.")
+            return None
+
+    def save(self, manifest, artifacts):
+        os.makedirs(self.model_dir, exist_ok=True)
+        # Primero el bundle y luego el manifiesto: un manifiesto válido
+        # siempre apunta a un bundle completo.
+        atomic_write(self.bundle_path, lambda p: joblib.dump(artifacts, p))
+
+        def write_manifest(p):
+            with open(p, "w") as f:
+                json.dump(manifest, f, indent=2)
+
+        atomic_write(self.manifest_path, write_manifest)
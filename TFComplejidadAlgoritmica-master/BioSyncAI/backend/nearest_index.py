@@ -0,0 +1,63 @@
+import copy
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+# Fracción de puntos fuera del árbol a partir de la cual se reconstruye el KD-tree
+REBUILD_FRACTION = 0.1
+
+
+class TempoEnergyIndex:
+    """
+    KD-tree sobre las características (tempo, energía) ya escaladas con el
+    StandardScaler del clustering. Permite buscar las k canciones más
+    cercanas a un punto objetivo en O(log N).
+
+    Las canciones agregadas después de construir el árbol se guardan en un
+    bloque pequeño que se revisa por fuerza bruta; el árbol se reconstruye
+    cuando ese bloque supera REBUILD_FRACTION del total.
+    """
+
+    def __init__(self, scaler, features):
+        self.mean = np.asarray(scaler.mean_, dtype=float)
+        self.scale = np.asarray(scaler.scale_, dtype=float)
+        self._build(self.transform(features).reshape(-1, 2))
+
+    def _build(self, points):
+        self.points = points
+        self.tree = KDTree(points) if len(points) else None
+        self.extra_points = np.empty((0, 2))
+
+    def __len__(self):
+        return len(self.points) + len(self.extra_points)
+
+    def transform(self, features):
+        # Equivalente a scaler.transform sin la validación de sklearn por llamada
+        return (np.asarray(features, dtype=float) - self.mean) / self.scale
+
+    def add(self, features):
+        """
+        Retorna un índice nuevo con canciones nuevas (filas siguientes del
+        catálogo); este no cambia. El árbol se comparte mientras no se reconstruya.
+        """
+        index = copy.copy(self)
+        index.extra_points = np.vstack([self.extra_points, self.transform(features).reshape(-1, 2)])
+        if len(index.extra_points) > REBUILD_FRACTION * max(len(self.points), 1):
+            index._build(np.vstack([self.points, index.extra_points]))
+        return index
+
+    def query(self, tempo, energy, k):
+        """Filas de las k canciones más cercanas, de la más cercana a la más lejana."""
+        point = self.transform([[tempo, energy]])
+        if self.tree is None:
+            distances, rows = np.empty(0), np.empty(0, dtype=np.int64)
+        else:
+            distances, rows = self.tree.query(point, k=min(k, len(self.points)))
+            distances, rows = distances[0], rows[0]
+        if len(self.extra_points):
+            extra_distances = np.sqrt(((self.extra_points - point) ** 2).sum(axis=1))
+            distances = np.concatenate([distances, extra_distances])
+            rows = np.concatenate([rows, len(self.points) + np.arange(len(self.extra_points))])
+            order = np.argsort(distances, kind="stable")[:k]
+            rows = rows[order]
+        return rows
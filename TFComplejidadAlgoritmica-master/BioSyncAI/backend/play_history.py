@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Canciones recientes que no se repiten dentro de una sesión
+RECENT_TRACKS = 50
+MAX_SESSIONS = 10000
+SESSION_TTL_SECONDS = 30 * 60
+
+
+class ShuffledDeck:
+    """
+    Mazo barajado de las posiciones de un bloque de cluster. Usa Fisher-Yates
+    perezoso: cada carta se baraja al sacarla, así sacar es O(1) y solo se
+    guardan las posiciones intercambiadas (no una permutación completa). Al
+    agotarse el mazo se vuelve a barajar; si el cluster crece, las posiciones
+    nuevas entran en el resto del mazo.
+    """
+
+    def __init__(self):
+        self.cursor = 0
+        self._swaps = {}
+
+    def draw(self, size, rng):
+        if self.cursor >= size:
+            self.cursor = 0
+            self._swaps.clear()
+        j = rng.randrange(self.cursor, size)
+        drawn = self._swaps.pop(j, j)
+        if j != self.cursor:
+            self._swaps[j] = self._swaps.pop(self.cursor, self.cursor)
+        self.cursor += 1
+        return drawn
+
+
+class SessionHistory:
+    """
+    Historial de reproducción de una sesión: las últimas `recent` canciones
+    (conjunto acotado con orden de inserción para desalojar la más antigua) y
+    un mazo por cluster. Cada elección avanza el mazo y descarta en O(1) las
+    canciones recientes, de modo que una canción no se repite hasta recorrer
+    el cluster completo.
+    """
+
+    def __init__(self, recent=RECENT_TRACKS):
+        self.recent_limit = recent
+        self.recent = OrderedDict()
+        self._decks = {}
+        self._lineage = None
+        self.lock = threading.Lock()
+
+    def __contains__(self, track_id):
+        return track_id in self.recent
+
+    def record(self, track_id):
+        if not track_id:
+            return
+        self.recent[track_id] = None
+        self.recent.move_to_end(track_id)
+        while len(self.recent) > self.recent_limit:
+            self.recent.popitem(last=False)
+
+    def recent_tracks(self):
+        """Canciones recientes, de la más antigua a la más reciente."""
+        return list(self.recent)
+
+    def pick(self, catalog_index, cluster, rng):
+        """
+        Retorna la fila del siguiente candidato del mazo del cluster que no
+        se haya reproducido recientemente (o None si el cluster no existe).
+        """
+        if catalog_index.lineage is not self._lineage:
+            # El índice se reconstruyó (reajuste del clustering): barajar de nuevo.
+            # Un índice extendido con canciones nuevas conserva los mazos.
+            self._lineage = catalog_index.lineage
+            self._decks.clear()
+        members = catalog_index.members.get(cluster) if cluster is not None else None
+        if members is None or len(members) == 0:
+            return None
+
+        deck = self._decks.setdefault(cluster, ShuffledDeck())
+        size = len(members)
+        # Como mucho se descartan las `recent` canciones recientes, más una vuelta del mazo
+        row = None
+        for _ in range(min(size, self.recent_limit + 1)):
+            row = int(members[deck.draw(size, rng)])
+            if catalog_index.track_ids[row] not in self.recent:
+                break
+        return row
+
+
+class PlayHistoryStore:
+    """
+    Historiales de reproducción por session_id, con desalojo LRU al superar
+    `max_sessions` y por inactividad (`ttl` segundos), igual que SessionStore.
+    """
+
+    def __init__(self, recent=RECENT_TRACKS, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL_SECONDS):
+        self.recent = recent
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._last_seen = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def _evict(self, now):
+        while self._sessions:
+            session_id = next(iter(self._sessions))
+            expired = now - self._last_seen[session_id] > self.ttl
+            if not expired and len(self._sessions) < self.max_sessions:
+                break
+            del self._sessions[session_id]
+            del self._last_seen[session_id]
+
+    def get(self, session_id):
+        """Historial de la sesión, creándolo si no existe."""
+        now = time.monotonic()
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                self._evict(now)
+                history = self._sessions[session_id] = SessionHistory(self.recent)
+            else:
+                self._sessions.move_to_end(session_id)
+            self._last_seen[session_id] = now
+            return history
+
+    def peek(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def remove(self, session_id):
+        with self._lock:
+            if self._sessions.pop(session_id, None) is not None:
+                del self._last_seen[session_id]
@@ -0,0 +1,92 @@
+import json
+import math
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la biblioteca estándar
+    orjson = None
+
+# Campos calculados que no son columnas del catálogo
+DERIVED_FIELDS = ("cluster", "artist_name")
+
+
+class Song(BaseModel):
+    """
+    Canción recomendada. Solo se documentan los campos principales; el resto
+    de columnas del catálogo se incluyen tal cual (o las pedidas en `fields`).
+    """
+    model_config = ConfigDict(extra="allow")
+
+    track_id: str
+    track_name: Optional[str] = None
+    artist_name: Optional[str] = None
+    genre: Optional[str] = None
+    tempo: Optional[float] = None
+    energy: Optional[float] = None
+    cluster: Optional[int] = None
+
+
+class Recommendation(BaseModel):
+    zone: str
+    recommended_song: Optional[Song] = None
+    # Solo con ids_only=true (en lugar de recommended_song)
+    recommended_song_id: Optional[str] = None
+    fatigue_risk: bool
+    sentiment_analysis: str
+
+
+def parse_fields(fields, available):
+    """
+    Convierte el parámetro `fields` ("track_id,tempo") en una tupla de
+    columnas válidas. Retorna None si no se pidió selección. `track_id`
+    siempre se incluye: es obligatorio en `Song` y lo usan el historial de
+    reproducción y `current_song_id`.
+    Lanza ValueError con los campos desconocidos.
+    """
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(["track_id"] + [name.strip() for name in fields.split(",") if name.strip()]))
+    unknown = [name for name in names if name not in available and name not in DERIVED_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def song_payload(song, ids_only):
+    """Parte de la respuesta con la canción: objeto completo o solo su id."""
+    if ids_only:
+        return {"recommended_song_id": song["track_id"] if song else None}
+    return {"recommended_song": song}
+
+
+class FastJSONResponse(Response):
+    """
+    Respuesta JSON que serializa directamente los dicts de tipos nativos
+    que arma BioSyncLogic (sin pasar por jsonable_encoder). Usa orjson si
+    está instalado. Los floats no finitos (NaN de columnas vacías) se
+    escriben como null con ambos serializadores.
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        if orjson is not None:
+            # orjson ya escribe NaN/inf como null
+            return orjson.dumps(content)
+        return json.dumps(
+            _finite(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def _finite(value):
+    """Copia de `value` con los floats NaN/inf reemplazados por None (JSON válido)."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
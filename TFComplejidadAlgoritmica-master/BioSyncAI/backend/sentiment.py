@@ -0,0 +1,132 @@
+from functools import lru_cache
+from types import MappingProxyType
+
+# --- Léxico compilado una sola vez al importar el módulo ---
+
+# Vocabulario con Pesos (las entradas pueden tener varias palabras)
+KEYWORDS = MappingProxyType({
+    # Alta Energía / Positivo (+1 a +2)
+    "energía": 2, "fuerte": 2, "tope": 2, "fuego": 2, "máquina": 2, "bestia": 2, "imparable": 2,
+    "feliz": 1, "bien": 1, "vamos": 1, "arriba": 1, "excelente": 1, "genial": 1, "activo": 1,
+    "motivado": 1, "poder": 1, "rápido": 1, "ganas": 1, "dale": 1, "sigue": 1, "adrenalina": 1,
+    "romperla": 2, "duro": 1, "ganar": 1, "fácil": 1, "listo": 1, "go": 1, "volar": 2, "incansable": 2,
+    "explotar": 2, "ritmo": 1, "bass": 1, "sube": 1, "max": 1, "locura": 1,
+
+    # Baja Energía / Negativo (-1 a -2)
+    "cansado": -2, "agotado": -2, "muerto": -2, "asfixiado": -2, "rendirme": -2, "basta": -2, "duele": -2,
+    "mal": -1, "triste": -1, "bajar": -1, "descanso": -1, "fatiga": -1, "lento": -1, "dolor": -1,
+    "sueño": -1, "pesado": -1, "aburrido": -1, "parar": -1, "no puedo": -2, "aire": -1, "sed": -1,
+    "mareado": -2, "calambre": -2, "flojera": -1, "difícil": -1, "imposible": -1, "calma": -1,
+    "paz": -1, "suave": -1, "dormir": -1, "estrés": -1, "ansiedad": -1, "rodilla": -2, "espalda": -2, "lesión": -2
+})
+
+NEGATIONS = frozenset(["no", "ni", "nunca", "jamás", "sin", "poco"])
+INTENSIFIERS = frozenset(["muy", "mucho", "demasiado", "super", "mega", "ultra", "re"])
+
+# Puntuación que se limpia de cada palabra (igual que el análisis original). Las
+# negaciones e intensificadores se comparan sin limpiar: "No, estoy cansado" no niega.
+PUNCTUATION = ".,!¡?¿"
+
+CACHE_SIZE = 4096
+
+# Marca de fin de frase dentro del trie
+_VALUE = object()
+
+
+def _build_phrase_trie(keywords):
+    """
+    Autómata (trie por palabras) con todas las entradas del léxico. Permite
+    reconocer en una sola pasada tanto palabras sueltas como frases de
+    varias palabras ("no puedo"), eligiendo siempre la coincidencia más larga.
+    """
+    root = {}
+    for phrase, weight in keywords.items():
+        node = root
+        for token in phrase.split():
+            node = node.setdefault(token, {})
+        node[_VALUE] = weight
+    return root
+
+
+PHRASE_TRIE = _build_phrase_trie(KEYWORDS)
+
+
+def tokenize(message):
+    """Palabras separadas por espacios, en minúsculas y con su puntuación."""
+    return message.lower().split()
+
+
+def _match_phrase(tokens, cleaned, start):
+    """
+    Retorna (peso, largo) de la frase más larga que empieza en `start`, o
+    (None, 0). Una frase no continúa tras una palabra con puntuación, para
+    no unir cláusulas distintas ("no, puedo" no es "no puedo").
+    """
+    node = PHRASE_TRIE
+    weight, length = None, 0
+    for i in range(start, len(tokens)):
+        node = node.get(cleaned[i])
+        if node is None:
+            break
+        if _VALUE in node:
+            weight, length = node[_VALUE], i - start + 1
+        if tokens[i][-1] in PUNCTUATION:
+            break
+    return weight, length
+
+
+def score_tokens(tokens):
+    cleaned = [token.strip(PUNCTUATION) for token in tokens]
+    score = 0
+    i = 0
+    while i < len(tokens):
+        val, length = _match_phrase(tokens, cleaned, i)
+        if val is None:
+            i += 1
+            continue
+
+        # Verificar Negación (mirar atrás 1-2 palabras)
+        is_negated = (i > 0 and tokens[i - 1] in NEGATIONS) or (i > 1 and tokens[i - 2] in NEGATIONS)
+
+        # Verificar Intensificador (mirar atrás 1 palabra)
+        is_intensified = i > 0 and tokens[i - 1] in INTENSIFIERS
+
+        # Aplicar Lógica
+        if is_negated:
+            val = -val # Invertir significado ("no cansado" -> positivo)
+
+        if is_intensified:
+            val *= 1.5 # Aumentar impacto
+
+        score += val
+        i += length
+    return score
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _analyze_normalized(normalized):
+    score = score_tokens(tokenize(normalized))
+
+    # Lógica de Decisión
+    if score < -1:
+        return -1, "Negativo Crítico (Bajando Intensidad)", "⚠️ Detecto fatiga o dolor. Bajando al mínimo. ¡Para si es necesario!"
+    elif score < 0:
+        return -1, "Negativo (Bajando Intensidad)", "Tranquilo, respira profundo. Bajamos la intensidad para que te recuperes. 🍃"
+    elif score > 1:
+        return 1, "Positivo Alto (Modo Bestia)", "¡MODO BESTIA ACTIVADO! 🦍🔥 ¡Nadie te para hoy!"
+    elif score > 0:
+        return 1, "Positivo (Subiendo Intensidad)", "¡Esa es la actitud! Subiendo la potencia. 🚀"
+    else:
+        return 0, "Neutral", "Estoy monitoreando. Dime 'estoy cansado' o 'vamos' para ajustar."
+
+
+def analyze_sentiment(message):
+    """
+    Analiza el sentimiento de un mensaje. Los mensajes se normalizan
+    (minúsculas y espacios) y el resultado se cachea con LRU, ya que las
+    mismas frases del chat se repiten entre usuarios.
+    Retorna: (puntaje_ajuste, etiqueta, respuesta_bot)
+    """
+    if not message:
+        return 0, "Neutral", "Esperando tu estado..."
+    return _analyze_normalized(" ".join(message.lower().split()))
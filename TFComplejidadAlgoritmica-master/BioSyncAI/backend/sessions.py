@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Cantidad de muestras de RC que usa el modelo de fatiga
+FATIGUE_WINDOW = 5
+MAX_SESSIONS = 10000
+SESSION_TTL_SECONDS = 30 * 60
+
+
+class SessionStore:
+    """
+    Estado por sesión guardado en el servidor. Cada sesión ocupa una fila de
+    una matriz compartida que funciona como ring buffer de las últimas
+    FATIGUE_WINDOW muestras de ritmo cardíaco, así el cliente ya no reenvía
+    el historial completo y la fatiga de todas las sesiones activas se
+    calcula con una sola pasada del MLP sobre la matriz apilada.
+    """
+
+    def __init__(self, window=FATIGUE_WINDOW, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL_SECONDS, capacity=64):
+        self.window = window
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # session_id -> fila; el orden del OrderedDict es el orden de uso (LRU)
+        self._slots = OrderedDict()
+        self._last_seen = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._buffers = np.zeros((capacity, window), dtype=float)
+        self._heads = np.zeros(capacity, dtype=np.int64)
+        self._counts = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, session_id):
+        return session_id in self._slots
+
+    def _grow(self):
+        capacity = len(self._buffers)
+        self._buffers = np.concatenate([self._buffers, np.zeros((capacity, self.window))])
+        self._heads = np.concatenate([self._heads, np.zeros(capacity, dtype=np.int64)])
+        self._counts = np.concatenate([self._counts, np.zeros(capacity, dtype=np.int64)])
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def _evict(self, now):
+        # Primero las sesiones inactivas, luego las menos usadas si se excede el máximo
+        while self._slots:
+            session_id = next(iter(self._slots))
+            expired = now - self._last_seen[session_id] > self.ttl
+            if not expired and len(self._slots) < self.max_sessions:
+                break
+            self._release(session_id)
+
+    def _release(self, session_id):
+        slot = self._slots.pop(session_id)
+        del self._last_seen[session_id]
+        self._counts[slot] = 0
+        self._heads[slot] = 0
+        self._free.append(slot)
+
+    def _slot(self, session_id, now):
+        slot = self._slots.get(session_id)
+        if slot is None:
+            self._evict(now)
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._slots[session_id] = slot
+        else:
+            self._slots.move_to_end(session_id)
+        self._last_seen[session_id] = now
+        return slot
+
+    def append(self, session_id, heart_rate):
+        """Agrega una muestra de RC al ring buffer de la sesión."""
+        with self._lock:
+            slot = self._slot(session_id, time.monotonic())
+            head = self._heads[slot]
+            self._buffers[slot, head] = heart_rate
+            self._heads[slot] = (head + 1) % self.window
+            self._counts[slot] = min(self._counts[slot] + 1, self.window)
+
+    def append_many(self, session_ids, heart_rates):
+        for session_id, heart_rate in zip(session_ids, heart_rates):
+            self.append(session_id, heart_rate)
+
+    def remove(self, session_id):
+        with self._lock:
+            if session_id in self._slots:
+                self._release(session_id)
+
+    def history(self, session_id):
+        """Muestras guardadas de la sesión, de la más antigua a la más reciente."""
+        with self._lock:
+            slot = self._slots.get(session_id)
+            if slot is None:
+                return []
+            count = self._counts[slot]
+            order = (self._heads[slot] - count + np.arange(count)) % self.window
+            return self._buffers[slot, order].tolist()
+
+    def windows(self, session_ids=None):
+        """
+        Apila las ventanas completas de las sesiones pedidas (o de todas las
+        activas) en una matriz (n, window) ordenada en el tiempo.
+        Retorna (ids_listos, matriz).
+        """
+        with self._lock:
+            if session_ids is None:
+                session_ids = list(self._slots)
+            ready = [
+                session_id for session_id in session_ids
+                if session_id in self._slots and self._counts[self._slots[session_id]] == self.window
+            ]
+            slots = np.fromiter((self._slots[s] for s in ready), dtype=np.int64, count=len(ready))
+            # Reordenar cada fila desde su cabeza con un único indexado avanzado
+            columns = (self._heads[slots][:, None] + np.arange(self.window)) % self.window
+            return ready, self._buffers[slots[:, None], columns]
+
+    def predict_fatigue(self, logic, session_ids=None):
+        """
+        Fatiga de varias sesiones con una sola pasada del MLP.
+        Retorna un dict session_id -> bool (False si aún no hay ventana completa).
+        """
+        if session_ids is None:
+            with self._lock:
+                session_ids = list(self._slots)
+        results = dict.fromkeys(session_ids, False)
+        ready, matrix = self.windows(session_ids)
+        if ready:
+            for session_id, risk in zip(ready, logic.predict_fatigue_matrix(matrix)):
+                results[session_id] = bool(risk)
+        return results
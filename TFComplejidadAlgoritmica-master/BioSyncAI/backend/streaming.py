@@ -0,0 +1,123 @@
+import json
+import math
+import time
+
+# Duración asumida de cada canción antes de elegir la siguiente
+SONG_DURATION_SECONDS = 180
+# Rango plausible de RC (BPM); fuera de él la muestra se considera un error del sensor
+HEART_RATE_RANGE = (20, 250)
+
+
+def parse_heart_rate(value):
+    """
+    Convierte una muestra de RC a float y la valida. Lanza ValueError si no
+    es numérica, no es finita (nan, inf, "1e400") o cae fuera de
+    HEART_RATE_RANGE, para que no contamine el buffer ni la ventana de fatiga.
+    """
+    try:
+        heart_rate = float(value)
+    except OverflowError:
+        raise ValueError(f"Heart rate out of range: {value!r}")
+    low, high = HEART_RATE_RANGE
+    if not math.isfinite(heart_rate) or not low <= heart_rate <= high:
+        raise ValueError(f"Heart rate out of range: {value!r}")
+    return heart_rate
+
+
+class StreamSession:
+    """
+    Estado de una sesión de streaming (WebSocket). Recibe muestras de RC y
+    mensajes de chat, y solo genera eventos cuando algo cambia: zona, alerta
+    de fatiga, análisis de sentimiento o canción recomendada.
+    """
+
+    def __init__(self, session_id, logic, session_store, song_duration=SONG_DURATION_SECONDS, play_history=None):
+        self.session_id = session_id
+        self.logic = logic
+        self.session_store = session_store
+        # Historial de reproducción (anti-repetición); sobrevive a reconexiones hasta su TTL
+        self.history = play_history.get(session_id) if play_history is not None else None
+        self.song_duration = song_duration
+
+        self.zone_idx = None
+        self.target_zone_idx = None
+        self.fatigue_risk = False
+        self.sentiment_adjustment = 0
+        self.song = None
+        self.song_ends_at = 0.0
+
+    def on_heart_rate(self, heart_rate, now=None):
+        now = time.monotonic() if now is None else now
+        events = []
+
+        self.session_store.append(self.session_id, heart_rate)
+        zone_name, zone_idx = self.logic.determine_zone_ai(heart_rate)
+        if zone_idx != self.zone_idx:
+            self.zone_idx = zone_idx
+            events.append({"type": "zone", "zone": zone_name})
+
+        fatigue_risk = self.session_store.predict_fatigue(self.logic, [self.session_id])[self.session_id]
+        if fatigue_risk != self.fatigue_risk:
+            self.fatigue_risk = fatigue_risk
+            events.append({"type": "fatigue", "fatigue_risk": fatigue_risk})
+
+        events.extend(self._maybe_switch_song(now))
+        return events
+
+    def on_message(self, message, now=None):
+        now = time.monotonic() if now is None else now
+        adjustment, label, bot_response = self.logic.analyze_sentiment(message)
+        self.sentiment_adjustment = adjustment
+        events = [{"type": "sentiment", "sentiment_analysis": label, "bot_response": bot_response}]
+        events.extend(self._maybe_switch_song(now))
+        return events
+
+    def on_next(self, now=None):
+        """Salta la canción actual (p. ej. el usuario pulsó 'siguiente')."""
+        now = time.monotonic() if now is None else now
+        return self._maybe_switch_song(now, force=True)
+
+    def _maybe_switch_song(self, now, force=False):
+        if self.zone_idx is None:
+            return []
+        target = max(0, min(3, self.zone_idx + int(self.sentiment_adjustment)))
+        if not force and self.song is not None and target == self.target_zone_idx and now < self.song_ends_at:
+            return []
+
+        current_song_id = self.song['track_id'] if self.song else None
+        song = self.logic.recommend_for_zone(self.zone_idx, current_song_id, self.sentiment_adjustment, self.history)
+        self.target_zone_idx = target
+        if song is None:
+            return []
+        self.song = song
+        self.song_ends_at = now + self.song_duration
+        return [{"type": "song", "recommended_song": song}]
+
+    def handle(self, raw, now=None):
+        """
+        Procesa un frame de texto del cliente. Un número suelto ("142") es
+        una muestra de RC; si no, se espera JSON con `heart_rate`, `message`
+        o `{"type": "next"}`. Lanza ValueError si el frame no es válido.
+        """
+        try:
+            heart_rate = float(raw)
+        except ValueError:
+            data = json.loads(raw)
+        else:
+            return self.on_heart_rate(parse_heart_rate(heart_rate), now)
+
+        # Se valida antes de procesar nada para no dejar el frame a medias
+        heart_rate = data.get("heart_rate")
+        if heart_rate is not None:
+            heart_rate = parse_heart_rate(heart_rate)
+        events = []
+        if data.get("message"):
+            events.extend(self.on_message(data["message"], now))
+        if heart_rate is not None:
+            events.extend(self.on_heart_rate(heart_rate, now))
+        if data.get("type") == "next":
+            events.extend(self.on_next(now))
+        return events
+
+    def close(self):
+        self.session_store.remove(self.session_id)
@@ -0,0 +1,68 @@
+import numpy as np
+
+# Rango cubierto por la tabla: BPM enteros y edades enteras (inclusive)
+BPM_RANGE = (30, 250)
+AGE_RANGE = (10, 90)
+
+
+class ZoneLookupTable:
+    """
+    Tabla precompilada con la predicción del clasificador de zonas para cada
+    combinación entera (BPM, edad). Consultarla es un acceso a un arreglo en
+    lugar de una llamada a `predict` de sklearn por muestra.
+    """
+
+    def __init__(self, classifier, bpm_range=BPM_RANGE, age_range=AGE_RANGE):
+        self.bpm_min, self.bpm_max = bpm_range
+        self.age_min, self.age_max = age_range
+        self.table = self._predict_grid(classifier).astype(np.int8)
+
+    def _grid(self):
+        bpms = np.arange(self.bpm_min, self.bpm_max + 1)
+        ages = np.arange(self.age_min, self.age_max + 1)
+        grid = np.stack(np.meshgrid(bpms, ages, indexing="ij"), axis=-1)
+        return grid.reshape(-1, 2), (len(bpms), len(ages))
+
+    def _predict_grid(self, classifier):
+        grid, shape = self._grid()
+        return classifier.predict(grid).reshape(shape)
+
+    def lookup(self, heart_rate, age):
+        """
+        Retorna el índice de zona, o None si la muestra no es entera o queda
+        fuera del rango de la tabla (el llamador usa entonces el modelo).
+        """
+        try:
+            bpm, age_int = int(heart_rate), int(age)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        if bpm != heart_rate or age_int != age:
+            return None
+        if not (self.bpm_min <= bpm <= self.bpm_max and self.age_min <= age_int <= self.age_max):
+            return None
+        return int(self.table[bpm - self.bpm_min, age_int - self.age_min])
+
+    def lookup_many(self, heart_rates, age):
+        """
+        Versión vectorizada de `lookup`. Retorna (zonas, máscara_válida); las
+        posiciones fuera de la máscara deben resolverse con el modelo.
+        """
+        hr = np.asarray(heart_rates, dtype=float)
+        bpm = hr.astype(np.int64)
+        valid = (bpm == hr) & (bpm >= self.bpm_min) & (bpm <= self.bpm_max)
+        age_int = int(age)
+        if age_int != age or not (self.age_min <= age_int <= self.age_max):
+            valid[:] = False
+        zones = np.zeros(len(hr), dtype=np.int64)
+        zones[valid] = self.table[bpm[valid] - self.bpm_min, age_int - self.age_min]
+        return zones, valid
+
+    def mismatches(self, classifier):
+        """
+        Compara la tabla con el modelo en vivo sobre toda la grilla y retorna
+        la lista de (bpm, edad) donde difieren (vacía si son consistentes).
+        """
+        grid, _ = self._grid()
+        live = classifier.predict(grid)
+        diff = live != self.table.reshape(-1)
+        return [tuple(int(v) for v in point) for point in grid[diff]]
@@ -0,0 +1,113 @@
+"""
+Compara los modos de entrenamiento del clustering (full, minibatch, sampled)
+sobre catálogos sintéticos: tiempo de ajuste, pico de memoria (tracemalloc)
+y calidad respecto al K-Means completo (inercia relativa y Adjusted Rand Index).
+
+Uso (desde BioSyncAI/):
+    python -m benchmarks.clustering_benchmark --sizes 100000 1000000 --output clustering.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.clustering import CHUNK_SIZE, SAMPLE_SIZE, fit_clusters
+from backend.logic import TRAINING_PARAMS
+
+MODES = ("full", "minibatch", "sampled")
+
+# (tempo medio, desviación, energía media, desviación) por "género"
+GENRE_PROFILES = [(75, 10, 0.3, 0.1), (105, 10, 0.55, 0.1), (128, 8, 0.75, 0.1), (165, 12, 0.9, 0.05)]
+
+
+def synthetic_columns(n_rows, seed=0):
+    """Columnas tempo/energía float32 con la misma estructura por género que el mock."""
+    rng = np.random.default_rng(seed)
+    profiles = np.array(GENRE_PROFILES)[rng.integers(len(GENRE_PROFILES), size=n_rows)]
+    tempo = rng.normal(profiles[:, 0], profiles[:, 1]).clip(40, 220).astype(np.float32)
+    energy = rng.normal(profiles[:, 2], profiles[:, 3]).clip(0, 1).astype(np.float32)
+    return [tempo, energy]
+
+
+def _inertia(columns, scaler, labels):
+    scaled = scaler.transform(np.column_stack([np.asarray(c, dtype=float) for c in columns]))
+    centers = np.array([scaled[labels == c].mean(axis=0) for c in np.unique(labels)])
+    lookup = {c: i for i, c in enumerate(np.unique(labels))}
+    return float(((scaled - centers[[lookup[c] for c in labels]]) ** 2).sum())
+
+
+def run_mode(columns, mode, options):
+    tracemalloc.start()
+    start = time.perf_counter()
+    scaler, kmeans, clusters, cluster_map = fit_clusters(columns, TRAINING_PARAMS["clustering"], mode=mode, **options)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"fit_seconds": elapsed, "peak_memory_mb": peak / 2**20}, scaler, clusters, cluster_map
+
+
+def zone_labels(clusters, cluster_map):
+    lookup = np.zeros(max(cluster_map) + 1, dtype=np.int64)
+    for cluster_id, zone in cluster_map.items():
+        lookup[cluster_id] = zone
+    return lookup[clusters]
+
+
+def benchmark(sizes, modes, options, full_limit):
+    results = []
+    for n_rows in sizes:
+        columns = synthetic_columns(n_rows)
+        reference = None
+        for mode in modes:
+            if mode == "full" and n_rows > full_limit:
+                continue
+            stats, scaler, clusters, cluster_map = run_mode(columns, mode, options)
+            zones = zone_labels(clusters, cluster_map)
+            if mode == "full":
+                reference = (scaler, zones, _inertia(columns, scaler, clusters))
+            if reference is not None:
+                ref_scaler, ref_zones, ref_inertia = reference
+                # Inercia medida en el mismo espacio escalado que el modo full
+                stats["relative_inertia"] = _inertia(columns, ref_scaler, clusters) / ref_inertia
+                stats["adjusted_rand_index"] = adjusted_rand_score(ref_zones, zones)
+                stats["zone_agreement"] = float((ref_zones == zones).mean())
+            results.append(dict(stats, rows=n_rows, mode=mode))
+            print(json.dumps(results[-1]), file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--full-limit", type=int, default=1_000_000,
+                        help="No ejecutar el modo full por encima de esta cantidad de filas")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    options = {"chunk_size": args.chunk_size, "sample_size": args.sample_size, "n_jobs": args.n_jobs}
+    report = {
+        "benchmark": "clustering",
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "results": benchmark(args.sizes, args.modes, options, args.full_limit),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Benchmark de latencia y throughput de BioSyncLogic y de la API.
+
+Para cada tamaño de catálogo sintético (generate_mock_spotify_data) mide:
+  - tiempo de construcción de BioSyncLogic: en frío (entrena y guarda
+    modelos y catálogo) y en caliente (reabre el catálogo y los modelos);
+  - distribución de latencia por llamada (p50/p95/p99) de recommend_song,
+    determine_zone_ai, predict_fatigue y analyze_sentiment;
+  - prueba de carga en proceso de la app FastAPI con TestClient.
+
+Los resultados se emiten en JSON para comparar regresiones entre versiones.
+
+Uso (desde BioSyncAI/):
+    python -m benchmarks.latency_benchmark --sizes 1000 100000 1000000 --output latency.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import sklearn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.logic import BioSyncLogic
+from backend.sentiment import _analyze_normalized
+from data.mock_data_generator import write_mock_spotify_csv
+
+MESSAGES = [
+    None, "vamos", "estoy cansado", "no puedo más", "muy fuerte hoy", "me duele la rodilla",
+    "dale que sube el ritmo", "necesito un descanso", "modo bestia", "no estoy cansado",
+]
+
+
+def percentiles(samples_ns):
+    """Resumen de una lista de latencias en nanosegundos (resultado en microsegundos)."""
+    samples = np.asarray(samples_ns, dtype=float) / 1000.0
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "calls": len(samples),
+        "mean_us": float(samples.mean()),
+        "p50_us": float(p50),
+        "p95_us": float(p95),
+        "p99_us": float(p99),
+        "max_us": float(samples.max()),
+    }
+
+
+def time_calls(fn, args_list):
+    timings = []
+    for args in args_list:
+        start = time.perf_counter_ns()
+        fn(*args)
+        timings.append(time.perf_counter_ns() - start)
+    return percentiles(timings)
+
+
+def build_catalog(n_tracks, directory, seed):
+    start = time.perf_counter()
+    csv_path = os.path.join(directory, "dataset.csv")
+    write_mock_spotify_csv(csv_path, n_tracks, seed=seed)
+    return csv_path, time.perf_counter() - start
+
+
+def construction(csv_path, directory):
+    model_dir = os.path.join(directory, "models")
+    catalog_dir = os.path.join(directory, "catalog")
+    timings = {}
+    start = time.perf_counter()
+    BioSyncLogic(music_db_path=csv_path, model_dir=model_dir, catalog_dir=catalog_dir)
+    timings["cold_seconds"] = time.perf_counter() - start
+    start = time.perf_counter()
+    logic = BioSyncLogic(music_db_path=csv_path, model_dir=model_dir, catalog_dir=catalog_dir)
+    timings["warm_seconds"] = time.perf_counter() - start
+    return logic, timings
+
+
+def method_latencies(logic, iterations, rng):
+    heart_rates = [rng.randint(50, 200) for _ in range(iterations)]
+    track_ids = logic.catalog.column('track_id')
+    current = [track_ids[rng.randrange(len(track_ids))] for _ in range(iterations)]
+    histories = [[rng.randint(60, 190) for _ in range(5)] for _ in range(iterations)]
+    messages = [rng.choice(MESSAGES) for _ in range(iterations)]
+
+    # Caché de sentimiento vacía: se mide la mezcla real de aciertos y fallos
+    _analyze_normalized.cache_clear()
+    return {
+        "recommend_song": time_calls(logic.recommend_song, zip(heart_rates, current)),
+        "recommend_song_nearest": time_calls(
+            lambda hr, song_id: logic.recommend_song(hr, song_id, 0, "nearest"), zip(heart_rates, current)
+        ),
+        "determine_zone_ai": time_calls(logic.determine_zone_ai, [(hr,) for hr in heart_rates]),
+        "determine_zone_ai_model": time_calls(logic.determine_zone_ai, [(hr + 0.5,) for hr in heart_rates[:200]]),
+        "predict_fatigue": time_calls(logic.predict_fatigue, [(history,) for history in histories]),
+        "analyze_sentiment": time_calls(logic.analyze_sentiment, [(message,) for message in messages]),
+    }
+
+
+def load_test(logic, requests_count, concurrency, rng):
+    """
+    Prueba de carga en proceso: la app real (validación, serialización,
+    threadpool de FastAPI) con el motor del catálogo sintético. El cliente
+    no ejecuta el lifespan (que generaría el CSV mock, el catálogo y los
+    modelos en data/) y las sesiones usan almacenes nuevos, no los globales.
+    """
+    from fastapi.testclient import TestClient
+
+    import backend.main as api
+    from backend.play_history import PlayHistoryStore
+    from backend.sessions import SessionStore
+
+    payloads = [
+        {
+            "heart_rate": rng.randint(50, 200),
+            "user_message": rng.choice(MESSAGES),
+            "hr_history": [rng.randint(60, 190) for _ in range(5)],
+            "session_id": f"bench-{rng.randrange(concurrency * 4)}",
+        }
+        for _ in range(requests_count)
+    ]
+    endpoints = {
+        "/recommend": lambda client, payload: client.post("/recommend", json=payload),
+        "/recommend/batch": lambda client, payload: client.post("/recommend/batch", json=[payload] * 32),
+        "/recommend/queue": lambda client, payload: client.post("/recommend/queue", json=payload),
+    }
+
+    results = {}
+    saved = api.session_store, api.play_history
+    api.app.state.logic_engine = logic
+    api.session_store, api.play_history = SessionStore(), PlayHistoryStore()
+    client = TestClient(api.app)
+    try:
+        for name, call in endpoints.items():
+            def timed(payload):
+                start = time.perf_counter_ns()
+                response = call(client, payload)
+                elapsed = time.perf_counter_ns() - start
+                return elapsed, response.status_code
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(timed, payloads))
+            wall = time.perf_counter() - start
+            stats = percentiles([elapsed for elapsed, _ in outcomes])
+            stats["errors"] = sum(1 for _, status in outcomes if status != 200)
+            stats["requests_per_second"] = len(outcomes) / wall
+            stats["concurrency"] = concurrency
+            results[name] = stats
+    finally:
+        client.close()
+        api.session_store, api.play_history = saved
+        del api.app.state.logic_engine
+    return results
+
+
+def benchmark(sizes, iterations, requests_count, concurrency, skip_load, seed):
+    rng = random.Random(seed)
+    results = []
+    for n_tracks in sizes:
+        with tempfile.TemporaryDirectory(prefix="biosync-bench-") as directory:
+            csv_path, generation_seconds = build_catalog(n_tracks, directory, seed)
+            logic, timings = construction(csv_path, directory)
+            result = {
+                "tracks": n_tracks,
+                "generation_seconds": generation_seconds,
+                "construction": timings,
+                "methods": method_latencies(logic, iterations, rng),
+            }
+            if not skip_load:
+                result["load_test"] = load_test(logic, requests_count, concurrency, rng)
+            results.append(result)
+            print(json.dumps({"tracks": n_tracks, "construction": timings}), file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--iterations", type=int, default=2000, help="Llamadas por método")
+    parser.add_argument("--requests", type=int, default=500, help="Peticiones por endpoint en la prueba de carga")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--skip-load", action="store_true", help="Omitir la prueba de carga de la API")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "latency",
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": vars(args),
+        "results": benchmark(args.sizes, args.iterations, args.requests, args.concurrency, args.skip_load, args.seed),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
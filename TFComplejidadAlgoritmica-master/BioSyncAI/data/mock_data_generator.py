@@ -1,46 +1,124 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+
 import pandas as pd
 import numpy as np
-import random
-
-def generate_mock_spotify_data(num_tracks=1000):
-    """Generates a mock dataset resembling the Spotify Tracks Dataset."""
-    genres = ['Pop', 'Rock', 'EDM', 'Hip-Hop', 'Jazz', 'Classical', 'Indie', 'Metal']
-    data = []
-    
-    for i in range(num_tracks):
-        genre = random.choice(genres)
-        
-        # Correlate energy and tempo roughly with genre for realism
-        if genre in ['EDM', 'Metal', 'Rock']:
-            base_energy = 0.7
-            base_tempo = 120
-        elif genre in ['Pop', 'Hip-Hop']:
-            base_energy = 0.5
-            base_tempo = 100
-        else: # Jazz, Classical, Indie
-            base_energy = 0.3
-            base_tempo = 80
-            
-        energy = min(1.0, max(0.0, np.random.normal(base_energy, 0.15)))
-        tempo = max(60, np.random.normal(base_tempo, 20))
-        valence = random.random() # Mood
-        
-        data.append({
-            'track_id': f'track_{i}',
-            'track_name': f'Song {i}',
-            'artists': f'Artist {random.randint(1, 100)}',
-            'genre': genre,
-            'tempo': round(tempo, 1),
-            'energy': round(energy, 2),
-            'valence': round(valence, 2),
-            'danceability': round(random.random(), 2)
-        })
-        
-    df = pd.DataFrame(data)
-    return df
+
+GENRES = ['Pop', 'Rock', 'EDM', 'Hip-Hop', 'Jazz', 'Classical', 'Indie', 'Metal']
+
+# Correlate energy and tempo roughly with genre for realism: (base_energy, base_tempo)
+GENRE_BASES = {
+    'EDM': (0.7, 120), 'Metal': (0.7, 120), 'Rock': (0.7, 120),
+    'Pop': (0.5, 100), 'Hip-Hop': (0.5, 100),
+    'Jazz': (0.3, 80), 'Classical': (0.3, 80), 'Indie': (0.3, 80),
+}
+
+NUM_ARTISTS = 100
+CHUNK_SIZE = 100_000
+# Marks the fingerprint of catalogs written by write_mock_spotify_catalog
+GENERATOR = "mock_data_generator"
+
+
+def generate_mock_spotify_data(num_tracks=1000, seed=None, start=0):
+    """
+    Generates a mock dataset resembling the Spotify Tracks Dataset.
+    Vectorized with numpy: every column is drawn in one call instead of one
+    Python dict per track. `seed` makes the output reproducible and `start`
+    offsets the track numbering (used when generating in chunks).
+    """
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    genre_codes = rng.integers(len(GENRES), size=num_tracks)
+    bases = np.array([GENRE_BASES[genre] for genre in GENRES])
+    base_energy, base_tempo = bases[genre_codes, 0], bases[genre_codes, 1]
+
+    energy = np.clip(rng.normal(base_energy, 0.15), 0.0, 1.0)
+    tempo = np.maximum(60, rng.normal(base_tempo, 20))
+    ids = np.arange(start, start + num_tracks).astype(str)
+
+    return pd.DataFrame({
+        'track_id': np.char.add('track_', ids),
+        'track_name': np.char.add('Song ', ids),
+        'artists': np.char.add('Artist ', rng.integers(1, NUM_ARTISTS + 1, size=num_tracks).astype(str)),
+        'genre': np.array(GENRES)[genre_codes],
+        'tempo': tempo.round(1),
+        'energy': energy.round(2),
+        'valence': rng.random(num_tracks).round(2),  # Mood
+        'danceability': rng.random(num_tracks).round(2),
+    })
+
+
+def iter_mock_spotify_chunks(num_tracks, chunk_size=CHUNK_SIZE, seed=None):
+    """
+    Generates the dataset in DataFrames of at most `chunk_size` tracks, all
+    drawn from one generator (the output for a seed depends on chunk_size).
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, num_tracks, chunk_size):
+        yield generate_mock_spotify_data(min(chunk_size, num_tracks - start), rng, start)
+
+
+def write_mock_spotify_csv(path, num_tracks=1000, chunk_size=CHUNK_SIZE, seed=None):
+    """Streams the dataset to a CSV file chunk by chunk (bounded memory)."""
+    with open(path, "w", newline="") as f:
+        for i, chunk in enumerate(iter_mock_spotify_chunks(num_tracks, chunk_size, seed)):
+            chunk.to_csv(f, header=i == 0, index=False)
+
+
+def mock_fingerprint(num_tracks, seed):
+    """Identity of a generated catalog, stored in place of the CSV fingerprint."""
+    params = {"generator": GENERATOR, "num_tracks": num_tracks, "seed": seed}
+    return dict(params, sha256=hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest())
+
+
+def has_mock_catalog(directory):
+    """
+    True if `directory` holds a catalog written by write_mock_spotify_catalog.
+    Without a real dataset it is served as is (no CSV to compare it with).
+    """
+    from backend.catalog_store import ColumnarCatalog
+
+    fingerprint = ColumnarCatalog.stored_fingerprint(directory) or {}
+    return fingerprint.get("generator") == GENERATOR
+
+
+def write_mock_spotify_catalog(directory, num_tracks=1000, chunk_size=CHUNK_SIZE, seed=None):
+    """
+    Writes the dataset directly as a binary columnar catalog (see
+    backend/catalog_store.py). Each chunk is written into pre-sized
+    memory-mapped column files and then discarded, so memory stays bounded
+    by the chunk size. Without a seed a fresh one is drawn, so that two
+    random catalogs never share a fingerprint.
+    """
+    from backend.catalog_store import CatalogWriter
+
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    writer = CatalogWriter(directory, num_tracks)
+    try:
+        for chunk in iter_mock_spotify_chunks(num_tracks, chunk_size, seed):
+            writer.write(chunk)
+        return writer.close(mock_fingerprint(num_tracks, seed))
+    except BaseException:
+        writer.abort()
+        raise
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates mock Spotify data.")
+    parser.add_argument("output", nargs="?", default="spotify_mock.csv", help="CSV file or catalog directory")
+    parser.add_argument("--tracks", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--format", choices=["csv", "catalog"], default="csv")
+    args = parser.parse_args()
+
     print("Generating mock Spotify data...")
-    df = generate_mock_spotify_data()
-    df.to_csv("spotify_mock.csv", index=False)
-    print("Saved to spotify_mock.csv")
+    if args.format == "catalog":
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        write_mock_spotify_catalog(args.output, args.tracks, args.chunk_size, args.seed)
+    else:
+        write_mock_spotify_csv(args.output, args.tracks, args.chunk_size, args.seed)
+    print(f"Saved to {args.output}")
@@ -4,13 +4,31 @@ import requests
 import time
 import plotly.graph_objs as go
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import os
 import sys
+import uuid
 
 # Agregar directorio padre al path para permitir importación directa de logic para el modo "Standalone"
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from backend.logic import BioSyncLogic
-from data.mock_data_generator import generate_mock_spotify_data
+from data.mock_data_generator import has_mock_catalog, write_mock_spotify_csv
+from frontend.stream_client import PushStreamClient
+
+API_URL = os.environ.get("BIOSYNC_API_URL", "http://127.0.0.1:8000")
+WS_URL = API_URL.replace("http", "ws", 1)
+# (conexión, lectura) en segundos para las llamadas HTTP a la API
+API_TIMEOUT = (2, 5)
+API_RETRY_SECONDS = 2
+DEMO_SONG_DURATION = 10
+CHART_WINDOW = 50
+
+MODE_STANDALONE = "Standalone (Direct Python)"
+MODE_API = "API (FastAPI)"
+MODE_PUSH = "API Push (WebSocket)"
 
 # Page Config
 st.set_page_config(
@@ -82,13 +100,15 @@ else:
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Debug Info")
-api_mode = st.sidebar.radio("Modo de Operación", ["Standalone (Direct Python)", "API (FastAPI)"])
+api_mode = st.sidebar.radio("Modo de Operación", [MODE_STANDALONE, MODE_API, MODE_PUSH])
 
 # --- Gestión de Estado ---
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = f"dashboard-{uuid.uuid4().hex[:8]}"
 if 'history_hr' not in st.session_state:
-    st.session_state.history_hr = deque(maxlen=50)
+    st.session_state.history_hr = deque(maxlen=CHART_WINDOW)
 if 'history_tempo' not in st.session_state:
-    st.session_state.history_tempo = deque(maxlen=50)
+    st.session_state.history_tempo = deque(maxlen=CHART_WINDOW)
 if 'current_song' not in st.session_state:
     st.session_state.current_song = None
 if 'last_zone' not in st.session_state:
@@ -103,30 +123,78 @@ def get_logic_engine():
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # BioSyncAI/
     real_data_path = os.path.join(base_dir, "data", "dataset.csv")
     mock_data_path = os.path.join(base_dir, "data", "spotify_mock.csv")
+    model_dir = os.path.join(base_dir, "data", "models")
+    catalog_dir = os.path.join(base_dir, "data", "catalog")
     
     if os.path.exists(real_data_path):
-        return BioSyncLogic(music_db_path=real_data_path)
+        return BioSyncLogic(music_db_path=real_data_path, model_dir=model_dir, catalog_dir=catalog_dir)
+    if has_mock_catalog(catalog_dir):
+        # Catálogo generado con `mock_data_generator.py --format catalog`
+        return BioSyncLogic(model_dir=model_dir, catalog_dir=catalog_dir)
     
     if not os.path.exists(mock_data_path):
-        df = generate_mock_spotify_data()
         os.makedirs(os.path.join(base_dir, "data"), exist_ok=True)
-        df.to_csv(mock_data_path, index=False)
-    return BioSyncLogic(music_db_path=mock_data_path)
+        write_mock_spotify_csv(mock_data_path)
+    return BioSyncLogic(music_db_path=mock_data_path, model_dir=model_dir, catalog_dir=catalog_dir)
 
 logic = get_logic_engine()
 
+# --- Cliente HTTP (Modo API) ---
+@st.cache_resource
+def get_http_session():
+    # Sesión compartida: reutiliza conexiones keep-alive y reintenta solo fallos de conexión
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(connect=2, read=0, backoff_factor=0.2))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_request_executor():
+    # Las recomendaciones se piden en segundo plano para no bloquear el renderizado
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="biosync-api")
+
+def fetch_recommendation(session, payload):
+    # Corre en un hilo del executor (sin contexto de Streamlit): la sesión se
+    # obtiene en el hilo del script y se pasa como argumento
+    try:
+        response = session.post(f"{API_URL}/recommend", json=payload, timeout=API_TIMEOUT)
+    except requests.RequestException:
+        return None, "Connection Error"
+    if response.status_code != 200:
+        return None, "Error"
+    return response.json(), None
+
+def get_push_client():
+    # Un cliente de streaming por sesión del navegador; se cierra al cambiar de modo
+    client = st.session_state.get('push_client')
+    if api_mode != MODE_PUSH:
+        if client is not None:
+            client.close()
+            st.session_state.push_client = None
+        return None
+    if client is None:
+        client = PushStreamClient(WS_URL, st.session_state.session_id, song_duration=DEMO_SONG_DURATION)
+        st.session_state.push_client = client
+    return client
+
+push_client = get_push_client()
+
 # --- Simulación de Bucle Principal ---
 heart_rate = st.session_state.simulated_hr
 
 # Lógica de Auto-Simulación
-if auto_simulate:
-    import numpy as np
+def simulate_step(heart_rate):
     # Caminata aleatoria: pequeño cambio respecto al anterior
     change = np.random.randint(-3, 4) 
     heart_rate += change
     # Limitar valores
     heart_rate = max(60, min(200, heart_rate))
     st.session_state.simulated_hr = heart_rate
+    return heart_rate
+
+if auto_simulate:
+    heart_rate = simulate_step(heart_rate)
 
 # Input Chatbot NLP
 st.sidebar.markdown("---")
@@ -152,11 +220,39 @@ if 'last_sentiment_label' not in st.session_state:
 if 'last_bot_response' not in st.session_state:
     st.session_state.last_bot_response = "Esperando tu estado..."
 
-if should_fetch_new_song:
+new_song, new_zone = None, zone
+pending = st.session_state.get('pending_recommendation')
+if api_mode == MODE_API and pending is not None and pending.done():
+    # Aplicar la respuesta que llegó en segundo plano
+    st.session_state.pending_recommendation = None
+    data, error = pending.result()
+    if data is not None:
+        new_song = data['recommended_song']
+        new_zone = data['zone']
+        fatigue_risk = data.get('fatigue_risk', False)
+        st.session_state.last_sentiment_label = data.get('sentiment_analysis', "Neutral")
+        # Respuesta fallback simple para modo API (puede mejorarse en backend luego)
+        if "Positivo" in st.session_state.last_sentiment_label:
+            st.session_state.last_bot_response = "¡Modo Bestia activado! Vamos a romperla 🚀"
+        elif "Negativo" in st.session_state.last_sentiment_label:
+            st.session_state.last_bot_response = "Entendido. Bajando revoluciones, recupera el aliento. 🧘"
+        else:
+            st.session_state.last_bot_response = "Sigo analizando tus biometría..."
+        # La respuesta ya trae la canción siguiente: no pedir otra en este mismo rerun
+        should_fetch_new_song = False
+    else:
+        if error == "Error":
+            st.error("Error connecting to API")
+        new_zone = error
+        # No reintentar en cada rerun mientras la API no responda
+        st.session_state.api_retry_at = current_time + API_RETRY_SECONDS
+    pending = None
+
+if should_fetch_new_song and api_mode != MODE_PUSH:
     # Preparar historial para predicción de fatiga
     hr_history_list = list(st.session_state.history_hr)
     
-    if api_mode == "Standalone (Direct Python)":
+    if api_mode == MODE_STANDALONE:
         # Análisis de NLP (Centralizado)
         sentiment_adjustment, sentiment_label, bot_response = logic.analyze_sentiment(user_message)
         
@@ -167,68 +263,54 @@ if should_fetch_new_song:
         new_song, new_zone = logic.recommend_song(heart_rate, current_song_id, sentiment_adjustment)
         fatigue_risk = logic.predict_fatigue(hr_history_list)
         
-    else:
-        # Llamada a API
-        try:
-            payload = {
-                "heart_rate": heart_rate, 
-                "current_song_id": current_song_id,
-                "user_message": user_message,
-                "hr_history": hr_history_list
-            }
-            response = requests.post("http://127.0.0.1:8000/recommend", json=payload)
-            if response.status_code == 200:
-                data = response.json()
-                new_song = data['recommended_song']
-                new_zone = data['zone']
-                fatigue_risk = data.get('fatigue_risk', False)
-                st.session_state.last_sentiment_label = data.get('sentiment_analysis', "Neutral")
-                # Respuesta fallback simple para modo API (puede mejorarse en backend luego)
-                if "Positivo" in st.session_state.last_sentiment_label:
-                    st.session_state.last_bot_response = "¡Modo Bestia activado! Vamos a romperla 🚀"
-                elif "Negativo" in st.session_state.last_sentiment_label:
-                    st.session_state.last_bot_response = "Entendido. Bajando revoluciones, recupera el aliento. 🧘"
-                else:
-                    st.session_state.last_bot_response = "Sigo analizando tus biometría..."
-            else:
-                st.error("Error connecting to API")
-                new_song, new_zone = None, "Error"
-        except:
-            new_song, new_zone = None, "Connection Error"
+    elif pending is None and current_time >= st.session_state.get('api_retry_at', 0):
+        # Llamada a API en segundo plano: se sigue mostrando la canción actual hasta que responda
+        payload = {
+            "heart_rate": heart_rate, 
+            "current_song_id": current_song_id,
+            "user_message": user_message,
+            "hr_history": hr_history_list,
+        }
+        st.session_state.pending_recommendation = get_request_executor().submit(
+            fetch_recommendation, get_http_session(), payload
+        )
+
+if new_song:
+    song = new_song
+    zone = new_zone
+    st.session_state.next_song_switch_time = current_time + DEMO_SONG_DURATION
     
-    if new_song:
-        song = new_song
-        zone = new_zone
-        DEMO_SONG_DURATION = 10 
-        st.session_state.next_song_switch_time = current_time + DEMO_SONG_DURATION
-        
-        st.session_state.current_song = song
-        st.session_state.last_zone = zone
+    st.session_state.current_song = song
+    st.session_state.last_zone = zone
+elif new_zone != zone:
+    zone = new_zone
 
-# Siempre actualizar historial para gráfica
-st.session_state.history_hr.append(heart_rate)
-if song:
-    st.session_state.history_tempo.append(song['tempo'])
-else:
-    st.session_state.history_tempo.append(0)
+# Siempre actualizar historial para gráfica (en modo push lo hace el bucle del final)
+def record_sample(heart_rate, song):
+    st.session_state.history_hr.append(heart_rate)
+    if song:
+        st.session_state.history_tempo.append(song['tempo'])
+    else:
+        st.session_state.history_tempo.append(0)
 
-# --- Layout del Dashboard ---
+if api_mode != MODE_PUSH:
+    record_sample(heart_rate, song)
 
-col1, col2 = st.columns([1, 2])
+# --- Layout del Dashboard ---
 
-with col1:
+def render_status(heart_rate, zone, fatigue_risk, user_message, song, song_switch_time, now):
     st.subheader("Estado Actual")
     st.metric(label="❤️ Ritmo Cardíaco", value=f"{heart_rate} BPM", delta=f"{heart_rate - 90} vs Reposo")
-    
+
     # Alerta de Fatiga
     if fatigue_risk:
         st.error("⚠️ ALERTA DE FATIGA DETECTADA")
         st.caption("La Red Neuronal predice agotamiento inminente. Bajando intensidad...")
-    
+
     if user_message:
         with st.chat_message("user"):
             st.write(user_message)
-            
+
         with st.chat_message("assistant"):
             st.markdown(f"**🧠 Análisis:** {st.session_state.last_sentiment_label}")
             st.write(f"{st.session_state.last_bot_response}")
@@ -238,17 +320,16 @@ with col1:
     elif zone == "Fat Burn": zone_color = "green"
     elif zone == "Cardio": zone_color = "orange"
     elif zone == "Peak Performance": zone_color = "red"
-    
+
     st.markdown(f"### Zona: :{zone_color}[{zone}]")
-    
-    if st.session_state.current_song:
+
+    if song:
         st.markdown("---")
-        
+    
         # Inyectar CSS para visualizador (mantenemos esto para los keyframes de animación)
         inject_visualizer_css(heart_rate)
-        
+    
         # HTML de Tarjeta de Reproductor Unificada
-        song = st.session_state.current_song
         player_html = f"""
 <div style="background-color: #f0f2f6; padding: 20px; border-radius: 10px; border-left: 5px solid #ff4b4b; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
 <h3 style="margin-top: 0; color: #333;">🎵 Reproduciendo Ahora</h3>
@@ -271,45 +352,58 @@ with col1:
         st.markdown(player_html, unsafe_allow_html=True)
 
         # Barra de Progreso para Canción (¿mantener fuera o integrar? Fuera está bien por ahora)
-        time_left = max(0, int(st.session_state.next_song_switch_time - current_time))
+        time_left = max(0, int(song_switch_time - now))
         st.caption(f"Siguiente cambio en: {time_left}s")
-        st.progress(max(0.0, min(1.0, 1 - (time_left / 10.0)))) 
+        st.progress(max(0.0, min(1.0, 1 - (time_left / DEMO_SONG_DURATION)))) 
     else:
         st.warning("Esperando datos...")
 
-with col2:
-    st.subheader("Sincronización en Tiempo Real")
+col1, col2 = st.columns([1, 2])
+
+if api_mode == MODE_PUSH:
+    # Modo push: estado y gráfica se actualizan en sitio desde el bucle del final
+    status_slot = col1.empty()
+    with col2:
+        st.subheader("Sincronización en Tiempo Real")
+        chart_slot = st.empty()
+else:
+    with col1:
+        render_status(heart_rate, zone, fatigue_risk, user_message, st.session_state.current_song,
+                      st.session_state.next_song_switch_time, current_time)
+
+    with col2:
+        st.subheader("Sincronización en Tiempo Real")
     
-    # Graficado
-    if len(st.session_state.history_hr) > 0:
-        fig = go.Figure()
+        # Graficado
+        if len(st.session_state.history_hr) > 0:
+            fig = go.Figure()
         
-        fig.add_trace(go.Scatter(
-            y=list(st.session_state.history_hr),
-            mode='lines+markers',
-            name='Ritmo Cardíaco (User)',
-            line=dict(color='firebrick', width=3)
-        ))
+            fig.add_trace(go.Scatter(
+                y=list(st.session_state.history_hr),
+                mode='lines+markers',
+                name='Ritmo Cardíaco (User)',
+                line=dict(color='firebrick', width=3)
+            ))
         
-        fig.add_trace(go.Scatter(
-            y=list(st.session_state.history_tempo),
-            mode='lines',
-            name='Música BPM (System)',
-            line=dict(color='royalblue', width=3, dash='dot')
-        ))
+            fig.add_trace(go.Scatter(
+                y=list(st.session_state.history_tempo),
+                mode='lines',
+                name='Música BPM (System)',
+                line=dict(color='royalblue', width=3, dash='dot')
+            ))
         
-        fig.update_layout(
-            title="Bio-Music Synchronization",
-            xaxis_title="Tiempo (segundos simulados)",
-            yaxis_title="BPM",
-            template="plotly_white",
-            height=400,
-            yaxis=dict(range=[50, 210]) # Fijar eje y para evitar saltos
-        )
+            fig.update_layout(
+                title="Bio-Music Synchronization",
+                xaxis_title="Tiempo (segundos simulados)",
+                yaxis_title="BPM",
+                template="plotly_white",
+                height=400,
+                yaxis=dict(range=[50, 210]) # Fijar eje y para evitar saltos
+            )
         
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.write("Inicia la simulación para ver la gráfica.")
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.write("Inicia la simulación para ver la gráfica.")
 
 # --- Pie de página / Explicación ---
 st.markdown("---")
@@ -321,7 +415,57 @@ st.markdown("""
 4.  **Feedback**: Visualiza cómo la música 'empuja' o 'sigue' al usuario.
 """)
 
+def chart_frame(heart_rates, tempos, end):
+    return pd.DataFrame(
+        {"Ritmo Cardíaco (User)": heart_rates, "Música BPM (System)": tempos},
+        index=range(end - len(heart_rates), end),
+    )
+
 # Auto-Rerun al final
-if auto_simulate:
+if api_mode == MODE_PUSH:
+    # Bucle en vivo sin st.rerun(): cada segundo se envía la muestra al stream y se
+    # redibujan en sitio el estado y la gráfica con lo último que empujó el servidor.
+    # Cualquier interacción con la barra lateral reinicia el script (y este bucle).
+    if user_message and user_message != st.session_state.get('push_last_message'):
+        push_client.send_message(user_message)
+    st.session_state.push_last_message = user_message
+    if 'chart_tick' not in st.session_state:
+        st.session_state.chart_tick = 0
+
+    while True:
+        push_client.send_heart_rate(heart_rate)
+        state = push_client.snapshot()
+        if state['song'] is not None and state['song'] is not st.session_state.current_song:
+            st.session_state.current_song = state['song']
+            st.session_state.next_song_switch_time = state['song_received_at'] + DEMO_SONG_DURATION
+        if state['zone'] is not None:
+            st.session_state.last_zone = state['zone']
+        if state['sentiment_analysis'] is not None:
+            st.session_state.last_sentiment_label = state['sentiment_analysis']
+            st.session_state.last_bot_response = state['bot_response']
+
+        song = st.session_state.current_song
+        record_sample(heart_rate, song)
+        st.session_state.chart_tick += 1
+        # Solo se reemplaza el elemento de la gráfica con la ventana acotada (sin reejecutar el script)
+        chart_slot.line_chart(
+            chart_frame(list(st.session_state.history_hr), list(st.session_state.history_tempo), st.session_state.chart_tick),
+            height=400,
+        )
+
+        with status_slot.container():
+            if not state['connected']:
+                st.warning(f"Conectando al stream {WS_URL}... {state['error'] or ''}")
+            render_status(heart_rate, st.session_state.last_zone, state['fatigue_risk'], user_message, song,
+                          st.session_state.next_song_switch_time, time.time())
+
+        time.sleep(1)
+        if auto_simulate:
+            heart_rate = simulate_step(heart_rate)
+elif auto_simulate:
     time.sleep(1) # Esperar 1 segundo antes de la siguiente actualización
     st.rerun()
+elif api_mode == MODE_API and st.session_state.get('pending_recommendation') is not None:
+    # Volver a consultar en breve la recomendación pendiente (la pantalla ya está dibujada)
+    time.sleep(0.25)
+    st.rerun()
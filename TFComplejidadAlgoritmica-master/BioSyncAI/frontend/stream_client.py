@@ -0,0 +1,135 @@
+import asyncio
+import json
+import threading
+import time
+
+# Muestras pendientes de envío como máximo mientras no hay conexión (se descartan las más viejas)
+OUTBOX_SIZE = 32
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 10.0
+
+
+class PushStreamClient:
+    """
+    Cliente en segundo plano de la sesión de streaming (/ws/session/{id}).
+
+    Un hilo daemon mantiene la conexión WebSocket con su propio event loop:
+    envía las muestras de RC y los mensajes encolados y aplica los eventos
+    que empuja el servidor (zona, fatiga, sentimiento, canción) a un estado
+    compartido. El dashboard solo encola y lee `snapshot()`, así que nunca
+    espera a la red ni a la recomendación para renderizar.
+    """
+
+    def __init__(self, ws_url, session_id, song_duration=None):
+        query = f"?song_duration={song_duration}" if song_duration else ""
+        self.url = f"{ws_url.rstrip('/')}/ws/session/{session_id}{query}"
+        self._lock = threading.Lock()
+        self._state = {
+            "connected": False,
+            "error": None,
+            "zone": None,
+            "fatigue_risk": False,
+            "sentiment_analysis": None,
+            "bot_response": None,
+            "song": None,
+            "song_received_at": None,
+            "events": 0,
+        }
+        self._loop = asyncio.new_event_loop()
+        self._outbox = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="biosync-push-stream", daemon=True)
+        self._thread.start()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._state)
+
+    def send_heart_rate(self, heart_rate):
+        self._enqueue(str(heart_rate))
+
+    def send_message(self, message):
+        self._enqueue(json.dumps({"message": message}))
+
+    def skip_song(self):
+        self._enqueue(json.dumps({"type": "next"}))
+
+    def close(self):
+        self._closed = True
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def _enqueue(self, frame):
+        if not self._closed and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._put, frame)
+
+    def _put(self, frame):
+        if self._outbox.full():
+            self._outbox.get_nowait()
+        self._outbox.put_nowait(frame)
+
+    def _update(self, **values):
+        with self._lock:
+            self._state.update(values)
+
+    def _apply(self, event):
+        kind = event.get("type")
+        with self._lock:
+            self._state["events"] += 1
+            if kind == "zone":
+                self._state["zone"] = event["zone"]
+            elif kind == "fatigue":
+                self._state["fatigue_risk"] = event["fatigue_risk"]
+            elif kind == "sentiment":
+                self._state["sentiment_analysis"] = event["sentiment_analysis"]
+                self._state["bot_response"] = event["bot_response"]
+            elif kind == "song":
+                self._state["song"] = event["recommended_song"]
+                self._state["song_received_at"] = time.time()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._outbox = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        self._stop = asyncio.Event()
+        try:
+            self._loop.run_until_complete(self._connect_forever())
+        finally:
+            self._loop.close()
+
+    async def _connect_forever(self):
+        import websockets
+
+        delay = RECONNECT_MIN_SECONDS
+        while not (self._closed or self._stop.is_set()):
+            try:
+                async with websockets.connect(self.url) as connection:
+                    self._update(connected=True, error=None)
+                    delay = RECONNECT_MIN_SECONDS
+                    await self._session(connection)
+            except Exception as e:
+                self._update(error=str(e) or type(e).__name__)
+            finally:
+                self._update(connected=False)
+            # Reintento con backoff exponencial (se interrumpe al cerrar)
+            try:
+                await asyncio.wait_for(self._stop.wait(), delay)
+            except asyncio.TimeoutError:
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    async def _session(self, connection):
+        async def send():
+            while True:
+                await connection.send(await self._outbox.get())
+
+        async def receive():
+            async for raw in connection:
+                self._apply(json.loads(raw))
+
+        tasks = [asyncio.ensure_future(send()), asyncio.ensure_future(receive()), asyncio.ensure_future(self._stop.wait())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            # Propaga errores de red para reconectar
+            task.result()
@@ -0,0 +1,94 @@
+"""
+Simulador de atletas para generar carga: miles de sesiones concurrentes con
+perfiles de RC sintéticos (random_walk, interval, fatigue_ramp) o una traza
+grabada, enviadas a BioSyncLogic en proceso, a la API HTTP o a la API de
+streaming (WebSocket) a la tasa pedida. Reporta throughput y latencias en JSON.
+
+Uso (desde BioSyncAI/):
+    python -m simulator --athletes 1000 --seconds 60 --target inprocess
+    python -m simulator --athletes 500 --seconds 30 --record trace.npz --target none
+    python -m simulator --replay trace.npz --target http --url http://127.0.0.1:8000 --rate 5
+    python -m simulator --athletes 200 --seconds 30 --target ws --url ws://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.athletes import PROFILES, AthletePopulation, Trace
+from simulator.drivers import HTTPDriver, InProcessDriver, WebSocketDriver, drive
+
+DEFAULT_HOST = "127.0.0.1:8000"
+
+
+def resolve_url(url, target):
+    """URL del servidor con el esquema que corresponde al target (ws:// o http://)."""
+    if url is None:
+        return f"{'ws' if target == 'ws' else 'http'}://{DEFAULT_HOST}"
+    if target == "ws" and url.startswith(("http://", "https://")):
+        return "ws" + url[len("http"):]
+    return url
+
+
+def build_driver(args):
+    if args.target == "inprocess":
+        from backend.main import create_logic_engine
+
+        return InProcessDriver(create_logic_engine())
+    url = resolve_url(args.url, args.target)
+    if args.target == "http":
+        return HTTPDriver(url, args.concurrency, args.batch_size)
+    return WebSocketDriver(url, args.concurrency, args.song_duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--athletes", type=int, default=100)
+    parser.add_argument("--seconds", type=int, default=60, help="Segundos simulados (ticks)")
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Ticks por segundo real (1 = tiempo real; por defecto la tasa de la traza)")
+    parser.add_argument("--record", help="Guardar la traza generada en este archivo .npz")
+    parser.add_argument("--replay", help="Reproducir una traza grabada en lugar de generar una")
+    parser.add_argument("--target", choices=["inprocess", "http", "ws", "none"], default="inprocess")
+    parser.add_argument("--url", default=None,
+                        help=f"Servidor (por defecto http://{DEFAULT_HOST}, o ws://{DEFAULT_HOST} con --target ws)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=0, help="Agrupar muestras en /recommend/batch (modo http)")
+    parser.add_argument("--song-duration", type=float, default=None, help="Duración de canción para el modo ws")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    if args.replay:
+        trace = Trace.load(args.replay)
+    else:
+        population = AthletePopulation(args.athletes, args.profiles, args.seed)
+        trace = Trace.from_population(population, args.seconds)
+    if args.record:
+        trace.save(args.record)
+
+    report = {
+        "simulator": {
+            "athletes": len(trace.session_ids),
+            "ticks": len(trace),
+            "profiles": sorted(set(trace.profiles)),
+            "source": args.replay or "generated",
+            "target": args.target,
+        },
+    }
+    if args.target != "none":
+        report["results"] = asyncio.run(drive(build_driver(args), trace, args.rate))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import numpy as np
+
+# Perfiles de atletas sintéticos
+PROFILES = ("random_walk", "interval", "fatigue_ramp")
+
+HR_MIN, HR_MAX = 60, 200
+REST_HR = 90
+
+# Entrenamiento por intervalos: segundos de trabajo / descanso y RC objetivo
+INTERVAL_WORK_SECONDS = 60
+INTERVAL_REST_SECONDS = 45
+INTERVAL_WORK_HR = 170
+INTERVAL_REST_HR = 110
+# Fracción de la distancia al objetivo que se recorre por segundo
+INTERVAL_RESPONSE = 0.15
+
+# Rampa de fatiga: BPM que sube el RC por segundo hasta el máximo del atleta
+FATIGUE_RAMP_BPM_PER_SECOND = 0.25
+
+
+class AthletePopulation:
+    """
+    Población de atletas sintéticos simulada de forma vectorizada: cada
+    `step` avanza un segundo para todos los atletas con operaciones numpy.
+
+    - random_walk: caminata aleatoria de ±3 BPM (como el modo auto-simulación del dashboard).
+    - interval: alterna trabajo y descanso; el RC se acerca al objetivo con inercia.
+    - fatigue_ramp: el RC sube de forma sostenida hasta el máximo del atleta.
+    """
+
+    def __init__(self, size, profiles=PROFILES, seed=None):
+        unknown = [profile for profile in profiles if profile not in PROFILES]
+        if unknown:
+            raise ValueError(f"Unknown profiles {unknown}; expected some of {PROFILES}")
+        self.rng = np.random.default_rng(seed)
+        self.size = size
+        self.tick = 0
+
+        codes = [PROFILES.index(profile) for profile in profiles]
+        self.profile_codes = np.asarray(codes)[np.arange(size) % len(codes)]
+        self.heart_rates = self.rng.normal(REST_HR, 8, size).clip(HR_MIN, HR_MAX)
+        # Desfase de cada atleta dentro del ciclo de intervalos y RC máximo individual
+        cycle = INTERVAL_WORK_SECONDS + INTERVAL_REST_SECONDS
+        self.interval_offset = self.rng.integers(cycle, size=size)
+        self.max_hr = self.rng.normal(190, 6, size).clip(170, HR_MAX)
+
+    @property
+    def session_ids(self):
+        return [f"athlete-{i}" for i in range(self.size)]
+
+    def profile_names(self):
+        return [PROFILES[code] for code in self.profile_codes]
+
+    def step(self):
+        """Avanza un segundo y retorna el RC entero de cada atleta."""
+        hr = self.heart_rates
+        noise = self.rng.normal(0, 1.5, self.size)
+
+        walk = self.profile_codes == 0
+        hr[walk] += self.rng.integers(-3, 4, walk.sum())
+
+        interval = self.profile_codes == 1
+        cycle = INTERVAL_WORK_SECONDS + INTERVAL_REST_SECONDS
+        working = (self.tick + self.interval_offset[interval]) % cycle < INTERVAL_WORK_SECONDS
+        target = np.where(working, INTERVAL_WORK_HR, INTERVAL_REST_HR)
+        hr[interval] += INTERVAL_RESPONSE * (target - hr[interval]) + noise[interval]
+
+        ramp = self.profile_codes == 2
+        hr[ramp] = np.minimum(hr[ramp] + FATIGUE_RAMP_BPM_PER_SECOND + noise[ramp] * 0.5, self.max_hr[ramp])
+
+        np.clip(hr, HR_MIN, HR_MAX, out=hr)
+        self.tick += 1
+        return np.rint(hr).astype(np.int64)
+
+    def simulate(self, seconds):
+        """Matriz (seconds, size) de RC, una fila por segundo."""
+        return np.stack([self.step() for _ in range(seconds)]) if seconds else np.empty((0, self.size), dtype=np.int64)
+
+
+def record_trace(path, heart_rates, session_ids, profiles, rate=1.0):
+    """
+    Guarda una traza (matriz ticks x atletas de RC) en un .npz comprimido,
+    junto con los ids de sesión, los perfiles y la tasa de muestreo.
+    """
+    np.savez_compressed(
+        path,
+        heart_rates=np.asarray(heart_rates, dtype=np.int16),
+        session_ids=np.asarray(session_ids),
+        profiles=np.asarray(profiles),
+        rate=np.float64(rate),
+    )
+
+
+class Trace:
+    """Traza grabada con `record_trace`, lista para reproducirse."""
+
+    def __init__(self, heart_rates, session_ids, profiles, rate=1.0):
+        self.heart_rates = heart_rates
+        self.session_ids = list(session_ids)
+        self.profiles = list(profiles)
+        self.rate = rate
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data["heart_rates"].astype(np.int64),
+                data["session_ids"].tolist(),
+                data["profiles"].tolist(),
+                float(data["rate"]),
+            )
+
+    @classmethod
+    def from_population(cls, population, seconds, rate=1.0):
+        return cls(population.simulate(seconds), population.session_ids, population.profile_names(), rate)
+
+    def save(self, path):
+        record_trace(path, self.heart_rates, self.session_ids, self.profiles, self.rate)
+
+    def __len__(self):
+        return len(self.heart_rates)
+
+    def __iter__(self):
+        return iter(self.heart_rates)
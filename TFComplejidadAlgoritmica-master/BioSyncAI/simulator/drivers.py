@@ -0,0 +1,256 @@
+import asyncio
+import time
+
+import numpy as np
+
+from backend.play_history import PlayHistoryStore
+from backend.sessions import SessionStore
+
+HTTP_TIMEOUT_SECONDS = 10.0
+
+
+class LoadStats:
+    """
+    Latencias (ns), errores y contadores acumulados durante una corrida.
+    `samples` cuenta solo las muestras entregadas con éxito (el throughput
+    se calcula con ellas); las de peticiones fallidas van a `failed_samples`.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.samples = 0
+        self.failed_samples = 0
+        self.errors = 0
+        self.events = 0
+        self.max_lag = 0.0
+        self.wall = 0.0
+
+    def observe(self, elapsed_ns, samples=1, ok=True):
+        self.latencies.append(elapsed_ns)
+        if ok:
+            self.samples += samples
+        else:
+            self.failed_samples += samples
+            self.errors += 1
+
+    def report(self, target_rate):
+        report = {
+            "samples": self.samples,
+            "failed_samples": self.failed_samples,
+            "errors": self.errors,
+            "events": self.events,
+            "wall_seconds": self.wall,
+            "target_samples_per_second": target_rate,
+            "achieved_samples_per_second": self.samples / self.wall if self.wall else 0.0,
+            # Cuánto se atrasó el peor tick respecto a la tasa pedida
+            "max_lag_seconds": self.max_lag,
+        }
+        if self.latencies:
+            latencies = np.asarray(self.latencies, dtype=float) / 1e6
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            report["latency_ms"] = {
+                "count": len(latencies),
+                "mean": float(latencies.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(latencies.max()),
+            }
+        return report
+
+
+async def drive(driver, trace, rate=None):
+    """
+    Reproduce la traza contra el driver: un tick (una muestra por atleta)
+    cada 1/rate segundos. Cada tick se envía completo antes del siguiente;
+    si el sistema no da abasto, los ticks se atrasan y se reporta el retraso.
+    """
+    rate = rate or trace.rate
+    stats = LoadStats()
+    await driver.start(trace.session_ids, stats)
+    try:
+        start = time.perf_counter()
+        for tick, heart_rates in enumerate(trace):
+            delay = start + tick / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                stats.max_lag = max(stats.max_lag, -delay)
+            await driver.send_tick(trace.session_ids, heart_rates.tolist(), stats)
+        await driver.drain()
+        stats.wall = time.perf_counter() - start
+    finally:
+        await driver.stop()
+    return stats.report(rate * len(trace.session_ids))
+
+
+class InProcessDriver:
+    """
+    Llama a BioSyncLogic directamente (sin HTTP), con el mismo estado por
+    sesión que la API: ring buffer de RC para la fatiga e historial de reproducción.
+    """
+
+    def __init__(self, logic):
+        self.logic = logic
+        self.session_store = SessionStore()
+        self.play_history = PlayHistoryStore()
+        self.current_songs = {}
+
+    async def start(self, session_ids, stats):
+        pass
+
+    async def send_tick(self, session_ids, heart_rates, stats):
+        await asyncio.to_thread(self._tick, session_ids, heart_rates, stats)
+
+    def _tick(self, session_ids, heart_rates, stats):
+        for session_id, heart_rate in zip(session_ids, heart_rates):
+            start = time.perf_counter_ns()
+            self.session_store.append(session_id, heart_rate)
+            song, _ = self.logic.recommend_song(
+                heart_rate, self.current_songs.get(session_id), 0,
+                history=self.play_history.get(session_id), fields=("track_id",),
+            )
+            self.session_store.predict_fatigue(self.logic, [session_id])
+            stats.observe(time.perf_counter_ns() - start, ok=song is not None)
+            if song:
+                self.current_songs[session_id] = song["track_id"]
+
+    async def drain(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class HTTPDriver:
+    """
+    Envía las muestras a la API HTTP con httpx (conexiones reutilizadas y
+    `concurrency` peticiones en vuelo como máximo). Con `batch_size` agrupa
+    las muestras de cada tick en llamadas a /recommend/batch.
+    """
+
+    def __init__(self, base_url, concurrency=64, batch_size=0, timeout=HTTP_TIMEOUT_SECONDS):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.current_songs = {}
+        self.client = None
+
+    async def start(self, session_ids, stats):
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self.client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    def _payload(self, session_id, heart_rate):
+        return {"heart_rate": heart_rate, "session_id": session_id, "current_song_id": self.current_songs.get(session_id)}
+
+    async def _post(self, path, payload, samples, stats):
+        async with self._semaphore:
+            start = time.perf_counter_ns()
+            try:
+                response = await self.client.post(path, params={"ids_only": "true"}, json=payload)
+                ok = response.status_code == 200
+            except Exception:
+                response, ok = None, False
+            stats.observe(time.perf_counter_ns() - start, samples, ok)
+        return response.json() if ok else None
+
+    async def _send_one(self, session_id, heart_rate, stats):
+        data = await self._post("/recommend", self._payload(session_id, heart_rate), 1, stats)
+        if data and data.get("recommended_song_id"):
+            self.current_songs[session_id] = data["recommended_song_id"]
+
+    async def _send_batch(self, session_ids, heart_rates, stats):
+        payload = [self._payload(s, hr) for s, hr in zip(session_ids, heart_rates)]
+        data = await self._post("/recommend/batch", payload, len(payload), stats)
+        for session_id, item in zip(session_ids, data or []):
+            if item.get("recommended_song_id"):
+                self.current_songs[session_id] = item["recommended_song_id"]
+
+    async def send_tick(self, session_ids, heart_rates, stats):
+        if self.batch_size:
+            size = self.batch_size
+            await asyncio.gather(*(
+                self._send_batch(session_ids[i:i + size], heart_rates[i:i + size], stats)
+                for i in range(0, len(session_ids), size)
+            ))
+        else:
+            await asyncio.gather(*(
+                self._send_one(session_id, heart_rate, stats)
+                for session_id, heart_rate in zip(session_ids, heart_rates)
+            ))
+
+    async def drain(self):
+        pass
+
+    async def stop(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+
+class WebSocketDriver:
+    """
+    Abre una sesión WebSocket (/ws/session/{id}) por atleta y envía un frame
+    de RC por tick. El servidor solo empuja eventos cuando algo cambia, así
+    que la latencia se mide desde el primer frame sin respuesta hasta el
+    siguiente evento recibido en esa sesión.
+    """
+
+    def __init__(self, base_url, concurrency=64, song_duration=None):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.song_duration = song_duration
+        self.connections = {}
+        self.sent_at = {}
+        self.receivers = []
+
+    async def start(self, session_ids, stats):
+        import websockets
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        query = f"?song_duration={self.song_duration}" if self.song_duration else ""
+
+        async def connect(session_id):
+            async with semaphore:
+                self.connections[session_id] = await websockets.connect(f"{self.base_url}/ws/session/{session_id}{query}")
+
+        await asyncio.gather(*(connect(session_id) for session_id in session_ids))
+        self.receivers = [
+            asyncio.create_task(self._receive(session_id, connection, stats))
+            for session_id, connection in self.connections.items()
+        ]
+
+    async def _receive(self, session_id, connection, stats):
+        try:
+            async for _ in connection:
+                stats.events += 1
+                sent_at = self.sent_at.pop(session_id, None)
+                if sent_at is not None:
+                    stats.latencies.append(time.perf_counter_ns() - sent_at)
+        except Exception:
+            pass
+
+    async def _send(self, session_id, heart_rate, stats):
+        try:
+            self.sent_at.setdefault(session_id, time.perf_counter_ns())
+            await self.connections[session_id].send(str(heart_rate))
+            stats.samples += 1
+        except Exception:
+            stats.failed_samples += 1
+            stats.errors += 1
+
+    async def send_tick(self, session_ids, heart_rates, stats):
+        await asyncio.gather(*(self._send(s, hr, stats) for s, hr in zip(session_ids, heart_rates)))
+
+    async def drain(self):
+        # Margen para recibir los eventos del último tick
+        await asyncio.sleep(0.2)
+
+    async def stop(self):
+        await asyncio.gather(*(connection.close() for connection in self.connections.values()), return_exceptions=True)
+        for receiver in self.receivers:
+            receiver.cancel()
+        await asyncio.gather(*self.receivers, return_exceptions=True)
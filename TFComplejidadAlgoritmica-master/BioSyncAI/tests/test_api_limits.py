@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fastapi = pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+import backend.main as api
+
+
+class StubLogic:
+    def add_tracks(self, tracks):
+        return {"added": len(tracks)}
+
+
+TRACK = {"track_id": "x", "track_name": "Song", "artists": "Artist", "tempo": 120, "energy": 0.5}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Sin `with`: no se ejecuta el lifespan real (no se carga ni escribe el catálogo)
+    monkeypatch.setattr(api.app.state, "logic_engine", StubLogic(), raising=False)
+    return TestClient(api.app)
+
+
+def test_batch_size_is_capped(client, monkeypatch):
+    monkeypatch.setattr(api, "MAX_BATCH_SIZE", 2)
+    response = client.post("/recommend/batch", json=[{"heart_rate": 120}] * 3)
+    assert response.status_code == 413
+
+
+def test_admin_tracks_need_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(api, "admin_token", None)
+    assert client.post("/admin/tracks", json=[TRACK]).status_code == 503
+
+    monkeypatch.setattr(api, "admin_token", "s3cret")
+    assert client.post("/admin/tracks", json=[TRACK]).status_code == 401
+    assert client.post("/admin/tracks", json=[TRACK], headers={"Authorization": "Bearer nope"}).status_code == 403
+    headers = {"Authorization": "Bearer s3cret"}
+    assert client.post("/admin/tracks", json=[TRACK], headers=headers).json() == {"added": 1}
+
+    monkeypatch.setattr(api, "MAX_ADMIN_TRACKS", 1)
+    assert client.post("/admin/tracks", json=[TRACK] * 2, headers=headers).status_code == 413
@@ -0,0 +1,117 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import catalog_index
+from backend.catalog_index import CatalogIndex, TrackIdLookup, sort_track_ids
+
+CLUSTERS = [0, 1, 0, 1, 2, 0]
+TRACK_IDS = ["a", "b", "c", "d", "e", "f"]
+
+
+@pytest.fixture
+def index():
+    return CatalogIndex(CLUSTERS, TRACK_IDS)
+
+
+def picks(index, cluster, exclude, draws=200, seed=0):
+    rng = random.Random(seed)
+    return {index.pick(cluster, exclude, rng) for _ in range(draws)}
+
+
+def test_members_are_grouped_by_cluster(index):
+    assert len(index) == 6
+    assert index.members[0].tolist() == [0, 2, 5]
+    assert index.members[1].tolist() == [1, 3]
+    assert index.members[2].tolist() == [4]
+
+
+def test_pick_stays_in_cluster_and_skips_current_track(index):
+    assert picks(index, 0, "a") == {2, 5}
+    assert picks(index, 0, None) == {0, 2, 5}
+    # El track excluido de otro cluster no afecta al muestreo
+    assert picks(index, 1, "a") == {1, 3}
+
+
+def test_single_track_cluster_returns_it_even_if_current(index):
+    assert picks(index, 2, "e") == {4}
+
+
+def test_unknown_cluster_falls_back_to_whole_catalog(index):
+    assert picks(index, 7, "a") == {1, 2, 3, 4, 5}
+    assert picks(index, None, None) == set(range(6))
+
+
+def test_duplicate_track_ids_are_all_skipped():
+    index = CatalogIndex([0, 0, 0], ["x", "x", "y"])
+    assert picks(index, 0, "x") == {2}
+
+
+def test_empty_index_picks_nothing():
+    assert CatalogIndex([], []).pick(0, None, random.Random(0)) is None
+
+
+def test_extend_appends_rows_to_their_clusters():
+    original = CatalogIndex([0, 1], ["a", "b"])
+    index = original.extend([1, 2], ["a", "b", "c", "d"])
+    assert len(index) == 4
+    assert index.lineage is original.lineage
+    assert index.members[1].tolist() == [1, 2]
+    assert index.members[2].tolist() == [3]
+    assert picks(index, 1, "b") == {2}
+    assert picks(index, 2, None) == {3}
+    # El índice original no cambia
+    assert len(original) == 2
+    assert original.members[1].tolist() == [1]
+    assert 2 not in original.members
+    assert picks(original, 1, None) == {1}
+
+
+def test_sample_returns_distinct_rows_outside_exclude():
+    index = CatalogIndex([0] * 6, ["a", "b", "c", "d", "e", "f"])
+    rows = index.sample(0, 3, {"a", "b"}, random.Random(1))
+    assert len(rows) == len(set(rows)) == 3
+    assert not {0, 1} & set(rows)
+    assert index.sample(5, 3, set(), random.Random(1)) == []
+
+
+def test_track_id_lookup_keeps_the_first_duplicate_row():
+    ids = TrackIdLookup(*sort_track_ids(["b", "a", "b", "ñ"]))
+    assert ids.keys.tolist() == [b"a", b"b", b"b", "ñ".encode("utf-8")]
+    assert [ids.row(t) for t in ["a", "b", "ñ"]] == [1, 0, 3]
+    assert ids.row("zz") is None
+    assert ids.row("much-longer-than-any-id") is None
+    assert ids.row(1) is None
+
+
+def test_track_id_lookup_with_integer_ids():
+    ids = TrackIdLookup(*sort_track_ids(np.array([30, 10, 20])))
+    assert [ids.row(10), ids.row(np.int64(30))] == [1, 0]
+    assert ids.row("10") is None
+    assert ids.extend([40], 3).row(40) == 3
+
+
+def test_track_id_lookup_extends_and_merges(monkeypatch):
+    monkeypatch.setattr(catalog_index, "MERGE_FRACTION", 0.5)
+    base = TrackIdLookup(*sort_track_ids(["a", "b", "c", "d"]))
+    extended = base.extend(["e"], 4)
+    # Bloque aparte mientras sea pequeño; el original no cambia
+    assert extended.keys is base.keys and extended.extra is not None
+    assert base.row("e") is None
+    merged = extended.extend(["a", "f"], 5)
+    assert merged.extra is None and len(merged.keys) == 7
+    assert [merged.row(t) for t in "abcdef"] == [0, 1, 2, 3, 4, 6]
+
+
+def test_index_uses_the_given_sorted_ids():
+    sorted_ids = sort_track_ids(TRACK_IDS)
+    index = CatalogIndex(CLUSTERS, TRACK_IDS, sorted_ids)
+    assert index.ids.keys is sorted_ids[0]
+    assert picks(index, 1, "b") == {3}
+    # Si no corresponden al catálogo se vuelven a ordenar
+    assert len(CatalogIndex(CLUSTERS, TRACK_IDS, sort_track_ids(["a"])).ids.keys) == 6
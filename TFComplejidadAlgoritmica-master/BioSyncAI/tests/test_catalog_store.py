@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.catalog_store import META_FILE, STORE_VERSION, CategoricalColumn, ColumnarCatalog, ingest_csv, read_catalog_csv
+from backend.model_store import dataset_fingerprint
+
+FINGERPRINT = {"size": 1, "mtime_ns": 1, "sha256": "abc"}
+ROWS = [
+    {"track_id": "a", "track_name": "Uno", "tempo": 120.0, "energy": 0.5, "year": 2000},
+    {"track_id": "b", "track_name": "Dos", "tempo": 90.5, "energy": 0.25, "year": 2001},
+    {"track_id": "c", "track_name": "Tres", "tempo": 100.0, "energy": 0.75, "year": 2002},
+]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    directory = str(tmp_path / "catalog")
+    ColumnarCatalog.from_dataframe(pd.DataFrame(ROWS)).save(directory, FINGERPRINT)
+    return directory
+
+
+def test_saved_catalog_opens_memory_mapped(directory):
+    catalog = ColumnarCatalog.open(directory, FINGERPRINT)
+    assert len(catalog) == 3
+    assert [catalog.row(i) for i in range(3)] == ROWS
+    assert catalog.column("track_id")[2] == "c"
+    assert isinstance(catalog.column("tempo"), np.memmap)
+    assert catalog.numeric(["tempo", "energy"]).tolist() == [[120.0, 0.5], [90.5, 0.25], [100.0, 0.75]]
+
+
+def test_saved_catalog_keeps_sorted_track_ids_next_to_the_columns(directory):
+    catalog = ColumnarCatalog.open(directory, FINGERPRINT)
+    keys, rows = catalog.sorted_ids
+    assert isinstance(keys, np.memmap) and isinstance(rows, np.memmap)
+    assert keys.tolist() == [b"a", b"b", b"c"] and rows.tolist() == [0, 1, 2]
+    # Catálogos sin los ids ordenados siguen abriéndose
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+    del meta["sorted_ids"]
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump(meta, f)
+    assert ColumnarCatalog.open(directory, FINGERPRINT).sorted_ids is None
+
+
+def test_open_rejects_a_stale_fingerprint(directory):
+    assert ColumnarCatalog.stored_fingerprint(directory) == FINGERPRINT
+    assert ColumnarCatalog.open(directory, dict(FINGERPRINT, sha256="other")) is None
+    assert ColumnarCatalog.open(directory) is not None
+
+
+def test_catalog_without_metadata_is_ignored(tmp_path, directory):
+    assert ColumnarCatalog.open(str(tmp_path / "missing")) is None
+    os.remove(os.path.join(directory, META_FILE))
+    assert ColumnarCatalog.open(directory) is None
+    assert ColumnarCatalog.stored_fingerprint(directory) is None
+
+
+def test_catalog_from_another_store_version_is_ignored(directory):
+    path = os.path.join(directory, META_FILE)
+    with open(path) as f:
+        meta = json.load(f)
+    meta["version"] = STORE_VERSION + 1
+    with open(path, "w") as f:
+        json.dump(meta, f)
+    assert ColumnarCatalog.open(directory) is None
+
+
+def test_ingest_csv_writes_typed_columns(tmp_path):
+    csv_path = tmp_path / "dataset.csv"
+    pd.DataFrame({
+        "track_id": ["a", "b", "c"],
+        "track_name": ["Uno", "Dos", "Tres"],
+        "artists": ["X", "Y", "X"],
+        "tempo": [120.0, 90.5, 100.0],
+        "energy": [0.5, 0.25, 0.75],
+    }).to_csv(csv_path, index=False)
+    directory = str(tmp_path / "catalog")
+
+    catalog = ingest_csv(str(csv_path), directory)
+    assert catalog.column("tempo").dtype == np.float32
+    assert isinstance(catalog.column("artists"), CategoricalColumn)
+    assert list(catalog.column("artists")) == ["X", "Y", "X"]
+
+    fingerprint = dataset_fingerprint(str(csv_path))
+    assert ColumnarCatalog.open(directory, fingerprint) is not None
+    with open(csv_path, "a") as f:
+        f.write("d,Cuatro,Z,80.0,0.1\n")
+    assert ColumnarCatalog.open(directory, dataset_fingerprint(str(csv_path))) is None
+
+
+def test_csv_without_required_columns_reads_empty(tmp_path):
+    csv_path = tmp_path / "dataset.csv"
+    csv_path.write_text("track_id,tempo\na,120\n")
+    assert read_catalog_csv(str(csv_path)).empty
@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import fileutils
+from backend.fileutils import atomic_write, file_lock
+
+
+def write_text(text):
+    def write(path):
+        with open(path, "w") as f:
+            f.write(text)
+    return write
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_text("old")
+    atomic_write(str(path), write_text("new"))
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["data.txt"]
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_text("old")
+
+    def fail(p):
+        write_text("partial")(p)
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        atomic_write(str(path), fail)
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["data.txt"]
+
+
+@pytest.mark.skipif(fileutils.fcntl is None, reason="sin fcntl no hay bloqueo entre procesos")
+def test_file_lock_is_exclusive(tmp_path):
+    order = []
+
+    def second():
+        with file_lock(str(tmp_path)):
+            order.append("second")
+
+    with file_lock(str(tmp_path)):
+        thread = threading.Thread(target=second)
+        thread.start()
+        time.sleep(0.2)
+        order.append("first")
+    thread.join()
+    assert order == ["first", "second"]
@@ -0,0 +1,85 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.logic import BioSyncLogic
+
+
+def make_tracks(prefix, tempos, energies):
+    return pd.DataFrame({
+        "track_id": [f"{prefix}{i}" for i in range(len(tempos))],
+        "track_name": [f"Song {prefix}{i}" for i in range(len(tempos))],
+        "artists": ["Artist"] * len(tempos),
+        "tempo": tempos,
+        "energy": energies,
+    })
+
+
+@pytest.fixture
+def logic():
+    # Sin dataset: el primer lote se entrena de forma completa
+    rng = np.random.default_rng(0)
+    logic = BioSyncLogic()
+    logic.add_tracks(make_tracks("base", rng.uniform(60, 200, 400), rng.uniform(0, 1, 400)))
+    yield logic
+    logic.wait_for_refit()
+
+
+def test_refit_runs_in_a_joinable_thread(logic):
+    far = make_tracks("far", np.full(200, 400.0), np.full(200, 3.0))
+    result = logic.add_tracks(far)
+    assert result["refit_scheduled"]
+    assert not logic._refit_thread.daemon
+    logic.wait_for_refit()
+    assert not logic._refit_thread.is_alive()
+    assert len(logic.clusters) == len(logic.catalog) == 600
+    assert logic.cluster_drift() == 0.0
+
+
+def test_lifespan_waits_for_refit_on_shutdown(monkeypatch):
+    from fastapi.testclient import TestClient
+    import backend.main as api
+
+    class StubLogic:
+        waited = False
+
+        def wait_for_refit(self, timeout=None):
+            StubLogic.waited = True
+
+    monkeypatch.setattr(api, "create_logic_engine", StubLogic)
+    with TestClient(api.app):
+        assert not StubLogic.waited
+    assert StubLogic.waited
+
+
+def test_ingest_publishes_a_new_consistent_state(logic):
+    before = logic.state
+    logic.add_tracks(make_tracks("new", [120.0] * 5, [0.6] * 5))
+    after = logic.state
+    assert after is not before
+    assert len(before.catalog) == len(before.clusters) == len(before.catalog_index) == len(before.nearest_index) == 400
+    assert len(after.catalog) == len(after.clusters) == len(after.catalog_index) == len(after.nearest_index) == 405
+    song, _ = logic.recommend_song(120, mode="nearest")
+    assert song["track_id"] in set(after.catalog.column("track_id"))
+
+
+def test_few_outliers_do_not_trigger_a_refit(logic):
+    result = logic.add_tracks(make_tracks("outlier", [200.0], [0.5]))
+    assert result["drift"] > 1.5
+    assert not result["refit_scheduled"]
+    assert logic._refit_thread is None
+
+
+def test_drift_needs_a_fraction_of_the_catalog(logic, monkeypatch):
+    import backend.logic as logic_module
+
+    monkeypatch.setattr(logic_module, "MIN_DRIFT_TRACKS", 1)
+    monkeypatch.setattr(logic_module, "MIN_DRIFT_FRACTION", 0.3)
+    far = make_tracks("far", np.full(150, 400.0), np.full(150, 3.0))
+    assert not logic.add_tracks(far)["refit_scheduled"]
+    assert logic.add_tracks(far.assign(track_id=far.track_id + "b"))["refit_scheduled"]
@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.metrics import NULL_TIMER, Metrics
+
+
+def test_counters_and_gauges_are_exposed():
+    metrics = Metrics()
+    metrics.requests.inc("GET", "/recommend", "200")
+    metrics.requests.inc("GET", "/recommend", "200")
+    metrics.catalog_tracks.set(42)
+    text = metrics.render()
+    assert "# TYPE biosync_http_requests_total counter" in text
+    assert 'biosync_http_requests_total{method="GET",path="/recommend",status="200"} 2' in text
+    assert "biosync_catalog_tracks 42" in text
+    assert text.endswith("\n")
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics()
+    histogram = metrics.histogram("test_seconds", "Prueba.", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 4.0):
+        histogram.observe(value, "zone")
+    lines = metrics.render().splitlines()
+    assert 'test_seconds_bucket{stage="zone",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="zone",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="zone",le="+Inf"} 3' in lines
+    assert 'test_seconds_sum{stage="zone"} 4.55' in lines
+    assert 'test_seconds_count{stage="zone"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.requests.inc("GET", 'a"b\\c', "200")
+    assert 'path="a\\"b\\\\c"' in metrics.render()
+
+
+def test_gauge_functions_are_evaluated_on_render():
+    metrics = Metrics()
+    size = [1]
+    metrics.catalog_tracks.set_function(lambda: size[0])
+    size[0] = 7
+    assert "biosync_catalog_tracks 7" in metrics.render()
+
+
+def test_stage_timer_records_only_when_enabled():
+    enabled = Metrics()
+    with enabled.stage("zone"):
+        pass
+    assert 'biosync_stage_duration_seconds_count{stage="zone"} 1' in enabled.render()
+
+    disabled = Metrics(enabled=False)
+    assert disabled.stage("zone") is NULL_TIMER
+    assert "stage=" not in disabled.render()
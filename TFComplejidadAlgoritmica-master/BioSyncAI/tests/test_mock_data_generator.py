@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.catalog_store import ColumnarCatalog, read_catalog_csv
+from backend.logic import BioSyncLogic
+from data.mock_data_generator import (
+    has_mock_catalog,
+    mock_fingerprint,
+    write_mock_spotify_catalog,
+    write_mock_spotify_csv,
+)
+
+
+def test_catalog_matches_the_csv_for_the_same_seed(tmp_path):
+    catalog = write_mock_spotify_catalog(str(tmp_path / "catalog"), 250, chunk_size=100, seed=7)
+    write_mock_spotify_csv(str(tmp_path / "mock.csv"), 250, chunk_size=100, seed=7)
+    expected = read_catalog_csv(str(tmp_path / "mock.csv"))
+    assert len(catalog) == 250
+    assert list(catalog.column("track_id")) == expected["track_id"].tolist()
+    assert np.allclose(catalog.column("tempo"), expected["tempo"])
+    assert ColumnarCatalog.stored_fingerprint(str(tmp_path / "catalog")) == mock_fingerprint(250, 7)
+    assert has_mock_catalog(str(tmp_path / "catalog"))
+
+
+def test_csv_catalog_is_not_a_mock_catalog(tmp_path):
+    assert not has_mock_catalog(str(tmp_path))
+    write_mock_spotify_csv(str(tmp_path / "mock.csv"), 50, seed=1)
+    BioSyncLogic(music_db_path=str(tmp_path / "mock.csv"), catalog_dir=str(tmp_path / "catalog"))
+    assert not has_mock_catalog(str(tmp_path / "catalog"))
+
+
+def test_generated_catalog_is_served_by_the_logic(tmp_path):
+    catalog_dir, model_dir = str(tmp_path / "catalog"), str(tmp_path / "models")
+    generated = write_mock_spotify_catalog(catalog_dir, 300, seed=3)
+
+    logic = BioSyncLogic(model_dir=model_dir, catalog_dir=catalog_dir)
+    assert len(logic.catalog) == 300
+    assert isinstance(logic.catalog.column("tempo"), np.memmap)
+    assert list(logic.catalog.column("track_id")) == list(generated.column("track_id"))
+    song, _ = logic.recommend_song(130)
+    assert song["track_id"].startswith("track_")
+    # El catálogo no se reescribe y los modelos quedan asociados a su huella
+    assert ColumnarCatalog.stored_fingerprint(catalog_dir) == mock_fingerprint(300, 3)
+    assert BioSyncLogic(model_dir=model_dir, catalog_dir=catalog_dir).dataset_fingerprint == mock_fingerprint(300, 3)
+
+
+def test_api_serves_the_generated_catalog_without_a_dataset(tmp_path, monkeypatch):
+    import backend.main as api
+
+    write_mock_spotify_catalog(str(tmp_path / "catalog"), 120, seed=5)
+    monkeypatch.setattr(api, "real_data_path", str(tmp_path / "dataset.csv"))
+    monkeypatch.setattr(api, "mock_data_path", str(tmp_path / "spotify_mock.csv"))
+    monkeypatch.setattr(api, "data_dir", str(tmp_path))
+    monkeypatch.setattr(api, "catalog_dir", str(tmp_path / "catalog"))
+    monkeypatch.setattr(api, "model_dir", str(tmp_path / "models"))
+
+    logic = api.create_logic_engine()
+    assert len(logic.catalog) == 120
+    assert not os.path.exists(tmp_path / "spotify_mock.csv")
@@ -0,0 +1,65 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.model_store import ModelStore, dataset_fingerprint
+
+# Incluye una tupla: el manifiesto guardado en JSON la devuelve como lista
+PARAMS = {"fatigue_model": {"hidden_layer_sizes": (10, 5), "max_iter": 1000}}
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "dataset.csv"
+    path.write_text("track_id,tempo\na,120\n")
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ModelStore(str(tmp_path / "models"))
+
+
+def test_fingerprint_of_missing_dataset_is_none(tmp_path):
+    assert dataset_fingerprint(None) is None
+    assert dataset_fingerprint(str(tmp_path / "missing.csv")) is None
+
+
+def test_fingerprint_reuses_known_hash_only_if_size_and_mtime_match(dataset):
+    fingerprint = dataset_fingerprint(dataset)
+    known = dict(fingerprint, sha256="cached")
+    assert dataset_fingerprint(dataset, known)["sha256"] == "cached"
+
+    later = fingerprint["mtime_ns"] + 10**9
+    os.utime(dataset, ns=(later, later))
+    assert dataset_fingerprint(dataset, known)["sha256"] == fingerprint["sha256"]
+
+
+def test_saved_models_are_reused(store, dataset):
+    manifest = store.build_manifest(dataset, PARAMS)
+    assert store.load(manifest) is None
+
+    store.save(manifest, {"clusters": np.arange(3)})
+    artifacts = store.load(store.build_manifest(dataset, PARAMS))
+    assert artifacts["clusters"].tolist() == [0, 1, 2]
+
+
+def test_changed_dataset_or_params_force_retraining(store, dataset):
+    store.save(store.build_manifest(dataset, PARAMS), {"clusters": np.arange(3)})
+    assert store.load(store.build_manifest(dataset, {"fatigue_model": {"max_iter": 10}})) is None
+
+    with open(dataset, "a") as f:
+        f.write("b,90\n")
+    assert store.load(store.build_manifest(dataset, PARAMS)) is None
+
+
+def test_corrupt_bundle_forces_retraining(store, dataset):
+    manifest = store.build_manifest(dataset, PARAMS)
+    store.save(manifest, {"clusters": np.arange(3)})
+    with open(store.bundle_path, "wb") as f:
+        f.write(b"not a joblib file")
+    assert store.load(manifest) is None
@@ -0,0 +1,85 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import play_history
+from backend.catalog_index import CatalogIndex
+from backend.play_history import PlayHistoryStore, SessionHistory, ShuffledDeck
+
+TRACK_IDS = ["t0", "t1", "t2", "t3", "t4", "u0"]
+
+
+def make_index():
+    return CatalogIndex([0, 0, 0, 0, 0, 1], TRACK_IDS)
+
+
+def test_deck_deals_every_position_once_per_round():
+    deck, rng = ShuffledDeck(), random.Random(0)
+    for _ in range(3):
+        assert sorted(deck.draw(5, rng) for _ in range(5)) == [0, 1, 2, 3, 4]
+
+
+def test_songs_do_not_repeat_until_the_cluster_is_exhausted():
+    history, index, rng = SessionHistory(), make_index(), random.Random(1)
+    rows = []
+    for _ in range(5):
+        rows.append(history.pick(index, 0, rng))
+        history.record(TRACK_IDS[rows[-1]])
+    assert sorted(rows) == [0, 1, 2, 3, 4]
+
+
+def test_extended_index_keeps_the_deck_and_a_rebuilt_one_reshuffles():
+    history, index, rng = SessionHistory(), make_index(), random.Random(3)
+    rows = [history.pick(index, 0, rng) for _ in range(3)]
+    extended = index.extend([0], TRACK_IDS + ["t5"])
+    rows += [history.pick(extended, 0, rng) for _ in range(3)]
+    assert sorted(rows) == [0, 1, 2, 3, 4, 6]
+
+    history.pick(make_index(), 0, rng)
+    assert history._decks[0].cursor == 1
+
+
+def test_recently_played_tracks_are_skipped():
+    history, index, rng = SessionHistory(), make_index(), random.Random(2)
+    history.record("t0")
+    history.record("t1")
+    rows = set()
+    for _ in range(3):
+        row = history.pick(index, 0, rng)
+        history.record(TRACK_IDS[row])
+        rows.add(row)
+    assert rows == {2, 3, 4}
+    assert history.pick(index, 9, rng) is None
+
+
+def test_recent_tracks_are_bounded():
+    history = SessionHistory(recent=3)
+    for track_id in ["a", "b", "c", "a", "d"]:
+        history.record(track_id)
+    assert history.recent_tracks() == ["c", "a", "d"]
+    assert "b" not in history
+
+
+def test_store_reuses_histories_and_evicts_least_recent():
+    store = PlayHistoryStore(max_sessions=2)
+    first = store.get("a")
+    assert store.get("a") is first
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert "b" not in store and "a" in store and len(store) == 2
+    assert store.peek("missing") is None and "missing" not in store
+    store.remove("a")
+    assert "a" not in store
+
+
+def test_inactive_histories_expire(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(play_history.time, "monotonic", lambda: now[0])
+    store = PlayHistoryStore(ttl=10)
+    store.get("a")
+    now[0] = 11.0
+    store.get("b")
+    assert "a" not in store
@@ -0,0 +1,70 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.sentiment import INTENSIFIERS, KEYWORDS, NEGATIONS, analyze_sentiment
+
+
+def baseline_analyze_sentiment(message):
+    """Copia del análisis original (BioSyncLogic.analyze_sentiment) como referencia."""
+    if not message:
+        return 0, "Neutral", "Esperando tu estado..."
+    words = message.lower().split()
+    score = 0
+    for i, word in enumerate(words):
+        clean_word = word.strip(".,!¡?¿")
+        if clean_word in KEYWORDS:
+            val = KEYWORDS[clean_word]
+            is_negated = (i > 0 and words[i - 1] in NEGATIONS) or (i > 1 and words[i - 2] in NEGATIONS)
+            is_intensified = i > 0 and words[i - 1] in INTENSIFIERS
+            if is_negated:
+                val = -val
+            if is_intensified:
+                val *= 1.5
+            score += val
+    if score < -1:
+        return -1, "Negativo Crítico (Bajando Intensidad)", "⚠️ Detecto fatiga o dolor. Bajando al mínimo. ¡Para si es necesario!"
+    elif score < 0:
+        return -1, "Negativo (Bajando Intensidad)", "Tranquilo, respira profundo. Bajamos la intensidad para que te recuperes. 🍃"
+    elif score > 1:
+        return 1, "Positivo Alto (Modo Bestia)", "¡MODO BESTIA ACTIVADO! 🦍🔥 ¡Nadie te para hoy!"
+    elif score > 0:
+        return 1, "Positivo (Subiendo Intensidad)", "¡Esa es la actitud! Subiendo la potencia. 🚀"
+    else:
+        return 0, "Neutral", "Estoy monitoreando. Dime 'estoy cansado' o 'vamos' para ajustar."
+
+
+def random_messages(count, seed=0):
+    # Sin "puedo": la frase "no puedo" es la única diferencia intencional con el original
+    words = [w for w in KEYWORDS if " " not in w] + sorted(NEGATIONS) + sorted(INTENSIFIERS)
+    words += ["estoy", "me", "siento", "hoy", "la", "y", "😀", "Vamos", "NO"]
+    marks = ["", "", "", ",", ".", "!", "?", "¡", "¿", "..."]
+    rng = random.Random(seed)
+    for _ in range(count):
+        tokens = []
+        for _ in range(rng.randint(1, 8)):
+            word = rng.choice(words)
+            mark = rng.choice(marks)
+            tokens.append(mark + word if mark in ("¡", "¿") else word + mark)
+        yield " ".join(tokens)
+
+
+def test_matches_baseline_on_random_messages():
+    for message in random_messages(20000):
+        assert analyze_sentiment(message) == baseline_analyze_sentiment(message), message
+
+
+@pytest.mark.parametrize("message, label", [
+    ("No, estoy cansado", "Negativo Crítico (Bajando Intensidad)"),
+    ("no, me duele la rodilla", "Negativo Crítico (Bajando Intensidad)"),
+    ("no estoy cansado", "Positivo Alto (Modo Bestia)"),
+    ("ya no puedo más", "Negativo Crítico (Bajando Intensidad)"),
+    ("no puedo.", "Negativo Crítico (Bajando Intensidad)"),
+    ("no, puedo", "Neutral"),
+])
+def test_labels(message, label):
+    assert analyze_sentiment(message)[1] == label
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import sessions
+from backend.sessions import SessionStore
+
+
+class StubLogic:
+    """Registra cada matriz recibida y marca fatiga si la última muestra supera 150."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_fatigue_matrix(self, matrix):
+        self.calls.append(np.array(matrix))
+        return matrix[:, -1] > 150
+
+
+def test_history_keeps_the_last_window_in_order():
+    store = SessionStore(window=3)
+    for heart_rate in [100, 110, 120, 130, 140]:
+        store.append("a", heart_rate)
+    assert store.history("a") == [120, 130, 140]
+    assert store.history("unknown") == []
+
+
+def test_windows_only_include_full_sessions():
+    store = SessionStore(window=3)
+    store.append_many(["a", "a", "a", "b", "b"], [100, 110, 120, 90, 95])
+    ready, matrix = store.windows()
+    assert ready == ["a"]
+    assert matrix.tolist() == [[100, 110, 120]]
+
+
+def test_fatigue_is_predicted_in_one_batch():
+    store = SessionStore(window=2)
+    store.append_many(["a", "a", "b", "b", "c"], [100, 160, 100, 120, 170])
+    logic = StubLogic()
+    assert store.predict_fatigue(logic) == {"a": True, "b": False, "c": False}
+    assert len(logic.calls) == 1
+    assert logic.calls[0].tolist() == [[100, 160], [100, 120]]
+
+
+def test_least_recently_used_session_is_evicted_and_its_slot_reused():
+    store = SessionStore(window=2, max_sessions=2, capacity=1)
+    store.append("a", 100)
+    store.append("b", 110)
+    store.append("a", 101)
+    store.append("c", 120)
+    assert "b" not in store and "a" in store and "c" in store
+    assert len(store) == 2
+    assert store.history("a") == [100, 101]
+    assert store.history("c") == [120]
+
+
+def test_inactive_sessions_expire(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(sessions.time, "monotonic", lambda: now[0])
+    store = SessionStore(ttl=10)
+    store.append("a", 100)
+    now[0] = 11.0
+    store.append("b", 110)
+    assert "a" not in store
+    assert store.history("b") == [110]
+
+
+def test_remove_frees_the_session():
+    store = SessionStore()
+    store.append("a", 100)
+    store.remove("a")
+    store.remove("a")
+    assert "a" not in store and len(store) == 0
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.sessions import SessionStore
+from backend.streaming import StreamSession
+
+
+class StubLogic:
+    """Lógica mínima: zona fija y sin canciones, para probar solo el parseo de frames."""
+
+    def determine_zone_ai(self, heart_rate):
+        return "Cardio", 2
+
+    def predict_fatigue_matrix(self, matrix):
+        return [False] * len(matrix)
+
+    def recommend_for_zone(self, zone_idx, current_song_id, adjustment, history):
+        return None
+
+
+def make_session():
+    store = SessionStore()
+    return StreamSession("s1", StubLogic(), store), store
+
+
+@pytest.mark.parametrize("frame", ["inf", "-inf", "nan", "1e400", '{"heart_rate": 1e400}', '{"heart_rate": NaN}', "0", "900"])
+def test_rejects_non_finite_and_out_of_range_frames(frame):
+    session, store = make_session()
+    with pytest.raises(ValueError):
+        session.handle(frame)
+    assert store.history("s1") == []
+
+
+def test_accepts_plain_and_json_heart_rate():
+    session, store = make_session()
+    assert session.handle("142") == [{"type": "zone", "zone": "Cardio"}]
+    session.handle('{"heart_rate": 150}')
+    assert store.history("s1") == [142.0, 150.0]
+
+
+def test_errors_inside_handler_are_not_reparsed_as_json():
+    session, _ = make_session()
+
+    def fail(heart_rate, now=None):
+        raise ValueError("boom")
+
+    session.on_heart_rate = fail
+    with pytest.raises(ValueError, match="boom"):
+        session.handle("142")
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.logic import BioSyncLogic
+
+
+@pytest.fixture(scope="module")
+def logic():
+    # Sin dataset ni directorios: solo se entrenan los modelos, no se escribe nada
+    return BioSyncLogic()
+
+
+@pytest.mark.parametrize("age", [18, 25, 40, 65])
+def test_table_matches_random_forest_from_40_to_220_bpm(logic, age):
+    bpms = np.arange(40, 221)
+    expected = logic.zone_classifier.predict(np.column_stack([bpms, np.full(len(bpms), age)]))
+    assert [logic.zone_table.lookup(int(bpm), age) for bpm in bpms] == expected.tolist()
+
+
+def test_table_has_no_mismatches_on_its_grid(logic):
+    assert logic.check_zone_table() == []
+
+
+def test_samples_outside_the_table_miss(logic):
+    table = logic.zone_table
+    assert table.lookup(72.5, 25) is None
+    assert table.lookup(300, 25) is None
+    assert table.lookup(120, 5) is None
+    assert table.lookup("abc", 25) is None
+
+
+def test_misses_fall_back_to_the_model(logic):
+    _, zone = logic.determine_zone_ai(72.5)
+    assert zone == int(logic.zone_classifier.predict([[72.5, 25]])[0])
+
+
+def test_lookup_many_matches_lookup(logic):
+    heart_rates = [40, 72.5, 150, 300, 220]
+    zones, valid = logic.zone_table.lookup_many(heart_rates, 25)
+    for heart_rate, zone, is_valid in zip(heart_rates, zones, valid):
+        expected = logic.zone_table.lookup(heart_rate, 25)
+        assert is_valid == (expected is not None)
+        if is_valid:
+            assert zone == expected
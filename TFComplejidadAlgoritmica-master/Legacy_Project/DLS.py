@@ -1,67 +1,68 @@
-import csv
 import os.path
+import heapq
+import threading
 import graphviz as gv
+import csr_graph
 
 def return_weight(e):
   return e[1]
 
-def compare_weight(e, a):
-  if e[1] > a[1]:
-    return True
-  else:
-    False
-
-def addValue(lista, n, qty):
-  if len(lista) < qty:
-    lista.append(n)
-    lista = set(lista)
-    lista = list(lista)
-  tmp = min(lista, key=return_weight)
-  index = lista.index(tmp)
-  if compare_weight(n, tmp) and len(lista) >= qty:
-    lista.pop(index)
-    lista.append(n)
-  
+def addValue(heap, n, qty):
+  #Heap de minimos con las qty mejores aristas (peso, destino): O(log qty) por arista.
+  #Solo reemplaza al peor si el nuevo peso es estrictamente mayor
+  item = (n[1], n[0])
+  if len(heap) < qty:
+    heapq.heappush(heap, item)
+  elif item[0] > heap[0][0]:
+    heapq.heapreplace(heap, item)
+
+#Buffer de visitados reutilizable por hilo: no se reserva un arreglo del tamaño del grafo por consulta
+_scratch = threading.local()
+
+def visitedBuffer(n):
+  buffer = getattr(_scratch, "visited", None)
+  if buffer is None or len(buffer) < n:
+    buffer = _scratch.visited = bytearray(n)
+  return buffer
+
+def dls(G, n, s, L, qty):
+  #path: padre de cada nodo devuelto; lista: las qty aristas (destino, peso) de mayor peso
+  if qty <= 0 or L <= 0 or not 0 <= s < len(G):
+    return {}, []
+
+  if L == 1:
+    #La adyacencia ya viene ordenada por peso: los mejores vecinos son un prefijo
+    targets, weights = G.neighbors(s)
+    targets, weights = targets[:qty + 1].tolist(), weights[:qty + 1].tolist()
+    lista = [(v, w) for v, w in zip(targets, weights) if v != s][:qty]
+    return {v: s for v, _ in lista}, lista
+
+  visited = visitedBuffer(max(n, len(G)))
+  touched = []
+  seen = set()
+  path = {}
+  heap = []
 
-def dls(G, n, s, L, qty): 
-  print(n)
-  visited = [False]*n
-  path = [None]*n
-  cost = [float('inf')]*n
-  lista = []
-  
   def _dls(u, L):
      if L > 0 and not visited[u]:
-      visited[u] = True
-      for v, w in G[u]:
-         if not visited[v]:
-          cost[v] = w
+      visited[u] = 1
+      touched.append(u)
+      targets, weights = G.neighbors(u)
+      for v, w in zip(targets.tolist(), weights.tolist()):
+         if not visited[v] and v not in seen:
+          seen.add(v)
           path[v] = u
-          tupla = (v, w)
-
-          addValue(lista, tupla, qty)
+          addValue(heap, (v, w), qty)
           _dls(v, L - 1)
 
-  _dls(s, L)
-  return path, lista
-
-
-def createGraphFromCSV(csv_file):
-    with open(csv_file, newline='') as csvfile:
-        reader = csv.reader(csvfile)
-        next(reader)  # Saltar la primera lÃ­nea (encabezados)
-        graph = {}
-        for row in reader:
-            source = int(row[0])
-            target = int(row[1])
-            weight = float(row[2])
+  try:
+    _dls(s, L)
+  finally:
+    #Limpiar solo lo que se marco, O(nodos tocados) en vez de O(n)
+    for u in touched:
+      visited[u] = 0
+  return path, [(v, w) for w, v in heap]
 
-            if source not in graph:
-                graph[source] = []
-            if target not in graph:
-               graph[target] = []
-            graph[source].append((target, weight))
-    return graph, source
 
 def return_movies_titles(lista1, lista2):
   lista = []
@@ -69,14 +70,22 @@ def return_movies_titles(lista1, lista2):
     lista.append(lista2[i[0]])
   return lista
 
-if os.path.exists("edges_list_overview.csv") is True:    
-  G_overview, size1 = createGraphFromCSV("edges_list_overview.csv") #validar esto
+def loadGraph(name, csv_file):
+  #Preferir el CSR binario (memory-mapped, compartido entre procesos); si no existe, armarlo desde el CSV
+  if csr_graph.csrExists(name):
+    graph = csr_graph.loadCSR(name)
+  else:
+    graph = csr_graph.createCSRFromCSV(csv_file)
+  return graph, len(graph)
+
+if csr_graph.csrExists("overview") or os.path.exists("edges_list_overview.csv"):
+  G_overview, size1 = loadGraph("overview", "edges_list_overview.csv")
   
-if os.path.exists("genres_list.csv") is True:    
-  G_genre, size2 = createGraphFromCSV("genres_list.csv") #validar esto
+if csr_graph.csrExists("genre") or os.path.exists("genres_list.csv"):
+  G_genre, size2 = loadGraph("genre", "genres_list.csv")
 
-if os.path.exists("PC_list.csv") is True:    
-  G_studio, size3 = createGraphFromCSV("PC_list.csv") #validar esto
+if csr_graph.csrExists("PC") or os.path.exists("PC_list.csv"):
+  G_studio, size3 = loadGraph("PC", "PC_list.csv")
 
 def overview_recomendation(index, qty, peliculas_lista):
     if index != -1:
@@ -153,18 +162,5 @@ def drawGraph(L, filename="static/images/graph", quantity=None):
        return
     
 def createSubgraph(graph, source_node, path=[]):
-    subgraph = []
-
-    for src, edges in graph.items():
-        if src == source_node:
-            for dst, weight in edges:
-                subgraph.append([src, dst, weight])
-    
-    orderbyweight(subgraph)
-    return subgraph
-  
-def orderbyweight(subgraph):
-  subgraph.sort(key=return_subgraph_weight, reverse=True)
-
-def return_subgraph_weight(e):
-  return e[2]
\ No newline at end of file
+    #Las aristas de cada nodo ya vienen ordenadas por peso descendente
+    return [[source_node, dst, weight] for dst, weight in graph[source_node]]
\ No newline at end of file
@@ -0,0 +1,74 @@
+import os.path
+import numpy as np
+import pandas as pd
+
+#Directorio con un subdirectorio CSR por grafo (overview, genre, PC)
+graphs_dir = 'graphs'
+csr_files = ("offsets", "targets", "weights")
+
+class CSRGraph:
+  """
+  Grafo dirigido en formato CSR: las aristas del nodo u son
+  targets[offsets[u]:offsets[u + 1]] con sus pesos en weights, ordenadas
+  por peso descendente (y por target en caso de empate). Los arreglos
+  pueden venir de np.load con mmap_mode, asi varios procesos comparten
+  las mismas paginas del archivo.
+  """
+
+  def __init__(self, offsets, targets, weights):
+    self.offsets = offsets
+    self.targets = targets
+    self.weights = weights
+
+  def __len__(self):
+    return len(self.offsets) - 1
+
+  def neighbors(self, u):
+    #Vista (sin copia) de los destinos y pesos de u, ya ordenados por peso
+    if u < 0 or u >= len(self):
+      return self.targets[:0], self.weights[:0]
+    a, b = self.offsets[u], self.offsets[u + 1]
+    return self.targets[a:b], self.weights[a:b]
+
+  def __getitem__(self, u):
+    targets, weights = self.neighbors(u)
+    return list(zip(targets.tolist(), weights.tolist()))
+
+def buildCSR(sources, targets, weights, n=None):
+  sources = np.asarray(sources, dtype=np.int64)
+  targets = np.asarray(targets, dtype=np.int32)
+  weights = np.asarray(weights, dtype=np.float64)
+  if n is None:
+    n = int(max(sources.max(initial=-1), targets.max(initial=-1))) + 1
+  #Por origen, luego peso descendente y target ascendente
+  orden = np.lexsort((targets, -weights, sources))
+  offsets = np.zeros(n + 1, dtype=np.int64)
+  np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+  return CSRGraph(offsets, targets[orden], weights[orden])
+
+def createCSRFromCSV(csv_file, n=None):
+  edges = pd.read_csv(csv_file)
+  return buildCSR(edges['Source'].to_numpy(), edges['Target'].to_numpy(), edges['Weight'].to_numpy(), n)
+
+def csrPath(name, directory=graphs_dir):
+  return os.path.join(directory, name)
+
+def csrExists(name, directory=graphs_dir):
+  return all(os.path.exists(os.path.join(csrPath(name, directory), f"{f}.npy")) for f in csr_files)
+
+def saveCSR(graph, name, directory=graphs_dir):
+  path = csrPath(name, directory)
+  os.makedirs(path, exist_ok=True)
+  #offsets se borra primero y se escribe al final: un grafo a medio escribir no se considera completo
+  if os.path.exists(os.path.join(path, "offsets.npy")):
+    os.remove(os.path.join(path, "offsets.npy"))
+  for f in ("targets", "weights", "offsets"):
+    final = os.path.join(path, f"{f}.npy")
+    tmp = f"{final}.tmp-{os.getpid()}.npy"
+    np.save(tmp, getattr(graph, f))
+    os.replace(tmp, final)
+
+def loadCSR(name, directory=graphs_dir, mmap=True):
+  path = csrPath(name, directory)
+  mode = 'r' if mmap else None
+  return CSRGraph(*(np.load(os.path.join(path, f"{f}.npy"), mmap_mode=mode) for f in csr_files))
@@ -1,65 +1,102 @@
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
+from scipy.sparse import csr_matrix
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import argparse
+import hashlib
+import json
 import csv
 import ast
 import os.path
+import csr_graph
 
-rango = 4449
-df_movies = pd.read_csv('Amdb_5000_movies.csv')
+dataset_path = 'Amdb_5000_movies.csv'
+#Estado del pipeline: fingerprint de entradas, shards terminados y salidas completas por etapa
+manifest_path = 'edges_manifest.json'
+shards_dir = 'edges_shards'
+#Cambiar si cambia el formato de las aristas para invalidar las salidas anteriores
+formato_aristas = 2
 
 #Overview
 headers = ["Source", "Target", "Weight"]
-tfidf = TfidfVectorizer(stop_words="english")
-df_movies['overview']=df_movies['overview'].fillna("")
-tfid_matrix = tfidf.fit_transform(df_movies['overview'])
-
-cosine_sim = linear_kernel(tfid_matrix, tfid_matrix)
-
-indices = pd.Series(df_movies.index, index = df_movies['id']).drop_duplicates()
-
-columna_lista = df_movies['vote_average'].astype(float).tolist()
-
-def generate_overview_recommendations(id, cosine_sim = cosine_sim, cont = 0):
-    lis = []
-    lista = []
-    idx = indices[id]
-    sim_scores = cosine_sim[idx]
-    for i in sim_scores:
-        #i = 10
-        i=round(i*100)
-        lista = [id,cont,i+columna_lista[cont]]
-        if id == cont:
-            cont += 1
-            continue
-        if i <= np.float64(6.0):
-            cont +=1
-            continue
-        #validar que no se hagan relaciones cuando es 0.0
-        cont += 1
-        lis.append(lista)
-    return lis
-
-def get_recommendations_overview():
-    file = open("edges_list_overview.csv", "a", newline='')
-    writer = csv.writer(file)
-    
-    writer.writerow(headers)
-    for i in range(4449):
-        liston = generate_overview_recommendations(i)
-        writer.writerows(liston)
-    file.close()
-        
-def overview_is_empty():
-    df = pd.read_csv("edges_list_overview.csv")
-    return df.empty
+#Filas que procesa cada tarea (bloque de la matriz TF-IDF / de incidencia)
+overview_chunk = 512
+#Similitud mínima (coseno x100, redondeado) para crear una arista
+overview_umbral = 6
+#Máximo de vecinos por película (None = todas las aristas sobre el umbral)
+overview_top_k = None
+#Coincidencias (mayores que el umbral) necesarias para unir dos peliculas
+genre_umbral = 2
+PC_umbral = 0
 
-def generate_overview():
-    if os.path.exists("edges_list_overview.csv") is False:
-        get_recommendations_overview()
-    elif overview_is_empty():
-        get_recommendations_overview()
+def cargar_peliculas(path = dataset_path):
+    return pd.read_csv(path)
+
+def crear_matriz_tfidf(overviews):
+    tfidf = TfidfVectorizer(stop_words="english")
+    return tfidf.fit_transform(overviews.fillna(""))
+
+def generate_overview_recommendations(tfid_matrix, votos, inicio, fin, umbral = overview_umbral, top_k = overview_top_k):
+    #Similitud de las filas [inicio, fin) contra todo el catalogo como producto disperso:
+    #la memoria depende del bloque y de los pares con palabras en comun, no de n*n
+    bloque = (tfid_matrix[inicio:fin] @ tfid_matrix.T).tocsr()
+    for fila in range(fin - inicio):
+        id = inicio + fila
+        a, b = bloque.indptr[fila], bloque.indptr[fila + 1]
+        targets = bloque.indices[a:b]
+        scores = np.round(bloque.data[a:b] * 100)
+        validos = (scores > umbral) & (targets != id)
+        targets, scores = targets[validos], scores[validos]
+        if top_k is not None and len(targets) > top_k:
+            mejores = np.argpartition(-scores, top_k - 1)[:top_k]
+            targets, scores = targets[mejores], scores[mejores]
+        orden = np.argsort(targets)
+        targets = targets[orden]
+        pesos = scores[orden] + votos[targets]
+        yield from zip([id] * len(targets), targets.tolist(), pesos.tolist())
+
+def preparar_overview(df):
+    tfid_matrix = crear_matriz_tfidf(df['overview'])
+    votos = df['vote_average'].astype(float).to_numpy()
+    return generate_overview_recommendations, (tfid_matrix, votos), {"umbral": overview_umbral, "top_k": overview_top_k}
+
+#Generos y PC: indice invertido
+def crear_matriz_incidencia(listas):
+    #Fila = pelicula, columna = id de genero/compañia; el valor cuenta repeticiones del id en la pelicula
+    columnas = {}
+    filas, cols = [], []
+    for fila, lista in enumerate(listas):
+        for valor in lista:
+            filas.append(fila)
+            cols.append(columnas.setdefault(valor, len(columnas)))
+    datos = np.ones(len(filas), dtype=np.int64)
+    return csr_matrix((datos, (filas, cols)), shape=(len(listas), len(columnas)))
+
+def generate_coincidencias_recomendations(incidencia, presencia_T, votos, inicio, fin, umbral):
+    #conteo[i][j] = cuantos ids de i (con repeticiones) aparecen en j; el producto disperso
+    #solo toca los pares que comparten algun id
+    bloque = (incidencia[inicio:fin] @ presencia_T).tocsr()
+    for fila in range(fin - inicio):
+        id = inicio + fila
+        a, b = bloque.indptr[fila], bloque.indptr[fila + 1]
+        targets = bloque.indices[a:b]
+        conteos = bloque.data[a:b]
+        validos = (conteos > umbral) & (targets != id)
+        targets, conteos = targets[validos], conteos[validos]
+        orden = np.argsort(targets)
+        targets = targets[orden]
+        pesos = conteos[orden] + votos[targets]
+        yield from zip([id] * len(targets), targets.tolist(), pesos.tolist())
+
+def preparar_coincidencias(listas, votos, umbral):
+    incidencia = crear_matriz_incidencia(listas)
+    presencia = incidencia.copy()
+    presencia.data[:] = 1
+    presencia_T = presencia.T.tocsc()
+    votos = np.asarray(votos, dtype=float)
+    return generate_coincidencias_recomendations, (incidencia, presencia_T, votos), {"umbral": umbral}
 
 #Generos
 def obtener_ids_por_elemento(input_str):
@@ -70,57 +107,17 @@ def obtener_ids_por_elemento(input_str):
             ids_por_elemento.append(int(elemento['id']))
     return ids_por_elemento
 
-def crear_lista_genero():
-    elementos_genero = df_movies['genres'].tolist()
+def crear_lista_genero(df):
+    elementos_genero = df['genres'].tolist()
 
     resultados_genero = []
     for elemento in elementos_genero:
         ids = obtener_ids_por_elemento(elemento)
-        resultados_genero.append(ids) 
+        resultados_genero.append(ids)
     return resultados_genero
 
-def generate_genre_recomendations(id, id_genres, cont = 0):
-    lis = []
-    listita=[]
-    for i in id_genres:
-        listita=[id,cont,i+columna_lista[cont]]
-        if id == cont:
-            cont += 1
-            continue
-        if i <= np.float64(2.0):
-            cont +=1
-            continue
-        cont += 1
-        lis.append(listita)
-    return lis
-
-def crear_listas_ids_genero(resultados_genero):
-    id_genres = []
-    for i in range(4449):   
-        id_genres.append([sum(valor_genero in otra_lista_genero for valor_genero in resultados_genero[i]) for otra_lista_genero in resultados_genero[0:]])
-    return id_genres
-
-def get_recomendations_genre():
-    resultados_genero = crear_lista_genero()
-    codigos_genero = crear_listas_ids_genero(resultados_genero)
-    file2 = open("genres_list.csv", "a", newline='')
-    writer2 = csv.writer(file2)
-
-    writer2.writerow(headers)
-    for i in range(4449):
-        liston2 = generate_genre_recomendations(i, codigos_genero[i])
-        writer2.writerows(liston2)
-    file2.close()
-    
-def genre_is_empty():
-    df = pd.read_csv("genres_list.csv")
-    return df.empty
-
-def generate_genre():
-    if os.path.exists("genres_list.csv") is False:
-        get_recomendations_genre()
-    elif genre_is_empty():
-        get_recomendations_genre()
+def preparar_genre(df):
+    return preparar_coincidencias(crear_lista_genero(df), df['vote_average'].astype(float), genre_umbral)
 
 #PC
 def obtener_ids_por_elemento_PC(input_str_PC):
@@ -131,68 +128,173 @@ def obtener_ids_por_elemento_PC(input_str_PC):
             ids_por_elemento_PC.append(int(elemento_PC['id']))
     return ids_por_elemento_PC
 
-def crear_lista_PC():
-    elementos_PC = df_movies['production_companies'].tolist()
+def crear_lista_PC(df):
+    elementos_PC = df['production_companies'].tolist()
 
     resultados_PC = []
     for elemento_PC in elementos_PC:
         ids_PC = obtener_ids_por_elemento_PC(elemento_PC)
-  
-        resultados_PC.append(ids_PC)    
+
+        resultados_PC.append(ids_PC)
 
     return  resultados_PC
 
-def generate_PC_recomendations(id, ids_PC, cont = 0):
-    lis = []
-    listita=[]
-    for i in ids_PC:
-        listita=[id,cont,i+columna_lista[cont]]
-        if id == cont:
-            cont += 1
-            continue
-        if i <= 0:
-            cont +=1
+def preparar_PC(df):
+    return preparar_coincidencias(crear_lista_PC(df), df['vote_average'].astype(float), PC_umbral)
+
+#Etapas: archivo de salida, preparacion (en el proceso principal) y parametros que afectan la salida
+etapas = {
+    "overview": ("edges_list_overview.csv", preparar_overview, {"umbral": overview_umbral, "top_k": overview_top_k}),
+    "genre": ("genres_list.csv", preparar_genre, {"umbral": genre_umbral}),
+    "PC": ("PC_list.csv", preparar_PC, {"umbral": PC_umbral}),
+}
+
+#Pipeline
+def sha256_archivo(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+def escribir_atomico(path, escribir):
+    #Se escribe a un temporal y se renombra: un corte deja el archivo anterior o ninguno, nunca uno a medias
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp, "w", newline='') as f:
+            escribir(f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def leer_manifest():
+    if not os.path.exists(manifest_path):
+        return {"stages": {}}
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"stages": {}}
+
+def guardar_manifest(manifest):
+    escribir_atomico(manifest_path, lambda f: json.dump(manifest, f, indent=2))
+
+def fingerprint_etapa(nombre, dataset_sha):
+    #El tamaño de shard no entra: no cambia la salida y los shards se identifican por su rango
+    params = {"etapa": nombre, "dataset": dataset_sha, "params": etapas[nombre][2], "formato": formato_aristas}
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def etapa_completa(nombre, estado, fingerprint):
+    archivo = etapas[nombre][0]
+    return (estado.get("fingerprint") == fingerprint and estado.get("complete")
+            and os.path.exists(archivo) and sha256_archivo(archivo) == estado.get("output_sha256")
+            and csr_graph.csrExists(nombre))
+
+def ruta_shard(nombre, inicio, fin):
+    return os.path.join(shards_dir, nombre, f"{inicio}-{fin}.csv")
+
+#Datos de cada etapa en los procesos del pool (se envian una vez por proceso)
+_datos_etapas = {}
+
+def _inicializar_worker(datos):
+    _datos_etapas.update(datos)
+
+def escribir_shard(nombre, inicio, fin):
+    generador, args, kwargs = _datos_etapas[nombre]
+    escribir_atomico(ruta_shard(nombre, inicio, fin),
+                     lambda f: csv.writer(f).writerows(generador(*args, inicio, fin, **kwargs)))
+    return nombre, inicio, fin
+
+def unir_shards(nombre, rangos):
+    def escribir(f):
+        f.write(",".join(headers) + "\r\n")
+        for inicio, fin in rangos:
+            with open(ruta_shard(nombre, inicio, fin), newline='') as shard:
+                f.write(shard.read())
+    escribir_atomico(etapas[nombre][0], escribir)
+
+def generar_etapas(nombres, workers = None, chunk = overview_chunk, forzar = False):
+    df = cargar_peliculas()
+    n = len(df)
+    dataset_sha = sha256_archivo(dataset_path)
+    manifest = leer_manifest()
+    manifest["dataset"] = dataset_path
+    rangos = [(inicio, min(inicio + chunk, n)) for inicio in range(0, n, chunk)]
+
+    pendientes = {}
+    for nombre in nombres:
+        fingerprint = fingerprint_etapa(nombre, dataset_sha)
+        estado = manifest["stages"].get(nombre, {})
+        if not forzar and etapa_completa(nombre, estado, fingerprint):
             continue
-        cont += 1
-        lis.append(listita)
-    return lis
+        hechos = set()
+        if not forzar and estado.get("fingerprint") == fingerprint:
+            #Reanudar: se reutilizan los shards terminados que siguen en disco
+            hechos = {s for s in estado.get("shards", []) if os.path.exists(ruta_shard(nombre, *map(int, s.split("-"))))}
+        manifest["stages"][nombre] = {"fingerprint": fingerprint, "movies": n, "shards": sorted(hechos), "complete": False}
+        pendientes[nombre] = [r for r in rangos if f"{r[0]}-{r[1]}" not in hechos]
+        os.makedirs(os.path.join(shards_dir, nombre), exist_ok=True)
+    if not pendientes:
+        return []
+    guardar_manifest(manifest)
+
+    datos = {nombre: etapas[nombre][1](df) for nombre, faltan in pendientes.items() if faltan}
+    tareas = [(nombre, inicio, fin) for nombre, faltan in pendientes.items() for inicio, fin in faltan]
 
-def crear_listas_ids_PC(resultados_PC):
-    id_PC = []
-    for i in range(4449):   
-        id_PC.append([sum(valor_PC in otra_lista_PC for valor_PC in resultados_PC[i]) for otra_lista_PC in resultados_PC[0:]])
-    return id_PC
+    def shard_terminado(nombre, inicio, fin):
+        manifest["stages"][nombre]["shards"].append(f"{inicio}-{fin}")
+        guardar_manifest(manifest)
 
-def get_recomendations_PC():
-    resultados_PC = crear_lista_PC()
-    codigos_PC = crear_listas_ids_PC(resultados_PC)
-    file3 = open("PC_list.csv", "a", newline='')
-    writer3 = csv.writer(file3)
+    if tareas:
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            _inicializar_worker(datos)
+            for tarea in tareas:
+                shard_terminado(*escribir_shard(*tarea))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tareas)), initializer=_inicializar_worker, initargs=(datos,)) as pool:
+                for futuro in as_completed([pool.submit(escribir_shard, *tarea) for tarea in tareas]):
+                    shard_terminado(*futuro.result())
 
-    writer3.writerow(headers)
+    for nombre in pendientes:
+        unir_shards(nombre, rangos)
+        #Version binaria (CSR ordenado por peso) que carga DLS con memory-mapping
+        csr_graph.saveCSR(csr_graph.createCSRFromCSV(etapas[nombre][0], n), nombre)
+        estado = manifest["stages"][nombre]
+        estado["complete"] = True
+        estado["output_sha256"] = sha256_archivo(etapas[nombre][0])
+        guardar_manifest(manifest)
+        for inicio, fin in rangos:
+            os.remove(ruta_shard(nombre, inicio, fin))
+    return list(pendientes)
 
-    for i in range(4449):
-        liston3 = generate_PC_recomendations(i, codigos_PC[i])
-        writer3.writerows(liston3)
-    file3.close()
+def generate_overview():
+    generar_etapas(["overview"])
 
-def PC_is_empty():
-    df = pd.read_csv("PC_list.csv")
-    return df.empty
+def generate_genre():
+    generar_etapas(["genre"])
 
 def generate_PC():
-    if os.path.exists("PC_list.csv") is False:
-        get_recomendations_PC()
-    elif PC_is_empty():
-        get_recomendations_PC()
+    generar_etapas(["PC"])
 
 #Generador
-def generar_csvs():
-    #Overview.csv
-    generate_overview()
-
-    #Generos.csv
-    generate_genre()
-        
-    #PC.csv
-    generate_PC()
\ No newline at end of file
+def generar_csvs(workers = None, forzar = False):
+    #Los procesos del pool no deben volver a lanzar el pipeline si re-importan el modulo principal
+    if multiprocessing.parent_process() is not None:
+        return []
+    return generar_etapas(list(etapas), workers, forzar=forzar)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera las listas de aristas del grafo de peliculas.")
+    parser.add_argument("etapas", nargs="*", help="Etapas a generar: " + ", ".join(etapas) + " (por defecto todas)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool (por defecto uno por CPU)")
+    parser.add_argument("--chunk", type=int, default=overview_chunk, help="Peliculas por shard")
+    parser.add_argument("--force", action="store_true", help="Regenerar aunque las entradas no hayan cambiado")
+    args = parser.parse_args()
+    desconocidas = [e for e in args.etapas if e not in etapas]
+    if desconocidas:
+        parser.error(f"etapas desconocidas: {', '.join(desconocidas)}")
+
+    generadas = generar_etapas(args.etapas or list(etapas), args.workers, args.chunk, args.force)
+    print("Etapas generadas:", ", ".join(generadas) if generadas else "ninguna (todo al dia)")
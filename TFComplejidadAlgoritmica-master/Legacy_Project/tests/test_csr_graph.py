@@ -0,0 +1,56 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csr_graph
+
+
+@pytest.fixture
+def graph():
+    # Nodo 4 sin aristas; el 2 solo aparece como destino
+    return csr_graph.buildCSR([0, 0, 0, 1, 3, 3], [1, 2, 3, 0, 1, 2], [0.2, 0.9, 0.5, 0.3, 0.4, 0.4], n=5)
+
+
+def test_adjacency_is_sorted_by_weight_then_target(graph):
+    assert len(graph) == 5
+    assert graph[0] == [(2, 0.9), (3, 0.5), (1, 0.2)]
+    assert graph[1] == [(0, 0.3)]
+    assert graph[3] == [(1, 0.4), (2, 0.4)]
+
+
+def test_nodes_without_edges_have_empty_adjacency(graph):
+    assert graph[2] == []
+    assert graph[4] == []
+    for u in (-1, 5, 100):
+        targets, weights = graph.neighbors(u)
+        assert len(targets) == len(weights) == 0
+
+
+def test_saved_graph_loads_memory_mapped(tmp_path, graph):
+    directory = str(tmp_path)
+    assert not csr_graph.csrExists("overview", directory)
+    csr_graph.saveCSR(graph, "overview", directory)
+    assert csr_graph.csrExists("overview", directory)
+
+    loaded = csr_graph.loadCSR("overview", directory)
+    assert isinstance(loaded.offsets, np.memmap)
+    assert [loaded[u] for u in range(5)] == [graph[u] for u in range(5)]
+
+
+def test_graph_without_offsets_is_incomplete(tmp_path, graph):
+    directory = str(tmp_path)
+    csr_graph.saveCSR(graph, "genre", directory)
+    os.remove(os.path.join(csr_graph.csrPath("genre", directory), "offsets.npy"))
+    assert not csr_graph.csrExists("genre", directory)
+
+
+def test_graph_from_edge_list_csv(tmp_path):
+    path = tmp_path / "edges.csv"
+    path.write_text("Source,Target,Weight\n0,1,0.5\n1,0,0.5\n0,2,0.7\n")
+    graph = csr_graph.createCSRFromCSV(str(path))
+    assert len(graph) == 3
+    assert graph[0] == [(2, 0.7), (1, 0.5)]
@@ -0,0 +1,57 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csr_graph
+
+
+@pytest.fixture(scope="module")
+def DLS(tmp_path_factory):
+    pytest.importorskip("graphviz")
+    # DLS carga los grafos del directorio actual al importarse: se importa desde uno vacío
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("dls"))
+    try:
+        return importlib.import_module("DLS")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def graph():
+    # 0 -> 1 (0.9), 0 -> 2 (0.1), 0 -> 0 (1.0), 1 -> 3 (0.8), 2 -> 4 (0.95); 5 sin aristas
+    return csr_graph.buildCSR([0, 0, 0, 1, 2], [1, 2, 0, 3, 4], [0.9, 0.1, 1.0, 0.8, 0.95], n=6)
+
+
+def by_weight(lista):
+    return sorted(lista, key=lambda e: -e[1])
+
+
+def test_depth_one_returns_best_neighbours_without_the_source(DLS, graph):
+    path, lista = DLS.dls(graph, len(graph), 0, 1, 2)
+    assert lista == [(1, 0.9), (2, 0.1)]
+    assert path == {1: 0, 2: 0}
+
+
+def test_deeper_search_keeps_the_best_reached_nodes(DLS, graph):
+    path, lista = DLS.dls(graph, len(graph), 0, 2, 2)
+    assert by_weight(lista) == [(4, 0.95), (1, 0.9)]
+    assert path[4] == 2 and path[3] == 1
+    # El buffer de visitados se limpia: repetir la consulta da lo mismo
+    assert by_weight(DLS.dls(graph, len(graph), 0, 2, 2)[1]) == [(4, 0.95), (1, 0.9)]
+
+
+@pytest.mark.parametrize("depth", [1, 2])
+@pytest.mark.parametrize("node", [5, 6, 100])
+def test_node_without_edges_returns_no_recommendations(DLS, graph, depth, node):
+    # Regresión: la versión anterior fallaba con IndexError/KeyError en estos nodos
+    assert DLS.dls(graph, len(graph), node, depth, 3) == ({}, [])
+
+
+def test_no_results_for_empty_request(DLS, graph):
+    assert DLS.dls(graph, len(graph), 0, 1, 0) == ({}, [])
+    assert DLS.dls(graph, len(graph), 0, 0, 3) == ({}, [])